@@ -0,0 +1,163 @@
+import asyncio
+import os
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+
+# Upstream LLM calls one process lets run at once; 0 disables a cap
+AGENT_LLM_CONCURRENCY = int(os.getenv("AGENT_LLM_CONCURRENCY", "16"))
+AGENT_LLM_CONCURRENCY_PER_USER = int(os.getenv("AGENT_LLM_CONCURRENCY_PER_USER", "2"))
+# Requests allowed to wait for a slot, and for how long, before they are turned away
+AGENT_LLM_QUEUE_SIZE = int(os.getenv("AGENT_LLM_QUEUE_SIZE", "64"))
+AGENT_LLM_QUEUE_SIZE_PER_USER = int(os.getenv("AGENT_LLM_QUEUE_SIZE_PER_USER", "2"))
+AGENT_LLM_QUEUE_TIMEOUT = float(os.getenv("AGENT_LLM_QUEUE_TIMEOUT", "10"))
+AGENT_LLM_RETRY_AFTER = int(os.getenv("AGENT_LLM_RETRY_AFTER", "5"))  # seconds suggested to rejected clients
+# Prompts up to this many words, and not questions, count as commands and are served first
+AGENT_COMMAND_MAX_WORDS = int(os.getenv("AGENT_COMMAND_MAX_WORDS", "12"))
+
+PRIORITIES = ("command", "chat")  # served in this order
+
+
+class AgentBusyError(Exception):
+    '''
+    Raised when a prompt cannot get an LLM slot: the user already has their calls running
+    and queued (`scope="user"`), the process queue is full (`"queue"`) or the wait timed out (`"timeout"`)
+    '''
+
+    def __init__(self, scope: str):
+        self.scope = scope
+        if scope == "user":
+            message = "You already have requests waiting for the assistant, try again when they finish."
+        else:
+            message = "The assistant is busy right now, try again shortly."
+        super().__init__(message)
+
+
+def prompt_priority(prompt: str) -> str:
+    '''Short commands ("could you start 40 min of physics") go ahead of open-ended chat'''
+    if "?" not in prompt and len(prompt.split()) <= AGENT_COMMAND_MAX_WORDS:
+        return "command"
+    return "chat"
+
+
+class _Waiter:
+    __slots__ = ("user_id", "future", "enqueued")
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued = time.monotonic()
+
+
+class LLMAdmission:
+    '''
+    Global and per-user concurrency limits for LLM calls, with a bounded wait queue per
+    priority. A released slot goes to the first waiter, commands before chat, whose user
+    is under their own limit.
+    '''
+
+    def __init__(self, max_active: int=AGENT_LLM_CONCURRENCY, max_per_user: int=AGENT_LLM_CONCURRENCY_PER_USER,
+                 max_queued: int=AGENT_LLM_QUEUE_SIZE, max_queued_per_user: int=AGENT_LLM_QUEUE_SIZE_PER_USER,
+                 queue_timeout: float=AGENT_LLM_QUEUE_TIMEOUT):
+        self.max_active = max_active
+        self.max_per_user = max_per_user
+        self.max_queued = max_queued
+        self.max_queued_per_user = max_queued_per_user
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._active_per_user: Counter = Counter()
+        self._queues: dict[str, deque[_Waiter]] = {priority: deque() for priority in PRIORITIES}
+        self._queued_per_user: Counter = Counter()
+
+        self.admitted = Counter()  # priority -> requests that got a slot
+        self.rejected = Counter()  # scope -> requests turned away
+        self.waited = Counter()  # priority -> admitted requests that had to queue
+        self.wait_seconds = Counter()  # priority -> their total time in the queue
+        self.max_wait = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def queued_for(self, priority: str) -> int:
+        return len(self._queues[priority])
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, prompt: str):
+        '''Hold an LLM slot for the body of the block, or raise AgentBusyError. Yields the seconds spent queued'''
+        priority = prompt_priority(prompt)
+        wait = await self._acquire(user_id, priority)
+        self.admitted[priority] += 1
+        try:
+            yield wait
+        finally:
+            self._release(user_id)
+
+    def _has_slot(self, user_id: str) -> bool:
+        if self.max_active and self.active >= self.max_active:
+            return False
+        return not self.max_per_user or self._active_per_user[user_id] < self.max_per_user
+
+    def _take(self, user_id: str):
+        self.active += 1
+        self._active_per_user[user_id] += 1
+
+    def _release(self, user_id: str):
+        self.active -= 1
+        self._active_per_user[user_id] -= 1
+        if not self._active_per_user[user_id]:
+            del self._active_per_user[user_id]
+        self._dispatch()
+
+    def _dispatch(self):
+        for queue in self._queues.values():
+            for waiter in list(queue):
+                if self.max_active and self.active >= self.max_active:
+                    return
+                if waiter.future.done() or not self._has_slot(waiter.user_id):
+                    continue
+                self._dequeue(queue, waiter)
+                self._take(waiter.user_id)
+                waiter.future.set_result(None)
+
+    def _dequeue(self, queue: deque, waiter: _Waiter):
+        queue.remove(waiter)
+        self._queued_per_user[waiter.user_id] -= 1
+        if not self._queued_per_user[waiter.user_id]:
+            del self._queued_per_user[waiter.user_id]
+
+    async def _acquire(self, user_id: str, priority: str) -> float:
+        if self._has_slot(user_id):
+            self._take(user_id)
+            return 0.0
+        if self.max_queued_per_user and self._queued_per_user[user_id] >= self.max_queued_per_user:
+            self.rejected["user"] += 1
+            raise AgentBusyError("user")
+        if self.max_queued and self.queued >= self.max_queued:
+            self.rejected["queue"] += 1
+            raise AgentBusyError("queue")
+
+        waiter = _Waiter(user_id)
+        queue = self._queues[priority]
+        queue.append(waiter)
+        self._queued_per_user[user_id] += 1
+        try:
+            await asyncio.wait_for(waiter.future, self.queue_timeout or None)
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the caller gave up: pass the slot on
+                self._release(user_id)
+            else:
+                self._dequeue(queue, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected["timeout"] += 1
+                raise AgentBusyError("timeout") from None
+            raise
+        wait = time.monotonic() - waiter.enqueued
+        self.waited[priority] += 1
+        self.wait_seconds[priority] += wait
+        self.max_wait = max(self.max_wait, wait)
+        return wait
+
+
+llm_admission = LLMAdmission()
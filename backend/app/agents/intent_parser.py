@@ -0,0 +1,137 @@
+import re
+from typing import Optional
+from pydantic import ValidationError
+from app.schemas.agent import PomodoroInput
+
+# Deterministic parser for short timer commands ("25min math", "50 min pomodoro
+# with 10 min break"). It only answers when the text is unambiguous; anything
+# else returns None and goes to the LLM agent.
+
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "twelve": 12, "fifteen": 15, "twenty": 20,
+    "twenty-five": 25, "twenty five": 25, "thirty": 30, "forty": 40, "forty-five": 45,
+    "forty five": 45, "fifty": 50, "sixty": 60, "ninety": 90,
+}
+
+_PHRASES = [
+    (re.compile(r"\b(?:a\s+)?half\s+(?:an\s+)?hour\b", re.I), "30 min"),
+    (re.compile(r"\b(?:a\s+)?quarter\s+(?:of\s+)?(?:an\s+)?hour\b", re.I), "15 min"),
+    (re.compile(r"\b(?:an|a)\s+hour\b", re.I), "1 hour"),
+]
+
+_NUMBER = r"\d+(?:[.,]\d+)?|" + "|".join(sorted((re.escape(w) for w in _NUMBER_WORDS), key=len, reverse=True))
+_DURATION_RE = re.compile(
+    rf"(?<![\w.])(?P<num>{_NUMBER})\s*-?\s*(?P<unit>hours?|hrs?|h|minutes?|mins?|m)(?![a-z])",
+    re.I,
+)
+_SPLIT_RE = re.compile(r"(?<![\w.])(?P<work>\d+(?:\.\d+)?)\s*/\s*(?P<rest>\d+(?:\.\d+)?)(?![\w.])")
+_REST_WORDS = r"(?:break|breaks|rest|resting|pause|breather)"
+_REST_AFTER_RE = re.compile(rf"^\s*(?:of\s+)?{_REST_WORDS}\b", re.I)
+_REST_BEFORE_RE = re.compile(rf"\b{_REST_WORDS}\s+(?:of\s+|for\s+)?$", re.I)
+_AMBIGUOUS_RE = re.compile(
+    r"\b(?:not|no|don'?t|cancel|stop|pause|resume|extend|more|less|another|again|every|each|"
+    r"times|x\d+|then|until|tomorrow|tonight|later|remind|how|what|why|when|should|could|"
+    r"yesterday|ago|last|did|was|were|studied|worked|or)\b|"
+    r"\d\s*(?:am|pm)\b|\bat\s+\d|\b\d+\s+(?:pomodoros|sessions|timers|rounds|cycles|blocks)\b",
+    re.I,
+)
+
+_FILLER = {
+    "pomodoro", "pomodoros", "timer", "focus", "focused", "session", "work", "working",
+    "productive", "interval", "timed", "start", "begin", "set", "run", "launch", "create",
+    "lets", "let's", "let", "us", "me", "please", "i", "want", "need", "would", "like", "to",
+    "can", "you", "a", "an", "the", "of", "for", "on", "with", "and", "about", "some", "my",
+    "new", "up", "go", "doing", "do",
+}
+_MAX_TASK_WORDS = 6
+# A number left in the task name only reads as part of it after one of these ("chapter 4");
+# anything else ("25 min math 10") could be a second duration or a count, so the LLM decides
+_NUMBERED = {
+    "chapter", "ch", "unit", "lesson", "lecture", "section", "part", "page", "pages", "exercise", "exercises",
+    "problem", "problems", "module", "lab", "week", "day", "level", "episode", "homework", "hw", "assignment",
+    "quiz", "test", "exam", "question", "questions", "task", "project", "volume", "book", "grade",
+}
+_BARE_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+def _to_minutes(num: str, unit: str) -> float:
+    value = _NUMBER_WORDS.get(num.lower())
+    if value is None:
+        value = float(num.replace(",", "."))
+    return value * 60 if unit.lower().startswith("h") else float(value)
+
+def _durations(text: str):
+    '''Yield (start, end, minutes), merging "1 hour 30 min" style compounds'''
+    matches = list(_DURATION_RE.finditer(text))
+    i = 0
+    while i < len(matches):
+        m = matches[i]
+        start, end = m.span()
+        minutes = _to_minutes(m["num"], m["unit"])
+        if i + 1 < len(matches) and m["unit"].lower().startswith("h"):
+            nxt = matches[i + 1]
+            gap = text[end:nxt.start()]
+            if not nxt["unit"].lower().startswith("h") and re.fullmatch(r"\s*(?:and\s*)?", gap, re.I):
+                minutes += _to_minutes(nxt["num"], nxt["unit"])
+                end = nxt.end()
+                i += 1
+        yield start, end, minutes
+        i += 1
+
+def _strip_filler(words: list[str]) -> list[str]:
+    while words and words[0].lower() in _FILLER:
+        words.pop(0)
+    while words and words[-1].lower() in _FILLER:
+        words.pop()
+    return words
+
+def parse_pomodoro_intent(msg: str) -> Optional[PomodoroInput]:
+    '''Turn a short timer command into PomodoroInput, or None when the LLM should decide'''
+    text = " ".join(msg.split())
+    if not text or len(text) > 200 or "?" in text:
+        return None
+    for pattern, replacement in _PHRASES:
+        text = pattern.sub(replacement, text)
+
+    work, rest = [], []
+    cut = []  # spans removed before extracting the task name
+
+    split = _SPLIT_RE.search(text)
+    if split:
+        work.append(float(split["work"]))
+        rest.append(float(split["rest"]))
+        cut.append(split.span())
+
+    for start, end, minutes in _durations(text):
+        after, before = text[end:], text[:start]
+        rest_after = _REST_AFTER_RE.match(after)
+        rest_before = _REST_BEFORE_RE.search(before)
+        if rest_after:
+            rest.append(minutes)
+            cut.append((start, end + rest_after.end()))
+        elif rest_before:
+            rest.append(minutes)
+            cut.append((rest_before.start(), end))
+        else:
+            work.append(minutes)
+            cut.append((start, end))
+
+    if len(work) != 1 or len(rest) > 1:
+        return None
+
+    remainder = text
+    for start, end in sorted(cut, reverse=True):
+        remainder = remainder[:start] + " " + remainder[end:]
+    if _AMBIGUOUS_RE.search(remainder):
+        return None
+    words = _strip_filler([w.strip(",.!;:") for w in remainder.split() if w.strip(",.!;:")])
+    if len(words) > _MAX_TASK_WORDS:
+        return None
+    for previous, word in zip([""] + words, words):
+        if _BARE_NUMBER_RE.fullmatch(word) and previous.lower() not in _NUMBERED:
+            return None
+
+    try:
+        return PomodoroInput(timer=work[0], rest_time=rest[0] if rest else None, task_name=" ".join(words))
+    except ValidationError:
+        return None
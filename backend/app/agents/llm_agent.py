@@ -0,0 +1,98 @@
+import os
+import json
+from functools import lru_cache
+from dotenv import load_dotenv
+from langchain_groq import ChatGroq
+from langchain.agents import create_react_agent, AgentExecutor
+from langchain.tools import tool
+from langchain.prompts import PromptTemplate
+from app.agents.pomodoro_agent import current_user_id, tool_calls, start_pomodoro
+
+load_dotenv()
+
+# The LangChain/Groq half of the agent. Importing it is slow (langchain, groq, requests),
+# so pomodoro_agent only loads it when the LLM path is first needed or warmed up.
+
+prompt_template = """You are Cronos, an expert time management AI assistant. Your role is to recognize and process requests for timed work sessions.
+You will process this requests ONLY with the provided tools. 
+
+**Timed session triggers:** 
+- Synonyms: Pomodoro/pomodoro, Timer, Focus/focus session, Work session, Productive session/interval, timed session.
+- Explicit durations (e.g., "25min", "1 hour")
+
+**When detected:**
+1. Extract: 
+   - `timer` (required, in minutes)
+   - `rest_time` (optional, in minutes)
+   - `task_name` (optional)
+
+2. If missing timer duration: DO NOT use tools, respond politely and continue conversation.
+
+**Valid examples:**
+- "25min math": {{"timer": 25, "rest_time": 12.5, "task_name": "math"}}
+- "50min pomodoro with 10min break": {{"timer": 50, "rest_time": 10, "task_name": ""}}
+- "No duration specified": {{"timer": null, "rest_time": null, "task_name": "", "response": "[answer politely.]"}}
+
+**Available tools:**
+{tools}
+Tool names: {tool_names}
+
+**Critical rules:**
+1. **Only use tools when you have a timer duration**
+2. **Non-tool response format:**
+Thought: I do not need to use tools
+Final Answer: [direct response here]
+
+**Tool usage format:**
+Thought: [Parameter analysis]
+Action: [tool_name]
+Action Input: {{"timer": [value], "rest_time": [value|timer/2   ], "task_name": "[text]"}}
+
+**Current interaction**
+Question: {input}
+Thought: {agent_scratchpad}
+"""
+
+@lru_cache()
+def get_llm() -> ChatGroq:
+    return ChatGroq(
+        api_key=os.getenv('GROQ_API_KEY'),
+        model="openai/gpt-oss-120b",
+        temperature=0.4,
+        max_retries=3,
+        timeout=None,
+    )
+
+@tool
+async def create_pomodoro_tool(params: str) -> str:
+    '''
+    Create a pomodoro timer with parameters: timer (required, in minutes),
+    rest_time (optional, in minutes), and task_name (optional). 
+    '''
+    try:
+        # Parse the JSON string
+        params_dict = json.loads(params)
+    except json.JSONDecodeError:
+        return "Error: Invalid parameters format"
+    output = await start_pomodoro(params_dict, current_user_id.get())
+
+    calls = tool_calls.get(None)
+    if calls is not None and not output.startswith("Error"):
+        calls.append(params_dict)
+    return output
+
+def build_agent_executor(tools, llm=None):
+    agent = create_react_agent(
+        llm=llm or get_llm(),
+        tools=tools,
+        prompt=PromptTemplate(template=prompt_template, input_variables=["input", "agent_scratchpad", "tools", "tool_names"])
+    )
+
+    return AgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=True,
+        handle_parsing_errors=lambda _: "Oops, something went wrong, please rephrase your question.",
+        max_iterations=2,
+        early_stopping_method="generate" # Force generate response even if reaches iteration threshold
+    )
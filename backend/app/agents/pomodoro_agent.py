@@ -1,148 +1,205 @@
+import asyncio
+import logging
 import os
-import requests
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain.agents import create_react_agent, AgentExecutor
-from langchain.tools import tool
-from langchain.prompts import PromptTemplate
-from pydantic import BaseModel, Field
-import json
+from app.agents.admission import llm_admission
+from app.agents.intent_parser import parse_pomodoro_intent
+from app.agents.prompt_cache import PromptCache
+from app.core.deadline import detached, remaining
+from app.services.pomodoro_timer import PomodoroTimer
 
 load_dotenv()
 
-class PomodoroInput(BaseModel):
-    timer: float = Field(..., gt=0, le=1120, description="Work time in minutes"),
-    rest_time: float = Field(None, description="Rest duration in minutes (default: half of work time)")
-    task_name: str = Field(None, max_length=50, description="Task description for the pomodoro")
-
-prompt_template = """You are Cronos, an expert time management AI assistant. Your role is to recognize and process requests for timed work sessions.
-You will process this requests ONLY with the provided tools. 
-
-**Timed session triggers:** 
-- Synonyms: Pomodoro/pomodoro, Timer, Focus/focus session, Work session, Productive session/interval, timed session.
-- Explicit durations (e.g., "25min", "1 hour")
-
-**When detected:**
-1. Extract: 
-   - `timer` (required, in minutes)
-   - `rest_time` (optional, in minutes)
-   - `task_name` (optional)
-
-2. If missing timer duration: DO NOT use tools, respond politely and continue conversation.
-
-**Valid examples:**
-- "25min math": {{"timer": 25, "rest_time": 12.5, "task_name": "math"}}
-- "50min pomodoro with 10min break": {{"timer": 50, "rest_time": 10, "task_name": ""}}
-- "No duration specified": {{"timer": null, "rest_time": null, "task_name": "", "response": "[answer politely.]"}}
-
-**Available tools:**
-{tools}
-Tool names: {tool_names}
-
-**Critical rules:**
-1. **Only use tools when you have a timer duration**
-2. **Non-tool response format:**
-Thought: I do not need to use tools
-Final Answer: [direct response here]
-
-**Tool usage format:**
-Thought: [Parameter analysis]
-Action: [tool_name]
-Action Input: {{"timer": [value], "rest_time": [value|timer/2   ], "task_name": "[text]"}}
-
-**Current interaction**
-Question: {input}
-Thought: {agent_scratchpad}
-"""
-
-llm = ChatGroq(
-    api_key=os.getenv('GROQ_API_KEY'),
-    model="openai/gpt-oss-120b",
-    temperature=0.4,
-    max_retries=3,
-    timeout=None,
+# How many requests each path answered: "fast" (intent parser), "cache" (prompt cache) or "llm" (ReAct agent)
+path_counts = Counter()
+
+# The agent is shared by every request; the caller's identity travels as call context
+current_user_id: ContextVar[str] = ContextVar("current_user_id")
+# Parameters the tool was called with during the current request, fed to the prompt cache
+tool_calls: ContextVar[list] = ContextVar("tool_calls")
+
+# A tool call with less of the request budget left than this does not start a pomodoro
+AGENT_TOOL_MIN_BUDGET = float(os.getenv("AGENT_TOOL_MIN_BUDGET", "1.0"))
+
+prompt_cache = PromptCache(
+    maxsize=int(os.getenv("AGENT_PROMPT_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("AGENT_PROMPT_CACHE_TTL", str(24 * 3600))),
+    path=os.getenv("AGENT_PROMPT_CACHE_PATH") or None,
 )
 
 # Tools
 # Pomodoro tools
 # Start a pomodoro
-def make_create_pomodoro_tool(token: str):
-    @tool
-    def create_pomodoro_tool(params: str) -> str:
-        '''
-        Create a pomodoro timer with parameters: timer (required, in minutes),
-        rest_time (optional, in minutes), and task_name (optional). 
-        '''
-        try:
-            # Parse the JSON string
-            params_dict = json.loads(params)
-            
-            # Validate required fields
-            timer = params_dict.get('timer')
-            if timer is None:
-                return "Error: Missing timer duration"
-            
-            timer = float(timer) * 60.0
-
-            if timer <= 0:
-                return "Error: Invalid duration"
-                
-            rest_time = params_dict.get('rest_time') 
-            rest_time = float(rest_time * 60) if rest_time is not None else timer / 2.0
-            task_name = params_dict.get('task_name', 'General')[:50]
-            
-            # Pomodoro endpoint call
-            response = requests.post(
-                "http://localhost:8000/pomodoro/",
-                json={
-                    "timer": timer,
-                    "rest_time": rest_time,
-                    "task_name": task_name
-                },
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=10 
-            )
-            
-            response.raise_for_status()
-            data = response.json()
+async def start_pomodoro(params: dict, user_id: str) -> str:
+    '''
+    Validate tool parameters (minutes) and create the pomodoro in-process. Once started,
+    the creation is shielded from request cancellation so it is never left half done, and
+    runs without the request's deadline so its statements are not cut short either.
+    '''
+    try:
+        # Validate required fields
+        timer = params.get('timer')
+        if timer is None:
+            return "Error: Missing timer duration"
+        
+        timer = round(float(timer) * 60.0)
+
+        if timer <= 0:
+            return "Error: Invalid duration"
             
-            return f"Pomodoro started: {task_name} ({data.get('timer', timer)/60.0} min work, {data.get('rest_time', rest_time)/60.0} min rest)"
+        rest_time = params.get('rest_time') 
+        rest_time = round(float(rest_time) * 60) if rest_time is not None else timer // 2
+        task_name = (params.get('task_name') or 'General')[:50]
+        
+        left = remaining()
+        if left is not None and left < AGENT_TOOL_MIN_BUDGET:
+            return "Error: Not enough time left to start the pomodoro"
+
+        service = PomodoroTimer(user_id=user_id)
+        creation = service.create_pomodoro(rest_time=rest_time, task_name=task_name, timer=timer)
+        pomodoro = await asyncio.shield(asyncio.get_running_loop().create_task(creation, context=detached()))
         
-        except json.JSONDecodeError:
-            return "Error: Invalid parameters format"
-        except Exception as e:
-            return f"Error: {str(e)[:100]}"
-
-    return create_pomodoro_tool
-
-async def process_user_message(msg: str, token: str) -> str:
-    tools = [make_create_pomodoro_tool(token)]
-    agent = create_react_agent(
-        llm=llm,
-        tools=tools,
-        prompt=PromptTemplate(template=prompt_template, input_variables=["input", "agent_scratchpad", "tools", "tool_names"])
-    )
-
-    agent_executor = AgentExecutor(
-        agent=agent,
-        tools=tools,
-        verbose=True,
-        handle_parsing_errors=lambda _: "Oops, something went wrong, please rephrase your question.",
-        max_iterations=2,
-        early_stopping_method="generate" # Force generate response even if reaches iteration threshold
-    )
-
-    result = await agent_executor.ainvoke({"input": msg, "token": token})
+        return f"Pomodoro started: {task_name} ({pomodoro.timer/60.0} min work, {pomodoro.rest_time/60.0} min rest)"
+    
+    except Exception as e:
+        return f"Error: {str(e)[:100]}"
+
+logger = logging.getLogger(__name__)
+
+# The LangChain executor (app.agents.llm_agent) is built on first use, or by warm_agent once
+# the server is up, so importing the API does not pay for langchain and the Groq client.
+agent_executor = None
+_agent_lock = threading.RLock()
+
+def init_agent(llm=None):
+    '''Build the agent graph (importing the LLM stack); `llm` defaults to ChatGroq'''
+    global agent_executor
+    from app.agents.llm_agent import build_agent_executor, create_pomodoro_tool
+    with _agent_lock:
+        agent_executor = build_agent_executor([create_pomodoro_tool], llm=llm)
+    return agent_executor
+
+async def get_agent_executor():
+    '''The shared executor, built off the event loop the first time it is needed'''
+    if agent_executor is not None:
+        return agent_executor
+    return await asyncio.to_thread(_init_once)
+
+def _init_once():
+    with _agent_lock:
+        if agent_executor is None:
+            init_agent()
+        return agent_executor
+
+async def warm_agent():
+    '''Load the LLM stack in the background so the first LLM request does not pay for it'''
+    try:
+        await get_agent_executor()
+    except Exception:
+        logger.exception("Agent warm-up failed, it will be retried on the first LLM request")
+
+async def _answer_without_llm(msg: str, user_id: str) -> Optional[dict]:
+    '''Fast path and prompt cache; None when the prompt needs the LLM'''
+    intent = parse_pomodoro_intent(msg)
+    if intent is not None:
+        path_counts["fast"] += 1
+        output = await start_pomodoro(intent.model_dump(), user_id)
+        return {"output": output, "path": "fast"}
+
+    params = await prompt_cache.get(msg)
+    if params is not None:
+        path_counts["cache"] += 1
+        output = await start_pomodoro(params, user_id)
+        return {"output": output, "path": "cache"}
+    return None
+
+async def process_user_message(msg: str, user_id: str) -> dict:
+    '''
+    Answer a prompt, returning the reply and which path ("fast", "cache" or "llm") produced it.
+    LLM calls go through `llm_admission`, which raises AgentBusyError when it is full.
+    '''
+    answer = await _answer_without_llm(msg, user_id)
+    if answer is not None:
+        return answer
+
+    async with llm_admission.slot(user_id, msg):
+        path_counts["llm"] += 1
+        executor = await get_agent_executor()
+
+        user_token = current_user_id.set(user_id)
+        calls_token = tool_calls.set([])
+        try:
+            result = await executor.ainvoke({"input": msg})
+            calls = tool_calls.get()
+            # Only unambiguous extractions are reused: exactly one successful tool call
+            if len(calls) == 1:
+                await prompt_cache.set(msg, calls[0])
+        finally:
+            tool_calls.reset(calls_token)
+            current_user_id.reset(user_token)
     # Ensure answer is text
     if isinstance(result, dict):
         if "output" in result:
-            return result["output"]
+            output = result["output"]
         else:
-            return str(result)
+            output = str(result)
     elif isinstance(result, str):
-        return result
+        output = result
     else:
-        return str(result)
-
-#for chunk in llm.stream(messages): # ? "stream" AI response
-    #print(chunk.text(), end="")
\ No newline at end of file
+        output = str(result)
+    return {"output": output, "path": "llm"}
+
+async def stream_user_message(msg: str, user_id: str):
+    '''
+    Same as process_user_message, but yields events as the agent works:
+    `admitted` once an LLM slot is free, `thought` / `final_token` LLM tokens, `tool_start`,
+    `tool_result` and a closing `final`. Closing the generator (client disconnect) cancels
+    the in-flight LLM call. Raises AgentBusyError instead of `admitted` when no slot is available.
+    '''
+    answer = await _answer_without_llm(msg, user_id)
+    if answer is not None:
+        yield {"type": "final", **answer}
+        return
+
+    async with llm_admission.slot(user_id, msg) as waited:
+        # Yielded before the call context is set, so a caller may pull this first event from another task
+        yield {"type": "admitted", "waited": round(waited, 3)}
+        path_counts["llm"] += 1
+        executor = await get_agent_executor()
+
+        user_token = current_user_id.set(user_id)
+        calls_token = tool_calls.set([])
+        events = executor.astream_events({"input": msg}, version="v2")
+        text = {}  # LLM output so far, per run, to tell reasoning from the final answer
+        try:
+            async for event in events:
+                kind = event["event"]
+                if kind == "on_chat_model_stream":
+                    token = event["data"]["chunk"].content
+                    if not token:
+                        continue
+                    before = text.get(event["run_id"], "")
+                    text[event["run_id"]] = before + token
+                    yield {"type": "final_token" if "Final Answer:" in before else "thought", "token": token}
+                elif kind == "on_chain_stream" and not event["parent_ids"]:
+                    # The executor announces its actions before running them, with the raw tool input
+                    for action in event["data"]["chunk"].get("actions", []):
+                        yield {"type": "tool_start", "tool": action.tool, "input": action.tool_input}
+                elif kind == "on_tool_end":
+                    yield {"type": "tool_result", "tool": event["name"], "output": str(event["data"].get("output"))}
+                elif kind == "on_chain_end" and not event["parent_ids"]:
+                    output = event["data"].get("output")
+                    if isinstance(output, dict):
+                        output = output.get("output", str(output))
+                    calls = tool_calls.get()
+                    if len(calls) == 1:
+                        await prompt_cache.set(msg, calls[0])
+                    yield {"type": "final", "output": str(output), "path": "llm"}
+        finally:
+            await events.aclose()
+            tool_calls.reset(calls_token)
+            current_user_id.reset(user_token)
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+from app.core.cache import TTLCache
+
+# Caches the *tool parameters* the LLM extracted for a prompt, never the reply.
+# The tool call still runs for every user, so a hit is safe to share across users.
+
+_UNITS = [
+    (re.compile(r"(\d)\s*(?:minutes|minute|mins|min|m)\b"), r"\1 min"),
+    (re.compile(r"(\d)\s*(?:hours|hour|hrs|hr|h)\b"), r"\1 h"),
+]
+_PUNCTUATION_RE = re.compile(r"[\s.,!;:]+$")
+
+def normalize_prompt(text: str) -> str:
+    '''"25min Study!" and "25 minutes  study" map to the same key'''
+    text = " ".join(text.lower().split())
+    for pattern, replacement in _UNITS:
+        text = pattern.sub(replacement, text)
+    return _PUNCTUATION_RE.sub("", text)
+
+
+class SqlitePromptStore:
+    '''
+    Optional on-disk backend so cached extractions survive restarts. Its calls block
+    (disk reads, commits, lock waits), so PromptCache runs them in a worker thread.
+    '''
+
+    def __init__(self, path: str, maxsize: int):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS prompt_cache (key TEXT PRIMARY KEY, params TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_prompt_cache_expires_at ON prompt_cache (expires_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[tuple[dict, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT params, expires_at FROM prompt_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, params: dict, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO prompt_cache (key, params, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(params), expires_at),
+            )
+            # Expired rows first, then the ones closest to expiring, down to the size cap
+            self._conn.execute("DELETE FROM prompt_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn.execute(
+                "DELETE FROM prompt_cache WHERE key IN (SELECT key FROM prompt_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+class PromptCache:
+    def __init__(self, maxsize: int=5000, ttl: float=24 * 3600, path: Optional[str]=None):
+        self.ttl = ttl
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.store = SqlitePromptStore(path, maxsize) if path else None
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, prompt: str) -> Optional[dict]:
+        key = normalize_prompt(prompt)
+        params = self.memory.get(key)
+        if params is None and self.store is not None:
+            found = await asyncio.to_thread(self.store.get, key)
+            if found is not None:
+                params, expires_at = found
+                self.memory.set(key, params, expires_at=expires_at)
+
+        if params is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(params)
+
+    async def set(self, prompt: str, params: dict):
+        key = normalize_prompt(prompt)
+        expires_at = time.time() + self.ttl
+        self.memory.set(key, dict(params), expires_at=expires_at)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.set, key, dict(params), expires_at)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.memory),
+            "maxsize": self.memory.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "disk": self.store is not None,
+        }
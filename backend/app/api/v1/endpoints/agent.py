@@ -1,24 +1,96 @@
-from fastapi import APIRouter, Header, HTTPException
-from app.agents.pomodoro_agent import process_user_message
+import asyncio
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from app.agents.admission import AGENT_LLM_RETRY_AFTER, AgentBusyError
+from app.agents.pomodoro_agent import process_user_message, stream_user_message
+from app.core.auth import get_current_user_id
+from app.core.deadline import DEADLINE_HEADER, ClientDisconnected, DeadlineExceeded, cancellations, deadline, request_budget, until_disconnected
 from pydantic import BaseModel
+import json
 
 router = APIRouter()
 
 class PromptInput(BaseModel):
     prompt: str
 
-@router.post("/")
-async def agent_endpoint(data: PromptInput, authorization: str = Header(...)):
-    if not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid token")
-    token = authorization.split(" ")[1]
+def busy_exception(e: AgentBusyError) -> HTTPException:
+    '''429 when the user already has requests queued, 503 when the whole process is saturated'''
+    code = status.HTTP_429_TOO_MANY_REQUESTS if e.scope == "user" else status.HTTP_503_SERVICE_UNAVAILABLE
+    return HTTPException(status_code=code, detail=str(e), headers={"Retry-After": str(AGENT_LLM_RETRY_AFTER)})
+
+def timeout_body(e: DeadlineExceeded) -> dict:
+    return {"error": "deadline_exceeded", "message": str(e), "budget": e.budget, "elapsed": round(e.elapsed, 3)}
+
+def error_event(e: Exception) -> dict:
+    return {"type": "error", "detail": f'An error ocurred whille processing your message: {str(e)}'}
 
+@router.post("/")
+async def agent_endpoint(data: PromptInput, request: Request, user_id: str = Depends(get_current_user_id)):
+    '''
+    Answer within the request budget (DEADLINE_HEADER or AGENT_REQUEST_TIMEOUT): past it, or
+    when the client disconnects, the LLM call and everything under it are cancelled
+    '''
     try:
-        ans = await process_user_message(data.prompt, token)
+        async with deadline(request_budget(request.headers.get(DEADLINE_HEADER))):
+            ans = await until_disconnected(request, process_user_message(data.prompt, user_id))
+
+        if not ans["output"]:
+            return {"output": "Sorry, I couldn't generate an answer in this moment", "path": ans["path"]}
 
-        if ans is None or ans == "":
-            return {"output": "Sorry, I couldn't generate an answer in this moment"}
-        
-        return {"output": ans}  
+        return ans
+    except AgentBusyError as e:
+        raise busy_exception(e)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=timeout_body(e))
+    except ClientDisconnected:
+        return Response(status_code=499)  # nobody is listening; recorded as such in the request metrics
     except Exception as e:
-        return {"output": f'An error ocurred whille processing your message: {str(e)}'}
\ No newline at end of file
+        return {"output": f'An error ocurred whille processing your message: {str(e)}'}
+
+@router.post("/stream")
+async def agent_stream_endpoint(data: PromptInput, request: Request, user_id: str = Depends(get_current_user_id)):
+    '''
+    Newline-delimited JSON events, flushed as soon as the agent produces them. The request
+    budget covers the whole stream; running out of it ends the stream with a `timeout` event.
+    '''
+    budget = request_budget(request.headers.get(DEADLINE_HEADER))
+    start = time.monotonic()
+    events = stream_user_message(data.prompt, user_id)
+    # Wait for the first event before sending headers, so a full LLM queue is still a 429/503
+    try:
+        async with deadline(budget, start):
+            first = await events.__anext__()
+    except AgentBusyError as e:
+        raise busy_exception(e)
+    except DeadlineExceeded as e:
+        await events.aclose()
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=timeout_body(e))
+    except StopAsyncIteration:
+        first = None
+    except Exception as e:
+        first = error_event(e)
+
+    async def ndjson():
+        try:
+            if first is not None:
+                yield json.dumps(first) + "\n"
+            while True:
+                # The budget bounds pulling each event, never the `yield` below: a timeout while
+                # the client is reading would otherwise tear the stream down at the yield
+                async with deadline(budget, start):
+                    event = await anext(events, None)
+                if event is None:
+                    break
+                yield json.dumps(event) + "\n"
+        except DeadlineExceeded as e:
+            yield json.dumps({"type": "timeout", **timeout_body(e)}) + "\n"
+        except (asyncio.CancelledError, GeneratorExit):
+            cancellations["disconnect"] += 1
+            raise
+        except Exception as e:
+            yield json.dumps(error_event(e)) + "\n"
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
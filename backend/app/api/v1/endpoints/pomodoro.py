@@ -1,62 +1,188 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.db.session import get_db
 from app.services.pomodoro_timer import PomodoroTimer
-from app.schemas.pomodoro import PomodoroCreate, PomodoroResponse, PomodoroUpdate
+from app.services.runner_registry import TimerCapacityError, CAPACITY_RETRY_AFTER
+from app.schemas.pomodoro import PomodoroCreate, PomodoroResponse, PomodoroUpdate, PomodoroExtend, PomodoroPage, PomodoroBatchCreate
 from app.db.models.pomodoro import Pomodoro
+from app.crud.crud_pomodoro import get_pomodoros
 from app.core.auth import get_current_user_id
+from app.services.event_hub import event_hub, format_sse, TERMINAL_EVENTS
+from app.services.bulk_io import stream_export, MEDIA_TYPES
+from datetime import datetime
+from typing import Literal, Optional
+import asyncio
+
+SSE_KEEPALIVE_SECONDS = 15
+EXPORT_COLUMNS = ["id", "task_name", "timer", "rest_time", "worked_time", "pause_count", "status", "completed", "start_time", "end_time"]
 
 router = APIRouter(tags=['Pomodoros'])
 @router.options("/")
 async def options_handler():
     return
 
+def capacity_exception(e: TimerCapacityError) -> HTTPException:
+    '''429 when the user is at their cap, 503 when the whole process is'''
+    code = status.HTTP_429_TOO_MANY_REQUESTS if e.scope == "user" else status.HTTP_503_SERVICE_UNAVAILABLE
+    return HTTPException(status_code=code, detail=str(e), headers={"Retry-After": str(CAPACITY_RETRY_AFTER)})
+
 @router.post('/', response_model=PomodoroResponse, status_code=status.HTTP_201_CREATED)
-async def start_pomodoro(data: PomodoroCreate, background_task: BackgroundTasks, db: AsyncSession = Depends(get_db), user_id: str = Depends(get_current_user_id)):
+async def start_pomodoro(data: PomodoroCreate, user_id: str = Depends(get_current_user_id)):
     service = PomodoroTimer(user_id=user_id)
-    pomodoro = await service.create_pomodoro(rest_time=data.rest_time, task_name=data.task_name, timer=data.timer)
-    
-    background_task.add_task(service.run_pomodoro, pomodoro.id)
+    try:
+        return await service.create_pomodoro(rest_time=data.rest_time, task_name=data.task_name, timer=data.timer,
+                                             start_at=data.start_at, cycles=data.cycles)
+    except TimerCapacityError as e:
+        raise capacity_exception(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post('/batch', response_model=list[PomodoroResponse], status_code=status.HTTP_201_CREATED)
+async def start_pomodoros(items: PomodoroBatchCreate, user_id: str = Depends(get_current_user_id)):
+    '''Create every pomodoro of the list in one transaction; items with a future `start_at` start then'''
+    service = PomodoroTimer(user_id=user_id)
+    try:
+        return await service.create_pomodoros([item.model_dump(include={"timer", "rest_time", "task_name", "cycles", "start_at"}) for item in items])
+    except TimerCapacityError as e:
+        raise capacity_exception(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/history", response_model=PomodoroPage)
+async def pomodoro_history(limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None, status: Optional[str] = None,
+                           start: Optional[datetime] = None, end: Optional[datetime] = None,
+                           db: AsyncSession = Depends(get_db), user_id: str = Depends(get_current_user_id)):
+    '''Newest first; pass `next_cursor` back as `cursor` for the following page'''
+    try:
+        items, next_cursor = await get_pomodoros(db, user_id, limit=limit, cursor=cursor, status=status, start=start, end=end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/export")
+async def export_pomodoros(format: Literal["csv", "ndjson"] = "ndjson", user_id: str = Depends(get_current_user_id)):
+    '''The user's whole pomodoro history, streamed oldest first'''
+    query = (
+        select(*(getattr(Pomodoro, c) for c in EXPORT_COLUMNS))
+        .where(Pomodoro.user_id == user_id)
+        .order_by(Pomodoro.start_time, Pomodoro.id)
+    )
+    return StreamingResponse(
+        stream_export(query, EXPORT_COLUMNS, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="pomodoros.{format}"'},
+    )
+
+@router.get("/{pomodoro_id}", response_model=PomodoroResponse)
+async def get_pomodoro(pomodoro_id: int, db: AsyncSession = Depends(get_db), user_id: str = Depends(get_current_user_id)):
+    result = await db.execute(select(Pomodoro).where(Pomodoro.id == pomodoro_id, Pomodoro.user_id == user_id))
+    pomodoro = result.scalar_one_or_none()
+
+    if not pomodoro:
+        raise HTTPException(status_code=404, detail="Pomodoro not found")
     return pomodoro
 
-@router.patch("/{pomodoro_id}", response_model=PomodoroResponse)
-async def update_pomodoro(pomodoro_id: str, data: PomodoroUpdate, db: AsyncSession = Depends(get_db), user_id: str = Depends(get_current_user_id)):
+@router.get("/{pomodoro_id}/events")
+async def pomodoro_events(pomodoro_id: int, request: Request, db: AsyncSession = Depends(get_db), user_id: str = Depends(get_current_user_id)):
+    '''Server-Sent Events stream of timer transitions, starting with the current state'''
+    # Subscribe before reading the row so no transition falls in between
+    queue = event_hub.subscribe(pomodoro_id)
     result = await db.execute(select(Pomodoro).where(Pomodoro.id == pomodoro_id, Pomodoro.user_id == user_id))
     pomodoro = result.scalar_one_or_none()
 
     if not pomodoro:
+        event_hub.unsubscribe(pomodoro_id, queue)
         raise HTTPException(status_code=404, detail="Pomodoro not found")
-    
-    for field, value in data.model_dump(exclude_unset=True).items():
-        setattr(pomodoro, field, value)
-    
-    await db.commit() 
-    await db.refresh(pomodoro)
-    return pomodoro 
+
+    async def stream():
+        try:
+            yield format_sse(PomodoroTimer.snapshot("snapshot", pomodoro))
+            if pomodoro.status in TERMINAL_EVENTS:
+                return
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+                if event["event"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            event_hub.unsubscribe(pomodoro_id, queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.patch("/{pomodoro_id}", response_model=PomodoroResponse)
+async def update_pomodoro(pomodoro_id: str, data: PomodoroUpdate, version: Optional[int] = None, user_id: str = Depends(get_current_user_id)):
+    '''Pass the `version` you read to have the update rejected (409) if the pomodoro changed since'''
+    service = PomodoroTimer(user_id=user_id)
+    try:
+        pomodoro = await service.update(pomodoro_id=pomodoro_id, user_id=user_id, values=data.model_dump(exclude_none=True),
+                                        expected_version=version)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not pomodoro:
+        raise HTTPException(status_code=404, detail="Pomodoro not found")
+    return pomodoro
 
 @router.post('/{pomodoro_id}/pause', response_model=PomodoroResponse)
-async def pause_pomodoro(pomodoro_id: str, user_id: str = Depends(get_current_user_id)):
+async def pause_pomodoro(pomodoro_id: str, version: Optional[int] = None, user_id: str = Depends(get_current_user_id)):
     service = PomodoroTimer(user_id=user_id)
-    pomodoro = await service.pause(pomodoro_id=pomodoro_id, user_id=user_id)
+    try:
+        pomodoro = await service.pause(pomodoro_id=pomodoro_id, user_id=user_id, expected_version=version)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not pomodoro:
         raise HTTPException(status_code=404, detail="Could not found pomodoro or user is not authorized")
     
     return pomodoro
 
 @router.post('/{pomodoro_id}/stop', response_model=PomodoroResponse)
-async def stop_pomodoro(pomodoro_id: str, user_id: str = Depends(get_current_user_id)):
+async def stop_pomodoro(pomodoro_id: str, version: Optional[int] = None, user_id: str = Depends(get_current_user_id)):
     service = PomodoroTimer(user_id=user_id)
-    pomodoro = await service.stop(pomodoro_id=pomodoro_id, user_id=user_id)
+    try:
+        pomodoro = await service.stop(pomodoro_id=pomodoro_id, user_id=user_id, expected_version=version)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not pomodoro:
         raise HTTPException(status_code=404, detail="Could not found pomodoro or user is not authorized")
     return pomodoro
 
 @router.post("/{pomodoro_id}/resume", response_model=PomodoroResponse)
-async def resume_pomodoro(pomodoro_id: str, user_id: str = Depends(get_current_user_id)):
+async def resume_pomodoro(pomodoro_id: str, version: Optional[int] = None, user_id: str = Depends(get_current_user_id)):
+    service = PomodoroTimer(user_id=user_id)
+    try:
+        pomodoro = await service.resume(pomodoro_id=pomodoro_id, user_id=user_id, expected_version=version)
+    except TimerCapacityError as e:
+        raise capacity_exception(e)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not pomodoro:
+        raise HTTPException(status_code=404, detail="Could not found pomodoro or user is not authorized")
+    return pomodoro
+
+@router.post("/{pomodoro_id}/extend", response_model=PomodoroResponse)
+async def extend_pomodoro(pomodoro_id: str, data: PomodoroExtend, version: Optional[int] = None, user_id: str = Depends(get_current_user_id)):
+    service = PomodoroTimer(user_id=user_id)
+    try:
+        pomodoro = await service.extend(pomodoro_id=pomodoro_id, user_id=user_id, add_time=data.add_time, expected_version=version)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not pomodoro:
+        raise HTTPException(status_code=404, detail="Could not found pomodoro or user is not authorized")
+    return pomodoro
+
+@router.delete("/{pomodoro_id}/cycles", response_model=PomodoroResponse)
+async def cancel_pomodoro_cycles(pomodoro_id: str, version: Optional[int] = None, user_id: str = Depends(get_current_user_id)):
+    '''Cancel the work sessions still to come, also during the rest before the next one'''
     service = PomodoroTimer(user_id=user_id)
-    pomodoro = await service.resume(pomodoro_id=pomodoro_id, user_id=user_id)
+    try:
+        pomodoro = await service.cancel_cycles(pomodoro_id=pomodoro_id, user_id=user_id, expected_version=version)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not pomodoro:
         raise HTTPException(status_code=404, detail="Could not found pomodoro or user is not authorized")
     return pomodoro
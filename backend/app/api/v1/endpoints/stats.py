@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal, Optional
+from datetime import date, timedelta
+from app.db.session import get_db
+from app.services.stats_calculator import get_focus_stats, get_study_stats, get_focus_analytics
+from app.schemas.stats import FocusStats, StudyStats, FocusAnalytics
+from app.core.auth import get_current_user_id
+
+DEFAULT_RANGE_DAYS = 30
+
+router = APIRouter(tags=['Stats'])
+
+def _date_range(start: Optional[date], end: Optional[date]):
+    end = end or date.today()
+    start = start or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return start, end
+
+@router.get('/focus', response_model=list[FocusStats])
+async def focus_stats(period: Literal["day", "week"]="day", start: Optional[date]=None, end: Optional[date]=None,
+                      db: AsyncSession = Depends(get_db), user_id: str = Depends(get_current_user_id)):
+    '''Focus time and completed/failed pomodoros per period, read from the rollups'''
+    start, end = _date_range(start, end)
+    return await get_focus_stats(db, user_id, period, start, end)
+
+@router.get('/study', response_model=list[StudyStats])
+async def study_stats(period: Literal["day", "week"]="day", start: Optional[date]=None, end: Optional[date]=None,
+                      topic: Optional[str]=Query(None, max_length=75),
+                      db: AsyncSession = Depends(get_db), user_id: str = Depends(get_current_user_id)):
+    '''Study minutes per topic and period, read from the rollups'''
+    start, end = _date_range(start, end)
+    return await get_study_stats(db, user_id, period, start, end, topic)
+
+@router.get('/analytics', response_model=FocusAnalytics)
+async def focus_analytics(db: AsyncSession = Depends(get_db), user_id: str = Depends(get_current_user_id)):
+    '''Streaks, weekday x hour heatmap, completion rate by timer length and pause frequency'''
+    return await get_focus_analytics(db, user_id)
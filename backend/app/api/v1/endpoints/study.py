@@ -1,9 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.services.study_service import StudyService
-from app.schemas.study import StudyCreate, StudyResponse
+from app.schemas.study import StudyCreate, StudyResponse, StudyPage, StudyImportReport, StudyBatchCreate
+from app.db.models.study import Study
+from app.services.bulk_io import stream_export, MEDIA_TYPES
 from app.core.auth import get_current_user_id
+from datetime import datetime
+from typing import Literal, Optional
+
+EXPORT_COLUMNS = ["id", "topic", "study_time", "notes", "timestamp"]
 
 router = APIRouter(tags=['Study'])
 
@@ -13,8 +21,46 @@ async def create_study_record(data: StudyCreate, db: AsyncSession = Depends(get_
     study_record = await service.create_study_record(data)
     return study_record
 
-'''@router.get('/', response_model=list[StudyResponse])
-async def get_study_records(db: AsyncSession = Depends(get_db), user_id: str = Depends(get_current_user_id)):
-    service = StudyService(db, user_email=email)
-    study_records = await service.get_study_records()
-    return study_records, {"message": "Study records retrieved successfully"}'''
+@router.post('/batch', response_model=list[StudyResponse], status_code=status.HTTP_201_CREATED)
+async def create_study_records(items: StudyBatchCreate, db: AsyncSession = Depends(get_db), user_id: str = Depends(get_current_user_id)):
+    '''Insert every record of the list in one transaction'''
+    service = StudyService(db, user_id)
+    return await service.create_study_records(items)
+
+@router.get('/', response_model=StudyPage)
+async def get_study_records(limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None, topic: Optional[str] = None,
+                            start: Optional[datetime] = None, end: Optional[datetime] = None,
+                            db: AsyncSession = Depends(get_db), user_id: str = Depends(get_current_user_id)):
+    '''Newest first; pass `next_cursor` back as `cursor` for the following page'''
+    service = StudyService(db, user_id)
+    try:
+        items, next_cursor = await service.get_study_records(limit=limit, cursor=cursor, topic=topic, start=start, end=end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.post('/import', response_model=StudyImportReport)
+async def import_study_records(request: Request, format: Optional[Literal["csv", "ndjson"]] = None,
+                               db: AsyncSession = Depends(get_db), user_id: str = Depends(get_current_user_id)):
+    '''Stream a CSV (with header) or NDJSON body of study records; the format defaults from Content-Type'''
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+
+    service = StudyService(db, user_id)
+    report = await service.import_records(request.stream(), format)
+    return report.as_dict()
+
+@router.get('/export')
+async def export_study_records(format: Literal["csv", "ndjson"] = "ndjson", user_id: str = Depends(get_current_user_id)):
+    '''Every study record of the user, streamed oldest first'''
+    query = (
+        select(*(getattr(Study, c) for c in EXPORT_COLUMNS))
+        .where(Study.user_id == user_id)
+        .order_by(Study.timestamp, Study.id)
+    )
+    return StreamingResponse(
+        stream_export(query, EXPORT_COLUMNS, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="study_records.{format}"'},
+    )
@@ -1,6 +1,9 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError, ExpiredSignatureError
+from app.core.cache import TTLCache
+from app.core.supabase import supabase_users
+import hashlib
 import os
 
 security = HTTPBearer()
@@ -9,14 +12,47 @@ SUPABASE_JWK_SECRET=os.getenv("SUPABASE_JWT_SECRET")
 if not SUPABASE_JWK_SECRET:
     raise RuntimeError("SUPABASE_JWK_SECRET must be set on env variables.")
 
-async def get_current_user_id(credentials: HTTPAuthorizationCredentials=Depends(security)):
-    token = credentials.credentials
+# Ask Supabase for the email when a token does not carry it as a claim
+SUPABASE_USER_FALLBACK = os.getenv("SUPABASE_USER_FALLBACK", "true").lower() == "true"
+
+# Verified claims, keyed by token hash and kept until the token's own `exp`
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+token_cache = TTLCache(maxsize=AUTH_TOKEN_CACHE_SIZE)
+
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+def verify_token(token: str) -> dict:
+    '''Verify a Supabase JWT and return the claims the API uses (`sub`, `email`)'''
+    key = _token_key(token)
+
+    claims = token_cache.get(key)
+    if claims is not None:
+        return claims
 
     try:
         payload = jwt.decode(token, SUPABASE_JWK_SECRET, algorithms=['HS256'], options={"verify_aud": False})
-        return payload['sub']
     except ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except JWTError as e:
         print("JWT error:", str(e))
         raise HTTPException(status_code=401, detail="Invalid token")
+
+    claims = {"sub": payload['sub'], "email": payload.get('email')}
+    # Tokens without `exp` never expire on their own, so they are not cached
+    if payload.get('exp') is not None:
+        token_cache.set(key, claims, expires_at=float(payload['exp']))
+    return claims
+
+async def get_current_user_id(credentials: HTTPAuthorizationCredentials=Depends(security)):
+    return verify_token(credentials.credentials)['sub']
+
+async def get_current_user_email(credentials: HTTPAuthorizationCredentials=Depends(security)):
+    token = credentials.credentials
+    email = verify_token(token).get('email')
+
+    if not email and SUPABASE_USER_FALLBACK:
+        email = await supabase_users.get_email(token)
+    if not email:
+        raise HTTPException(status_code=400, detail="Email not found in token claims")
+    return email
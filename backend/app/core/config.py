@@ -9,6 +9,16 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     DEBUG: bool = True
     DATABASE_URL: str
+
+    # Database engine profile
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+    # asyncpg prepared statements per connection; 0 for PgBouncer in transaction mode
+    DB_STATEMENT_CACHE_SIZE: int = 100
     REDIS_URL: str = "redis://localhost:6379"
 
     class Config:
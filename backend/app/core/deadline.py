@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import Context, ContextVar, copy_context
+from typing import Awaitable, Optional
+from starlette.requests import Request
+
+AGENT_REQUEST_TIMEOUT = float(os.getenv("AGENT_REQUEST_TIMEOUT", "30"))  # seconds an agent request may take by default
+AGENT_MAX_REQUEST_TIMEOUT = float(os.getenv("AGENT_MAX_REQUEST_TIMEOUT", "120"))  # the most a client may ask for
+DEADLINE_HEADER = "X-Request-Timeout"  # seconds, sent by clients that give up sooner
+
+# time.monotonic() by which the current request has to be answered, read by the
+# agent's tool and by database sessions (statement_timeout)
+current_deadline: ContextVar[Optional[float]] = ContextVar("current_deadline", default=None)
+
+# Work cancelled before it finished: "overrun" (the budget ran out) or "disconnect" (the client left)
+cancellations = Counter()
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, budget: float, elapsed: float):
+        self.budget = budget
+        self.elapsed = elapsed
+        super().__init__(f"Request did not finish within its {budget:g}s budget.")
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def remaining() -> Optional[float]:
+    '''Seconds left in the current request's budget, None outside of one'''
+    deadline = current_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def detached() -> Context:
+    '''
+    A copy of the current context without the request's deadline, for tasks that outlive the
+    request (`create_task(..., context=detached())`): their sessions get no statement_timeout
+    '''
+    context = copy_context()
+    context.run(current_deadline.set, None)
+    return context
+
+
+def request_budget(header: Optional[str]) -> float:
+    '''The budget a client asked for in DEADLINE_HEADER, capped; the default if absent or invalid'''
+    try:
+        budget = float(header) if header else AGENT_REQUEST_TIMEOUT
+    except ValueError:
+        budget = AGENT_REQUEST_TIMEOUT
+    if not budget > 0:
+        budget = AGENT_REQUEST_TIMEOUT
+    return min(budget, AGENT_MAX_REQUEST_TIMEOUT)
+
+
+@asynccontextmanager
+async def deadline(budget: float, start: Optional[float]=None):
+    '''
+    Run the block within `budget` seconds from `start` (a time.monotonic() value, default
+    now), publishing the deadline to `current_deadline`. When it runs out the block is
+    cancelled and DeadlineExceeded raised. A nested deadline can only shorten the outer one.
+    '''
+    start = time.monotonic() if start is None else start
+    outer = current_deadline.get()
+    when = start + budget if outer is None else min(outer, start + budget)
+    if when <= time.monotonic():
+        # Already spent: a block that would not suspend (a buffered event) must not slip through
+        cancellations["overrun"] += 1
+        raise DeadlineExceeded(budget, time.monotonic() - start)
+    token = current_deadline.set(when)
+    scope = asyncio.timeout(when - time.monotonic())
+    try:
+        async with scope:
+            yield
+    except TimeoutError:
+        if not scope.expired():
+            raise
+        cancellations["overrun"] += 1
+        raise DeadlineExceeded(budget, time.monotonic() - start) from None
+    finally:
+        current_deadline.reset(token)
+
+
+async def until_disconnected(request: Request, work: Awaitable):
+    '''Await `work`, cancelling it and raising ClientDisconnected if the client goes away first'''
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_disconnected(request))
+    try:
+        await asyncio.wait((task, watcher), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            # Deadline or disconnect: stop the work and let it clean up before answering
+            task.cancel()
+            await asyncio.wait((task,))
+    if not task.cancelled():
+        return task.result()
+    cancellations["disconnect"] += 1
+    raise ClientDisconnected()
+
+
+async def _disconnected(request: Request):
+    # The body has been read by now, so the next message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
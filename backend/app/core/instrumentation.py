@@ -0,0 +1,187 @@
+import contextvars
+import logging
+import os
+import time
+from collections import Counter as StatementCounter
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.agents.admission import PRIORITIES, llm_admission
+from app.agents.pomodoro_agent import prompt_cache
+from app.core.auth import token_cache
+from app.core.deadline import cancellations
+from app.core.metrics import registry
+from app.db.session import pool_metrics
+from app.services.event_hub import event_hub
+from app.services.runner_registry import runner_registry
+from app.services.job_queue import job_queue
+from app.services.timer_engine import timer_engine
+
+logger = logging.getLogger(__name__)
+
+# The same SELECT issued this many times in one request is reported as an N+1 pattern
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+BACKGROUND_ROUTE = "background"  # queries issued outside of any request
+UNMATCHED_ROUTE = "unmatched"  # 404s, kept as one label to bound cardinality
+
+http_requests = registry.counter("http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status"))
+http_latency = registry.histogram("http_request_duration_seconds", "HTTP request latency, including streamed bodies.", ("method", "route"))
+db_queries = registry.counter("db_queries_total", "SQL statements executed, by route.", ("route",))
+db_time = registry.counter("db_query_seconds_total", "Time spent executing SQL statements, by route.", ("route",))
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request", "SQL statements per request.", ("route",), buckets=(0, 1, 2, 5, 10, 25, 50, 100)
+)
+n_plus_one = registry.counter("db_n_plus_one_total", "Requests that repeated one SELECT at least N_PLUS_ONE_THRESHOLD times.", ("route",))
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "selects")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.selects = StatementCounter()
+
+request_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def instrument_engine(engine: AsyncEngine):
+    '''Time every statement and attribute it to the request running it'''
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = request_stats.get()
+        if stats is None:
+            db_queries.inc(BACKGROUND_ROUTE)
+            db_time.inc(BACKGROUND_ROUTE, amount=elapsed)
+            return
+        stats.queries += 1
+        stats.db_time += elapsed
+        if statement.lstrip()[:6].upper() == "SELECT":
+            stats.selects[statement] += 1
+
+
+class MetricsMiddleware:
+    '''Pure ASGI middleware, so streamed (SSE/NDJSON) responses are not buffered'''
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            request_stats.reset(token)
+            route = scope.get("route")
+            route = route.path if route is not None else UNMATCHED_ROUTE
+            method = scope["method"]
+
+            http_requests.inc(method, route, str(status_code))
+            http_latency.observe(method, route, value=elapsed)
+            db_queries.inc(route, amount=stats.queries)
+            db_time.inc(route, amount=stats.db_time)
+            db_queries_per_request.observe(route, value=stats.queries)
+            repeated = [(sql, count) for sql, count in stats.selects.items() if count >= N_PLUS_ONE_THRESHOLD]
+            if repeated:
+                n_plus_one.inc(route)
+                sql, count = max(repeated, key=lambda item: item[1])
+                logger.warning("Possible N+1 on %s %s: %d x %s", method, route, count, " ".join(sql.split())[:200])
+
+
+class _Rate:
+    '''Per-second rate of a growing total, measured between two scrapes'''
+
+    def __init__(self, total):
+        self.total = total
+        self.last = (time.monotonic(), total())
+        self.rate = 0.0
+
+    def __call__(self) -> float:
+        now, value = time.monotonic(), self.total()
+        last_time, last_value = self.last
+        if now - last_time >= 1.0:
+            self.rate = (value - last_value) / (now - last_time)
+            self.last = (now, value)
+        return self.rate
+
+
+def _avg_lag() -> float:
+    return timer_engine.total_lag / timer_engine.fired if timer_engine.fired else 0.0
+
+registry.gauge("timer_engine_active_timers", "Timers registered with the timer engine.", collect=lambda: len(timer_engine))
+registry.counter("timer_engine_completions_total", "Timers that fired.", collect=lambda: timer_engine.fired)
+registry.gauge("timer_engine_completions_per_second", "Timers fired per second since the previous scrape.", collect=_Rate(lambda: timer_engine.fired))
+registry.gauge("timer_engine_lag_seconds_avg", "Mean delay between a timer's deadline and its callback.", collect=_avg_lag)
+registry.gauge("timer_engine_lag_seconds_max", "Largest delay between a timer's deadline and its callback.", collect=lambda: timer_engine.max_lag)
+registry.counter("timer_engine_wakeups_total", "Scheduler wakeups.", collect=lambda: timer_engine.wakeups)
+
+registry.gauge("pomodoro_runners_active", "Live pomodoros owned by this process.", collect=lambda: len(runner_registry))
+registry.counter("pomodoro_admission_rejected_user_total", "New pomodoros refused by the per-user cap.", collect=lambda: runner_registry.rejected["user"])
+registry.counter("pomodoro_admission_rejected_process_total", "New pomodoros refused by the process cap.", collect=lambda: runner_registry.rejected["process"])
+
+registry.counter("job_queue_done_total", "Scheduled-start and next-cycle jobs completed.", collect=lambda: job_queue.done)
+registry.counter("job_queue_retried_total", "Jobs put back for later (errors, timer caps).", collect=lambda: job_queue.retried)
+registry.counter("job_queue_failed_total", "Jobs given up on.", collect=lambda: job_queue.failed)
+registry.counter("job_queue_polls_total", "Job queue polls.", collect=lambda: job_queue.polls)
+
+registry.gauge("agent_llm_active", "LLM calls holding an admission slot.", collect=lambda: llm_admission.active)
+registry.counter("agent_llm_rejected_user_total", "Prompts refused because the user already had calls queued.", collect=lambda: llm_admission.rejected["user"])
+registry.counter("agent_llm_rejected_queue_total", "Prompts refused because the LLM wait queue was full.", collect=lambda: llm_admission.rejected["queue"])
+registry.counter("agent_llm_rejected_timeout_total", "Prompts that gave up waiting for an LLM slot.", collect=lambda: llm_admission.rejected["timeout"])
+registry.gauge("agent_llm_queue_wait_seconds_max", "Longest wait for an LLM slot.", collect=lambda: llm_admission.max_wait)
+registry.gauge("agent_prompt_cache_size", "Prompts with cached tool parameters held in memory.", collect=lambda: len(prompt_cache.memory))
+registry.counter("agent_prompt_cache_hits_total", "Prompts answered from cached tool parameters, without the LLM.", collect=lambda: prompt_cache.hits)
+registry.counter("agent_prompt_cache_misses_total", "Prompts not in the prompt cache.", collect=lambda: prompt_cache.misses)
+registry.counter("agent_deadline_overruns_total", "Agent requests cancelled because their time budget ran out.", collect=lambda: cancellations["overrun"])
+registry.counter("agent_disconnect_cancellations_total", "Agent requests cancelled because the client disconnected.", collect=lambda: cancellations["disconnect"])
+for _priority in PRIORITIES:
+    registry.gauge(f"agent_llm_queued_{_priority}", f"{_priority.capitalize()} prompts waiting for an LLM slot.",
+                   collect=lambda priority=_priority: llm_admission.queued_for(priority))
+    registry.counter(f"agent_llm_admitted_{_priority}_total", f"{_priority.capitalize()} prompts given an LLM slot.",
+                     collect=lambda priority=_priority: llm_admission.admitted[priority])
+    registry.counter(f"agent_llm_queue_waits_{_priority}_total", f"{_priority.capitalize()} prompts that had to wait for an LLM slot.",
+                     collect=lambda priority=_priority: llm_admission.waited[priority])
+    registry.counter(f"agent_llm_queue_wait_seconds_{_priority}_total", f"Time {_priority} prompts spent waiting for an LLM slot.",
+                     collect=lambda priority=_priority: llm_admission.wait_seconds[priority])
+
+registry.gauge("auth_token_cache_size", "Verified tokens held by the auth cache.", collect=lambda: len(token_cache))
+registry.counter("auth_token_cache_hits_total", "Tokens answered from the auth cache.", collect=lambda: token_cache.hits)
+registry.counter("auth_token_cache_misses_total", "Tokens verified because they were not cached (or had expired).", collect=lambda: token_cache.misses)
+registry.counter("auth_token_cache_evictions_total", "Tokens evicted from the full auth cache.", collect=lambda: token_cache.evictions)
+
+registry.gauge("event_hub_subscribers", "Open pomodoro event streams.", collect=lambda: event_hub.subscriber_count)
+registry.counter("event_hub_dropped_total", "Events dropped because a subscriber fell behind.", collect=lambda: event_hub.dropped)
+
+for _name, _key, _help in (
+    ("db_pool_connections_in_use", "in_use", "Connections checked out of the pool."),
+    ("db_pool_connections_idle", "idle", "Connections idle in the pool."),
+    ("db_pool_overflow", "overflow", "Connections open beyond pool_size."),
+):
+    registry.gauge(_name, _help, collect=lambda key=_key: pool_metrics().get(key, 0))
+for _name, _key, _help in (
+    ("db_pool_checkouts_total", "checkouts", "Pool checkouts."),
+    ("db_pool_checkout_timeouts_total", "checkout_timeouts", "Checkouts that hit pool_timeout."),
+    ("db_pool_checkout_wait_seconds_total", "checkout_wait_seconds_total", "Time spent waiting for a pooled connection."),
+):
+    registry.counter(_name, _help, collect=lambda key=_key: pool_metrics().get(key, 0))
@@ -0,0 +1,55 @@
+from fastapi import HTTPException
+from app.core.cache import TTLCache
+from typing import Optional
+import hashlib
+import httpx
+import os
+
+SUPABASE_PROJ_ID = os.getenv("SUPABASE_PROJ_ID", "yejmesbnspombdethdxt")
+SUPABASE_URL = os.getenv("SUPABASE_URL", f"https://{SUPABASE_PROJ_ID}.supabase.co")
+
+class SupabaseUserClient:
+    '''
+    Remote `/auth/v1/user` lookup, only used when a token carries no email claim.
+    One pooled client lives for the whole app (closed in the lifespan hook) and
+    answers are cached per token, so repeated calls skip the TLS handshake and
+    the round trip.
+    '''
+
+    def __init__(self, base_url: str, cache_size: int=10000, cache_ttl: float=300, timeout: float=5.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+        return self._client
+
+    async def get_email(self, token: str) -> Optional[str]:
+        key = hashlib.sha256(token.encode()).digest()
+        email = self.cache.get(key)
+        if email is not None:
+            return email
+
+        response = await self.client.get("/auth/v1/user", headers={"Authorization": f"Bearer {token}"})
+        if response.status_code != 200:
+            raise HTTPException(status_code=401, detail="Invalid Supabase token")
+
+        email = response.json().get("email")
+        if email:
+            self.cache.set(key, email)
+        return email
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+supabase_users = SupabaseUserClient(SUPABASE_URL)
@@ -1,6 +1,8 @@
 from app.db.models.pomodoro import Pomodoro
 from app.schemas.pomodoro import PomodoroCreate
+from app.crud.pagination import keyset_page, split_page
 from datetime import datetime, timezone
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -21,9 +23,19 @@ async def create_pomodoro(db: AsyncSession, pomodoro: PomodoroCreate, user_id: s
 
     return new_pomodoro
 
-async def get_pomodoros(db: AsyncSession):
-    result = await db.execute(select(Pomodoro))
-    return result.scalars().all()
+async def get_pomodoros(db: AsyncSession, user_id: str, limit: int=20, cursor: Optional[str]=None, status: Optional[str]=None,
+                        start: Optional[datetime]=None, end: Optional[datetime]=None):
+    '''One page of a user's pomodoros, newest first, and the cursor of the next page'''
+    query = select(Pomodoro).where(Pomodoro.user_id == user_id, Pomodoro.start_time.is_not(None))
+    if status is not None:
+        query = query.where(Pomodoro.status == status)
+    if start is not None:
+        query = query.where(Pomodoro.start_time >= start)
+    if end is not None:
+        query = query.where(Pomodoro.start_time < end)
+
+    result = await db.execute(keyset_page(query, Pomodoro.start_time, Pomodoro.id, cursor, limit))
+    return split_page(result.scalars().all(), "start_time", limit)
 
 async def get_pomodoro_by_id(db: AsyncSession, pomodoro_id: int):
     result = await db.execute(select(Pomodoro).where(Pomodoro.id == pomodoro_id))
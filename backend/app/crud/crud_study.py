@@ -1,6 +1,8 @@
 from app.db.models.study import Study
 from app.schemas.study import StudyCreate
+from app.crud.pagination import keyset_page, split_page
 from datetime import datetime, timezone
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -17,9 +19,19 @@ async def create_study_session(db: AsyncSession, study: StudyCreate):
 
     return new_study_session
 
-async def get_study_sessions(db: AsyncSession):
-    result = await db.execute(select(Study))
-    return result.scalars().all()
+async def get_study_sessions(db: AsyncSession, user_id: str, limit: int=20, cursor: Optional[str]=None, topic: Optional[str]=None,
+                             start: Optional[datetime]=None, end: Optional[datetime]=None):
+    '''One page of a user's study records, newest first, and the cursor of the next page'''
+    query = select(Study).where(Study.user_id == user_id)
+    if topic is not None:
+        query = query.where(Study.topic == topic)
+    if start is not None:
+        query = query.where(Study.timestamp >= start)
+    if end is not None:
+        query = query.where(Study.timestamp < end)
+
+    result = await db.execute(keyset_page(query, Study.timestamp, Study.id, cursor, limit))
+    return split_page(result.scalars().all(), "timestamp", limit)
 
 async def get_study_session_by_id(db: AsyncSession, study_session_id: int):
     result = await db.execute(select(Study).where(Study.id == study_session_id))
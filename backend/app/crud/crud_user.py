@@ -1,4 +1,5 @@
 from app.db.models.user import User
+from app.db.dialect import upsert_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -7,12 +8,17 @@ async def get_user_by_email(db: AsyncSession, email: str):
     return result.scalar_one_or_none()
 
 async def create_user_if_not_exists(db: AsyncSession, email:str):
-    user = await get_user_by_email(db, email)
+    # One round trip for new users; RETURNING is empty when the email already exists
+    stmt = (
+        upsert_insert(db, User)
+        .values(email=email, username=email.split("@")[0][:128])
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
+    )
+    result = await db.execute(stmt)
+    user = result.scalar_one_or_none()
+    await db.commit()
+
     if user:
         return user
-
-    new_user = User(email=email)
-    db.add(new_user)
-    await db.commit()
-    await db.refresh(new_user)
-    return new_user
\ No newline at end of file
+    return await get_user_by_email(db, email)
@@ -0,0 +1,36 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Select, tuple_
+
+# Keyset ("cursor") pagination, newest first. The cursor is the sort key of the
+# last row on the previous page, so every page is an index range scan no matter
+# how deep the client has paged.
+
+def encode_cursor(moment: datetime, row_id: int) -> str:
+    raw = json.dumps([moment.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        moment, row_id = json.loads(raw)
+        return datetime.fromisoformat(moment), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def keyset_page(query: Select, time_column, id_column, cursor: Optional[str], limit: int) -> Select:
+    '''Order `query` by (time, id) descending and start it after `cursor`; fetches one extra row'''
+    if cursor:
+        moment, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(time_column, id_column) < tuple_(moment, row_id))
+    return query.order_by(time_column.desc(), id_column.desc()).limit(limit + 1)
+
+def split_page(rows: list, time_attr: str, limit: int) -> tuple[list, Optional[str]]:
+    '''Trim the extra row fetched by `keyset_page` and build the next cursor from the last item'''
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, time_attr), last.id)
@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import DateTime, Integer, cast, func, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+def dialect_name(db: AsyncSession) -> str:
+    return db.get_bind().dialect.name
+
+def upsert_insert(db: AsyncSession, table):
+    '''`INSERT` construct with `on_conflict_do_*` support for the session's database'''
+    if dialect_name(db) == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
+
+def seconds_between(db: AsyncSession, start, end):
+    '''Whole seconds from `start` to `end` as a SQL expression (NULL when either is NULL)'''
+    start, end = (literal(v, DateTime) if isinstance(v, datetime) else v for v in (start, end))
+    if dialect_name(db) == "sqlite":
+        return cast(func.round((func.julianday(end) - func.julianday(start)) * 86400, 3), Integer)
+    return cast(func.floor(func.extract("epoch", end - start)), Integer)
@@ -0,0 +1,25 @@
+from app.db.base import Base
+from typing import Optional
+from datetime import datetime
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, DateTime, Index
+
+# Durable queue of future pomodoro work: scheduled starts ("start") and the next
+# work session of a cycle once its rest is over ("next"). Rows are deleted when done.
+
+class PomodoroJob(Base):
+    __tablename__ = "pomodoro_jobs"
+    __table_args__ = (
+        # Workers poll `status IN (...) AND due_at <= now ORDER BY due_at`
+        Index("ix_pomodoro_jobs_status_due_at", "status", "due_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(10), nullable=False)  # "start" or "next"
+    pomodoro_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    user_id: Mapped[str] = mapped_column(nullable=False)
+    # When to run; while claimed ("running") it is the lease deadline after which another worker may retry
+    due_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    status: Mapped[str] = mapped_column(String(10), nullable=False, default="queued")  # "queued", "running" or "failed"
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
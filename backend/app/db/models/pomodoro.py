@@ -2,10 +2,14 @@ from app.db.base import Base
 from typing import Optional
 from datetime import datetime
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, Boolean, DateTime, ForeignKey
+from sqlalchemy import String, Integer, Boolean, DateTime, ForeignKey, Index
 
 class Pomodoro(Base):
     __tablename__ = "pomodoros_history"
+    __table_args__ = (
+        # Backs the per-user history listing and its keyset cursor
+        Index("ix_pomodoros_history_user_start_id", "user_id", "start_time", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     timer: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -14,9 +18,13 @@ class Pomodoro(Base):
     end_time: Mapped[datetime] = mapped_column(DateTime, default=None, nullable=True)
     last_resume_time: Mapped[datetime] = mapped_column(DateTime, default=None, nullable=True)
     worked_time: Mapped[int] = mapped_column(Integer, nullable=True)
+    pause_count: Mapped[int] = mapped_column(Integer, default=0, nullable=True)
     completed: Mapped[bool] = mapped_column(Boolean, nullable=True)
     task_name: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
-    status: Mapped[str] = mapped_column(String(20), default="scheduled", nullable=True)  # possible values: "running", "stopped", "finished", "scheduled"
+    status: Mapped[str] = mapped_column(String(20), default="scheduled", nullable=True, index=True)  # possible values: "running", "stopped", "finished", "scheduled"
     user_id: Mapped[str] = mapped_column(nullable=False)
+    cycles_left: Mapped[int] = mapped_column(Integer, default=0, nullable=True)  # work sessions still to run after this one
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")  # bumped by every state change
+    runner_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)  # process whose timer engine runs it (RUNNER_ID)
 
 
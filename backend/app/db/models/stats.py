@@ -0,0 +1,28 @@
+from app.db.base import Base
+from datetime import date
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, Date
+
+# Per-user rollups, one row per period ("day" or "week", weeks start on Monday).
+# Updated incrementally when pomodoros finish and study records are written,
+# so dashboards read O(periods) rows instead of scanning the raw history.
+
+class FocusRollup(Base):
+    __tablename__ = "focus_rollups"
+
+    user_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    period: Mapped[str] = mapped_column(String(4), primary_key=True)
+    period_start: Mapped[date] = mapped_column(Date, primary_key=True)
+    focus_seconds: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completed_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+class StudyRollup(Base):
+    __tablename__ = "study_rollups"
+
+    user_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    period: Mapped[str] = mapped_column(String(4), primary_key=True)
+    period_start: Mapped[date] = mapped_column(Date, primary_key=True)
+    topic: Mapped[str] = mapped_column(String(75), primary_key=True)
+    study_minutes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sessions: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -2,10 +2,14 @@ from app.db.base import Base
 from typing import Optional
 from datetime import datetime, timezone
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, DateTime, Text, ForeignKey
+from sqlalchemy import String, Integer, DateTime, Text, ForeignKey, Index
 
 class Study(Base):
     __tablename__ = "study_records"
+    __table_args__ = (
+        # Backs the per-user study listing and its keyset cursor
+        Index("ix_study_records_user_timestamp_id", "user_id", "timestamp", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     topic: Mapped[Optional[str]] = mapped_column(String(75), nullable=True)
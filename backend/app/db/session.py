@@ -1,10 +1,42 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from app.core.config import get_settings
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.engine import make_url
+from uuid import uuid4
+from app.core.config import Settings, get_settings
+from app.core.deadline import remaining
+from app.db.pool import InstrumentedAsyncQueuePool
 
-DATABASE_URL = get_settings().DATABASE_URL
+def create_engine_from_settings(settings: Settings, **overrides) -> AsyncEngine:
+    '''Build the async engine from the DB_* profile; `overrides` win over settings'''
+    url = make_url(settings.DATABASE_URL)
+    options = {
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    # In-memory SQLite keeps its default single shared connection
+    if not (url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")):
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
 
-engine = create_async_engine(DATABASE_URL, future=True, echo=True)
+    if url.get_driver_name() == "asyncpg":
+        cache_size = settings.DB_STATEMENT_CACHE_SIZE
+        connect_args = {"statement_cache_size": cache_size}
+        if cache_size == 0:
+            # PgBouncer can hand each transaction a different server connection
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+            url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+        options["connect_args"] = connect_args
+
+    options.update(overrides)
+    return create_async_engine(url, **options)
+
+engine = create_engine_from_settings(get_settings())
 AsyncSessionLocal = sessionmaker(
     autocommit=False, 
     autoflush=True, 
@@ -13,6 +45,21 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False
     )
 
+@event.listens_for(Session, "after_begin")
+def _bound_by_deadline(session, transaction, connection):
+    '''Inside a request with a deadline, Postgres cancels statements that would outlive it'''
+    left = remaining()
+    if left is None or connection.dialect.name != "postgresql":
+        return
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(1, int(left * 1000))}")
+
+def pool_metrics(bind: AsyncEngine=engine) -> dict:
+    '''Checkout wait, in-use/idle connections and timeouts of the engine's pool'''
+    pool = bind.sync_engine.pool
+    if isinstance(pool, InstrumentedAsyncQueuePool):
+        return pool.metrics()
+    return {"status": pool.status()}
+
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
@@ -1,15 +1,40 @@
+import asyncio
+import os
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.api.v1.endpoints import user, pomodoro, study, agent
+from app.api.v1.endpoints import user, pomodoro, study, agent, stats
 from app.db.session import engine
-from app.db.base import Base 
+from app.services.timer_engine import timer_engine
+from app.services.pomodoro_timer import rehydrate_timers
+from app.services.job_queue import job_queue
+from app.core.supabase import supabase_users
+from app.agents.pomodoro_agent import warm_agent
+from app.core.instrumentation import MetricsMiddleware, instrument_engine
+from app.core.metrics import registry
+
+# Load the LLM stack in the background at startup instead of on the first LLM request
+AGENT_WARMUP = os.getenv("AGENT_WARMUP", "true").lower() in ("1", "true", "yes")
+# Poll the scheduled-start/next-cycle queue from this process; any number of processes may
+JOB_WORKER = os.getenv("JOB_WORKER", "true").lower() in ("1", "true", "yes")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # The schema is managed by migrations (`alembic upgrade head`), not created here
+    timer_engine.start()
+    await rehydrate_timers()
+    if JOB_WORKER:
+        job_queue.start()
+    warmup = asyncio.create_task(warm_agent()) if AGENT_WARMUP else None
     yield
+    if warmup:
+        warmup.cancel()
+    await job_queue.stop()
+    await timer_engine.stop()
+    await supabase_users.aclose()
+    # aiosqlite connections hold non-daemon threads that would keep the process alive
+    await engine.dispose()
 
 app = FastAPI(
     title="CronoLearn",
@@ -18,6 +43,8 @@ app = FastAPI(
     lifespan=lifespan 
 )
 
+instrument_engine(engine)
+app.add_middleware(MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
@@ -30,7 +57,13 @@ app.include_router(user.router, prefix="/users")
 app.include_router(pomodoro.router, prefix="/pomodoro")
 app.include_router(study.router, prefix="/my-studies")
 app.include_router(agent.router, prefix="/agent")
+app.include_router(stats.router, prefix="/stats")
 
 @app.get("/")
 async def root():
-    return {"message": "Welcome to CronoLearn"}
\ No newline at end of file
+    return {"message": "Welcome to CronoLearn"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    '''Prometheus text exposition of request, database, pool and timer-engine metrics'''
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class PomodoroInput(BaseModel):
+    timer: float = Field(..., gt=0, le=1120, description="Work time in minutes")
+    rest_time: Optional[float] = Field(None, ge=0, description="Rest duration in minutes (default: half of work time)")
+    task_name: Optional[str] = Field(None, max_length=50, description="Task description for the pomodoro")
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Annotated, Optional
 
 class PomodoroCreate(BaseModel):
     timer: int = Field(default=60, examples=60)
@@ -12,6 +12,8 @@ class PomodoroCreate(BaseModel):
     completed: Optional[bool] = Field(default=False, examples=False)
     task_name: Optional[str] = Field(..., examples="CronoLearn project")
     status: str = Field(default="scheduled")
+    start_at: Optional[datetime] = Field(default=None, description="Start later instead of now")
+    cycles: int = Field(default=1, ge=1, le=12, description="Work sessions to run, each followed by rest_time")
 
     model_config = {
         "json_schema_extra": {
@@ -32,14 +34,12 @@ class PomodoroCreate(BaseModel):
     }
 
 class PomodoroUpdate(BaseModel):
+    '''Editable fields only; status and timing change through pause/resume/stop/extend'''
     timer: Optional[int] = Field(None, ge=1)
     rest_time: Optional[int] = Field(None, ge=0)
-    worked_time: Optional[int] = Field(None, ge=0)
     task_name: Optional[str] = Field(None)
-    completed: Optional[bool] = Field(False)
-    end_time: Optional[datetime]
-    last_resume_time: Optional[datetime] 
-    status: Optional[str]
+
+    model_config = {"extra": "forbid"}
 
 class PomodoroResponse(BaseModel):
     id: int
@@ -51,6 +51,35 @@ class PomodoroResponse(BaseModel):
     task_name: Optional[str] = None
     status: str = "scheduled"
     user_id: str
+    worked_time: Optional[int] = 0
+    last_resume_time: Optional[datetime] = None
+    cycles_left: Optional[int] = 0
+    version: int = 1
+
+    # Progress is derived from timestamps at read time, the row only changes on state transitions
+    @computed_field
+    @property
+    def elapsed_time(self) -> float:
+        elapsed = float(self.worked_time or 0)
+        if self.status == "running" and self.last_resume_time:
+            elapsed += (datetime.now() - self.last_resume_time).total_seconds()
+        return round(min(elapsed, self.timer), 2)
+
+    @computed_field
+    @property
+    def remaining_time(self) -> float:
+        return round(max(self.timer - self.elapsed_time, 0), 2)
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class PomodoroExtend(BaseModel):
+    add_time: int = Field(..., gt=0, examples=300, description="Seconds to add to the timer")
+class PomodoroPage(BaseModel):
+    items: list[PomodoroResponse]
+    next_cursor: Optional[str] = None
+
+
+# Offline queue flushes and day planning; one transaction per batch
+MAX_BATCH_ITEMS = 100
+PomodoroBatchCreate = Annotated[list[PomodoroCreate], Field(min_length=1, max_length=MAX_BATCH_ITEMS)]
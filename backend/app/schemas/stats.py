@@ -0,0 +1,41 @@
+from pydantic import BaseModel
+from datetime import date
+
+class FocusStats(BaseModel):
+    period: str
+    period_start: date
+    focus_seconds: int
+    completed_count: int
+    failed_count: int
+
+    class Config:
+        orm_mode = True
+
+class StudyStats(BaseModel):
+    period: str
+    period_start: date
+    topic: str
+    study_minutes: int
+    sessions: int
+
+    class Config:
+        orm_mode = True
+
+class CompletionByLength(BaseModel):
+    timer_minutes: int
+    sessions: int
+    completed: int
+    completion_rate: float
+
+class PauseStats(BaseModel):
+    average: float
+    paused_share: float
+    histogram: list[int]  # sessions with 0, 1, 2 and 3+ pauses
+
+class FocusAnalytics(BaseModel):
+    sessions: int
+    current_streak: int
+    longest_streak: int
+    heatmap: list[list[int]]  # worked seconds, [weekday Monday=0][hour]
+    completion_by_length: list[CompletionByLength]
+    pauses: PauseStats
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Annotated, Optional
 
 class StudyCreate(BaseModel):
     topic: str = Field(..., examples="Maths")
@@ -30,4 +30,24 @@ class StudyResponse(BaseModel):
     user_id: str
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+class StudyPage(BaseModel):
+    items: list[StudyResponse]
+    next_cursor: Optional[str] = None
+
+class StudyImportRow(BaseModel):
+    '''One record of a CSV/NDJSON import; a missing timestamp means "now"'''
+    topic: Optional[str] = Field(None, max_length=75)
+    study_time: int = Field(..., gt=0)
+    notes: Optional[str] = None
+    timestamp: Optional[datetime] = None
+
+class StudyImportReport(BaseModel):
+    inserted: int
+    failed: int
+    errors: list[dict]
+    aborted: Optional[str] = None  # why the import stopped early; rows before it were kept
+
+
+MAX_BATCH_ITEMS = 100
+StudyBatchCreate = Annotated[list[StudyCreate], Field(min_length=1, max_length=MAX_BATCH_ITEMS)]
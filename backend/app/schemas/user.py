@@ -2,9 +2,9 @@ from pydantic import BaseModel
 from typing import Optional
 
 class UserOut(BaseModel):
-    id: str
-    emai: str
+    id: int
+    email: str
     username: Optional[str]
 
-    class config:
-        orm_mode = True
\ No newline at end of file
+    class Config:
+        from_attributes = True
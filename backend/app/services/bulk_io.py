@@ -0,0 +1,134 @@
+import codecs
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from typing import AsyncIterator, Iterable, Optional
+from sqlalchemy import Select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.dialect import dialect_name
+from app.db.session import AsyncSessionLocal
+
+# Streaming CSV/NDJSON helpers for bulk import and export. Both directions work
+# a line (or a batch of rows) at a time, so memory does not grow with the file.
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+MAX_LINE_BYTES = 64 * 1024
+MAX_REPORTED_ERRORS = 100
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.aborted = None
+
+    def error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> dict:
+        return {"inserted": self.inserted, "failed": self.failed, "errors": self.errors, "aborted": self.aborted}
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    '''Decode a byte stream and yield it line by line, without the line ending'''
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+        if len(pending) > MAX_LINE_BYTES:
+            raise ValueError(f"Line longer than {MAX_LINE_BYTES} bytes")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+async def iter_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[tuple[int, Optional[dict], Optional[str]]]:
+    '''
+    Yield (line_number, record, error) for every non-blank record.
+    CSV needs a header row; quoted fields may span lines.
+    '''
+    header = None
+    buffered, first_line, number = "", 0, 0
+    async for line in lines:
+        number += 1
+        if fmt == "ndjson":
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield number, None, "Expected a JSON object"
+                continue
+            yield number, record, None
+            continue
+
+        if not buffered:
+            first_line = number
+        buffered = f"{buffered}\n{line}" if buffered else line
+        if buffered.count('"') % 2:
+            if len(buffered) > MAX_LINE_BYTES:
+                raise ValueError(f"Unterminated quoted field starting on line {first_line}")
+            continue  # a quoted field continues on the next line
+        text, buffered = buffered, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield first_line, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield first_line, {name: value or None for name, value in zip(header, values)}, None
+
+    if buffered:
+        yield first_line, None, "Unterminated quoted field"
+
+async def insert_rows(db: AsyncSession, model, columns: list[str], rows: list[dict]):
+    '''COPY on Postgres (asyncpg), batched multi-row INSERTs ("insertmanyvalues") elsewhere'''
+    if not rows:
+        return
+    if dialect_name(db) == "postgresql":
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            model.__tablename__, columns=columns, records=[tuple(row[c] for c in columns) for row in rows],
+        )
+    else:
+        await db.execute(insert(model), rows)
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _encode(rows: Iterable, columns: list[str], fmt: str) -> str:
+    if fmt == "ndjson":
+        return "".join(json.dumps({c: _plain(getattr(row, c)) for c in columns}) + "\n" for row in rows)
+    out = io.StringIO()
+    csv.writer(out, lineterminator="\n").writerows([_plain(getattr(row, c)) for c in columns] for row in rows)
+    return out.getvalue()
+
+async def stream_export(query: Select, columns: list[str], fmt: str) -> AsyncIterator[str]:
+    '''
+    Stream `query` through a server-side cursor, one encoded batch at a time.
+    Opens its own session: the request's session is closed before the body is sent.
+    '''
+    if fmt == "csv":
+        out = io.StringIO()
+        csv.writer(out, lineterminator="\n").writerow(columns)
+        yield out.getvalue()
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield _encode(rows, columns, fmt)
@@ -0,0 +1,59 @@
+import asyncio
+import json
+from collections import defaultdict
+from datetime import datetime
+
+TERMINAL_EVENTS = ("completed", "stopped", "failed")
+
+
+class EventHub:
+    '''
+    In-process pub/sub for pomodoro state transitions.
+    Every subscriber gets its own bounded queue; when a slow client falls
+    behind, its oldest event is dropped. Events carry a full state snapshot,
+    so a client only ever needs the latest one to keep ticking locally.
+    '''
+
+    def __init__(self, queue_size: int=16):
+        self.queue_size = queue_size
+        self._subscribers: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def subscriber_count(self):
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self, pomodoro_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[pomodoro_id].add(queue)
+        return queue
+
+    def unsubscribe(self, pomodoro_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(pomodoro_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[pomodoro_id]
+
+    def publish(self, pomodoro_id: int, event: dict):
+        self.published += 1
+        for queue in self._subscribers.get(pomodoro_id, ()):
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=_json_default)}\n\n"
+
+
+event_hub = EventHub()
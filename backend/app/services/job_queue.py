@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models.job import PomodoroJob
+from app.db.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))  # seconds between polls while the queue is idle
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "500"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))  # a claimed job is retried if not done by then
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_SECONDS = int(os.getenv("JOB_RETRY_SECONDS", "30"))
+
+# A claimed job stays "running" with `due_at` pushed to its lease deadline, so an
+# expired lease is just another due row and one (status, due_at) index serves both
+CLAIMABLE_STATUSES = ("queued", "running")
+
+
+class JobResult:
+    '''
+    What a handler did with a batch. `deferred` jobs (job id -> reason, e.g. the user is
+    at their timer cap) come back later without using up an attempt. Exactly one of
+    `on_commit` (timers, events) or `on_abort` (undo in-memory bookkeeping) is called.
+    '''
+
+    def __init__(self, deferred: Optional[dict]=None, on_commit: Optional[Callable[[], None]]=None, on_abort: Optional[Callable[[], None]]=None):
+        self.deferred = deferred or {}
+        self.on_commit = on_commit
+        self.on_abort = on_abort
+
+class LeaseLost(Exception):
+    '''A job's lease expired and another worker claimed it while this one was still working on it'''
+
+# handler(db, jobs, now) runs in the transaction that deletes the finished jobs,
+# so its writes and the job removal commit together
+JobHandler = Callable[[AsyncSession, list[PomodoroJob], datetime], Awaitable[JobResult]]
+
+
+async def enqueue(db: AsyncSession, kind: str, pomodoro_id: int, user_id: str, due_at: datetime):
+    '''Add a job in the caller's transaction'''
+    await db.execute(insert(PomodoroJob).values(kind=kind, pomodoro_id=pomodoro_id, user_id=user_id, due_at=due_at, status="queued", attempts=0))
+
+def _leased(jobs: list[PomodoroJob]) -> tuple:
+    '''
+    WHERE criteria matching the jobs only while still under the lease they were claimed with.
+    Every claim bumps `attempts` and sets `due_at` to the lease deadline, so the pair
+    identifies one lease: a job re-claimed by another worker no longer matches.
+    '''
+    return (
+        PomodoroJob.status == "running",
+        tuple_(PomodoroJob.id, PomodoroJob.attempts, PomodoroJob.due_at).in_([(job.id, job.attempts, job.due_at) for job in jobs]),
+    )
+
+def _by_reason(jobs: list[PomodoroJob], reasons: dict) -> dict:
+    groups: dict[str, list[PomodoroJob]] = {}
+    for job in jobs:
+        groups.setdefault(reasons[job.id][:255], []).append(job)
+    return groups
+
+async def claim(db: AsyncSession, limit: int, now: datetime) -> list[PomodoroJob]:
+    '''
+    Lease up to `limit` due jobs. `FOR UPDATE SKIP LOCKED` lets concurrent workers
+    claim disjoint batches on Postgres; SQLite serialises writers instead.
+    '''
+    due = (
+        select(PomodoroJob.id)
+        .where(PomodoroJob.status.in_(CLAIMABLE_STATUSES), PomodoroJob.due_at <= now)
+        .order_by(PomodoroJob.due_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.scalars(
+        update(PomodoroJob)
+        .where(PomodoroJob.id.in_(due))
+        .values(status="running", due_at=now + timedelta(seconds=JOB_LEASE_SECONDS), attempts=PomodoroJob.attempts + 1)
+        .returning(PomodoroJob)
+        .execution_options(synchronize_session=False)
+    )
+    return sorted(result.all(), key=lambda job: job.id)
+
+
+class JobQueue:
+    '''
+    One polling loop per process drains the due jobs in batches, grouped by kind.
+    Any number of processes can run it against the same table.
+    '''
+
+    def __init__(self, batch_size: int=JOB_BATCH_SIZE, poll_interval: float=JOB_POLL_INTERVAL):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._handlers: dict[str, JobHandler] = {}
+        self._runner: Optional[asyncio.Task] = None
+
+        self.polls = 0
+        self.done = 0
+        self.retried = 0
+        self.failed = 0
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    @property
+    def running(self):
+        return self._runner is not None and not self._runner.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._runner = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._runner:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+    async def _run(self):
+        while True:
+            try:
+                claimed = await self.run_once()
+            except Exception:
+                logger.exception("Job queue poll failed")
+                claimed = 0
+            # A full batch means more is probably due: poll again straight away
+            if claimed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    async def run_once(self, now: Optional[datetime]=None) -> int:
+        '''Claim and process one batch; returns how many jobs were claimed'''
+        now = now or datetime.now()
+        self.polls += 1
+        async with AsyncSessionLocal() as db:
+            jobs = await claim(db, self.batch_size, now)
+            await db.commit()
+        if not jobs:
+            return 0
+
+        by_kind: dict[str, list[PomodoroJob]] = {}
+        for job in jobs:
+            by_kind.setdefault(job.kind, []).append(job)
+        for kind, batch in by_kind.items():
+            await self._process(kind, batch, now)
+        return len(jobs)
+
+    async def _process(self, kind: str, jobs: list[PomodoroJob], now: datetime):
+        handler = self._handlers.get(kind)
+        exhausted = {job.id: "Too many attempts" for job in jobs if job.attempts > JOB_MAX_ATTEMPTS}
+        runnable = [job for job in jobs if job.id not in exhausted]
+        result = JobResult()
+        try:
+            async with AsyncSessionLocal() as db:
+                if handler is None:
+                    exhausted.update((job.id, f"No handler for {kind!r} jobs") for job in runnable)
+                elif runnable:
+                    result = await handler(db, runnable, now)
+                await self._settle(db, jobs, result.deferred, exhausted, now, deferred=True)
+                await db.commit()
+        except Exception as e:
+            if isinstance(e, LeaseLost):
+                logger.warning("%s jobs rolled back: %s", kind, e)
+            else:
+                logger.exception("%s jobs failed", kind)
+            if result.on_abort is not None:
+                result.on_abort()
+            # Nothing of the batch was committed; put back what this worker still holds
+            async with AsyncSessionLocal() as db:
+                await self._settle(db, jobs, {job.id: repr(e) for job in runnable}, exhausted, now)
+                await db.commit()
+            return
+        if result.on_commit is not None:
+            result.on_commit()
+
+    async def _settle(self, db: AsyncSession, jobs: list[PomodoroJob], retry: dict, exhausted: dict, now: datetime, deferred: bool=False):
+        '''
+        Delete the done jobs, put `retry` back in the queue and mark `exhausted` as failed, each only
+        while this worker still holds its lease. A done job lost to another worker raises LeaseLost,
+        so the handler's writes roll back instead of committing a second time.
+        '''
+        done = [job for job in jobs if job.id not in retry and job.id not in exhausted]
+        if done:
+            deleted = (await db.scalars(
+                delete(PomodoroJob).where(*_leased(done)).returning(PomodoroJob.id).execution_options(synchronize_session=False)
+            )).all()
+            if len(deleted) < len(done):
+                raise LeaseLost(f"{len(done) - len(deleted)} of {len(done)} jobs were claimed again after their lease expired")
+        for reason, group in _by_reason([job for job in jobs if job.id in retry], retry).items():
+            values = {"status": "queued", "due_at": now + timedelta(seconds=JOB_RETRY_SECONDS), "last_error": reason}
+            if deferred:
+                values["attempts"] = PomodoroJob.attempts - 1
+            await db.execute(update(PomodoroJob).where(*_leased(group)).values(**values).execution_options(synchronize_session=False))
+        for reason, group in _by_reason([job for job in jobs if job.id in exhausted], exhausted).items():
+            await db.execute(
+                update(PomodoroJob).where(*_leased(group)).values(status="failed", last_error=reason).execution_options(synchronize_session=False)
+            )
+        self.done += len(done)
+        self.retried += len(retry)
+        self.failed += len(exhausted)
+
+
+job_queue = JobQueue()
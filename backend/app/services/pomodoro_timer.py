@@ -1,186 +1,589 @@
+import logging
 from datetime import datetime, timedelta
+from functools import partial
+from typing import Optional
 from app.db.models.pomodoro import Pomodoro
+from app.db.models.job import PomodoroJob
 from app.db.session import AsyncSessionLocal
+from app.db.dialect import seconds_between
+from app.services.timer_engine import TimerCallback, timer_engine
+from app.services.runner_registry import RUNNER_ID, runner_registry, TimerCapacityError
+from app.services.job_queue import JobResult, enqueue, job_queue
+from app.services.event_hub import event_hub
+from app.services.stats_calculator import FINISHED_STATUSES, record_pomodoros, invalidate_analytics
 from sqlalchemy.future import select
-from sqlalchemy import update
-import asyncio
+from sqlalchemy import case, delete, func, insert, tuple_, update
+
+logger = logging.getLogger(__name__)
+
+LIVE_STATUSES = ("scheduled", "running", "paused")
+
+def _local_time(value: Optional[datetime]) -> Optional[datetime]:
+    '''Pomodoro timestamps are naive local time; convert aware datetimes to that'''
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+def _running_row(user_id: str, timer: int, rest_time: Optional[int], task_name: Optional[str], cycles_left: int, now: datetime) -> dict:
+    return {
+        "timer": timer,
+        "rest_time": rest_time,
+        "task_name": task_name,
+        "start_time": now,
+        "worked_time": 0,
+        "pause_count": 0,
+        "last_resume_time": now,
+        "user_id": user_id,
+        "status": "running",
+        "end_time": None,
+        "cycles_left": cycles_left,
+        "runner_id": RUNNER_ID,
+    }
+
+def _scheduled_row(user_id: str, timer: int, rest_time: Optional[int], task_name: Optional[str], cycles_left: int, start_at: datetime) -> dict:
+    return {**_running_row(user_id, timer, rest_time, task_name, cycles_left, start_at), "status": "scheduled", "last_resume_time": None, "runner_id": None}
 
 class PomodoroTimer:
     def __init__(self, user_id: str):
         self.user_id = user_id
 
-    async def create_pomodoro(self, rest_time: int, task_name: str, timer: int=25, status: str="scheduled"):
+    async def create_pomodoro(self, rest_time: int, task_name: str, timer: int=25, status: str="scheduled",
+                              start_at: Optional[datetime]=None, cycles: int=1):
+        '''
+        Start a pomodoro now, or at `start_at` through the job queue. With `cycles` > 1 the
+        next work session starts by itself once each rest is over.
+        '''
+        rest_time = rest_time or 0
         if timer <= 0:
             raise ValueError("Pomodoro timer has to be greater than 0.")
         if rest_time < 0:
             raise ValueError("Rest timer cannot be negative.")
+        if cycles < 1:
+            raise ValueError("A pomodoro needs at least one cycle.")
 
+        start_at = _local_time(start_at)
+        if start_at is not None and start_at > datetime.now():
+            # No timer until the start job runs; admission is checked then
+            return await self._insert_pomodoro(rest_time, task_name, timer, status, cycles - 1, start_at)
+
+        runner_registry.reserve(self.user_id)
+        try:
+            new_pomodoro = await self._insert_pomodoro(rest_time, task_name, timer, status, cycles - 1)
+        except BaseException:
+            runner_registry.release(self.user_id)
+            raise
+
+        runner_registry.track(new_pomodoro.id, self.user_id, reserved=True)
+        runner_registry.start(new_pomodoro.id, self.run_pomodoro(new_pomodoro.id))
+        return new_pomodoro
+
+    async def _insert_pomodoro(self, rest_time: int, task_name: str, timer: int, status: str, cycles_left: int,
+                               start_at: Optional[datetime]=None):
         async with AsyncSessionLocal() as db:
             new_pomodoro = Pomodoro(
                 timer=timer,
-                start_time=datetime.now(),
+                start_time=start_at or datetime.now(),
                 rest_time=rest_time,
                 task_name=task_name,
                 worked_time=0,  
+                pause_count=0,
                 last_resume_time=None,
                 user_id=self.user_id,
                 status=status,
                 end_time=None,
+                cycles_left=cycles_left,
             )
 
             db.add(new_pomodoro)
             await db.flush()
+            if start_at is not None:
+                await enqueue(db, "start", new_pomodoro.id, self.user_id, start_at)
             await db.commit()
 
-        asyncio.create_task(self.run_pomodoro(new_pomodoro.id))
         return new_pomodoro
     
+    async def create_pomodoros(self, items: list[dict]):
+        '''
+        Create several pomodoros with one multi-row INSERT ... RETURNING. Items start now, or at
+        their `start_at` through the job queue like create_pomodoro. The ones starting now are
+        admitted against the timer caps together: all of them get a runner slot or nothing is
+        inserted. Each item has `timer`, `rest_time` (null is stored as 0), `task_name` and optionally
+        `cycles` and `start_at`.
+        '''
+        for i, item in enumerate(items):
+            if item["timer"] <= 0:
+                raise ValueError(f"Item {i}: pomodoro timer has to be greater than 0.")
+            if (item.get("rest_time") or 0) < 0:
+                raise ValueError(f"Item {i}: rest timer cannot be negative.")
+            if item.get("cycles", 1) < 1:
+                raise ValueError(f"Item {i}: a pomodoro needs at least one cycle.")
+
+        now = datetime.now()
+        start_at = [_local_time(item.get("start_at")) for item in items]
+        start_at = [at if at is not None and at > now else None for at in start_at]
+        immediate = start_at.count(None)
+        if runner_registry.max_per_user and immediate > runner_registry.max_per_user:
+            raise ValueError(f"A batch can start at most {runner_registry.max_per_user} pomodoros now, schedule the rest with start_at.")
+
+        runner_registry.reserve(self.user_id, immediate)
+        try:
+            pomodoros = await self._insert_batch(items, start_at, now)
+        except BaseException:
+            runner_registry.release(self.user_id, immediate)
+            raise
+
+        running = [p for p in pomodoros if p.status == "running"]
+        for pomodoro in running:
+            runner_registry.track(pomodoro.id, self.user_id, reserved=True).version = pomodoro.version
+        timer_engine.schedule_many((p.id, p.timer, self._on_deadline(p.version)) for p in running)
+        for pomodoro in running:
+            self._publish("started", pomodoro)
+        return pomodoros
+
+    async def _insert_batch(self, items: list[dict], start_at: list[Optional[datetime]], now: datetime):
+        rows = [
+            (_running_row if at is None else _scheduled_row)(
+                self.user_id, item["timer"], item.get("rest_time") or 0, item.get("task_name"), item.get("cycles", 1) - 1, at or now,
+            )
+            for item, at in zip(items, start_at)
+        ]
+        async with AsyncSessionLocal() as db:
+            result = await db.scalars(insert(Pomodoro).returning(Pomodoro, sort_by_parameter_order=True), rows)
+            pomodoros = result.all()
+            jobs = [
+                {"kind": "start", "pomodoro_id": p.id, "user_id": self.user_id, "status": "queued", "attempts": 0, "due_at": at}
+                for p, at in zip(pomodoros, start_at) if at is not None
+            ]
+            if jobs:
+                await db.execute(insert(PomodoroJob), jobs)
+            await db.commit()
+
+        return pomodoros
+
     async def run_pomodoro(self, pomodoro_id: str, status: str="running"):
+        '''Mark a scheduled pomodoro as running and hand its deadline to the shared timer engine'''
         try:
             async with AsyncSessionLocal() as db:
                 result = await db.execute(
-                    select(Pomodoro).where(Pomodoro.id == pomodoro_id, Pomodoro.user_id == self.user_id),
+                    update(Pomodoro)
+                    .where(Pomodoro.id == int(pomodoro_id), Pomodoro.user_id == self.user_id, Pomodoro.status == "scheduled")
+                    .values(status=status, last_resume_time=datetime.now(), runner_id=RUNNER_ID, version=Pomodoro.version + 1)
+                    .returning(Pomodoro)
                 )
-
                 pomodoro = result.scalar_one_or_none()
-                 
-                if not pomodoro:
-                    return
-                
-                pomodoro.status = status
-                total_seconds = pomodoro.timer
-                interval = 1 
-                elapsed = 0
-
-                while elapsed < total_seconds:
-                    await asyncio.sleep(interval)
-                    elapsed += interval
-            
-                    await self.update_progress(pomodoro_id, elapsed, status)
-
-                await self.completed(pomodoro_id)
-                print(f"Pomodoro {pomodoro.id} finished!.")
+                await db.commit()
+
+            # Already started (or gone): nothing to do
+            if not pomodoro:
+                return
+
+            self._sync_timer(pomodoro)
+            self._publish("started", pomodoro)
 
         except Exception:
             await self.failed(pomodoro_id)
 
-    async def update_progress(self, pomodoro_id: str, elapsed: int, status: str):
-        '''Update pomodoro progress'''
+    def _on_deadline(self, version: int) -> TimerCallback:
+        '''Timer engine callback for the row at `version`, the one its deadline was computed from'''
+        return partial(self.completed, version=version)
+
+    async def completed(self, pomodoro_id: str, version: Optional[int]=None):
+        '''
+        When a pomodoro is successfully finished. With `version`, a row changed since its deadline
+        was scheduled (an extend committed right at the deadline) is left to the newer timer.
+        '''
+        query = update(Pomodoro).where(Pomodoro.id == pomodoro_id, Pomodoro.status == "running")
+        if version is not None:
+            query = query.where(Pomodoro.version == version)
         async with AsyncSessionLocal() as db:
-            await db.execute(
-                update(Pomodoro).where(Pomodoro.id == pomodoro_id).values(worked_time=elapsed, status=status)
+            result = await db.execute(
+                query.values(status='completed', completed=True, worked_time=Pomodoro.timer, last_resume_time=None, end_time=datetime.now(),
+                             version=Pomodoro.version + 1)
+                .returning(Pomodoro)
             )
+            pomodoro = result.scalar_one_or_none()
+            if pomodoro:
+                await record_pomodoros(db, [pomodoro])
+                if pomodoro.cycles_left:
+                    await enqueue(db, "next", pomodoro.id, pomodoro.user_id, pomodoro.end_time + timedelta(seconds=pomodoro.rest_time or 0))
 
             await db.commit()
 
-    async def completed(self, pomodoro_id: str):
-        '''When a pomodoro is successfully finished'''
-        async with AsyncSessionLocal() as db:
-            await db.execute(
-                update(Pomodoro).where(Pomodoro.id == pomodoro_id).values(status='completed', end_time=datetime.now())
-            )
-
-            await db.commit()
+        # A transition that won the race (pause, stop) keeps the row; it re-syncs the engine itself
+        if pomodoro:
+            runner_registry.finish(pomodoro.id, pomodoro.version)
+            invalidate_analytics(pomodoro.user_id)
+            self._publish("completed", pomodoro)
 
     async def failed(self, pomodoro_id: str):
         '''When a pomodoro execution fails'''
         async with AsyncSessionLocal() as db:
-            await db.execute(
-                update(Pomodoro).where(Pomodoro.id == pomodoro_id).values(status='failed')
+            result = await db.execute(
+                update(Pomodoro).where(Pomodoro.id == pomodoro_id, Pomodoro.status.in_(LIVE_STATUSES))
+                .values(status='failed', version=Pomodoro.version + 1)
+                .returning(Pomodoro)
             )
+            pomodoro = result.scalar_one_or_none()
+            if pomodoro:
+                await record_pomodoros(db, [pomodoro])
 
             await db.commit()
 
-    async def stop(self, pomodoro_id: str, user_id: str):
-        async with AsyncSessionLocal() as db:
-            pomodoro = await self._get_pomodoro(pomodoro_id, user_id)
+        if pomodoro:
+            timer_engine.cancel(pomodoro.id)
+            runner_registry.finish(pomodoro.id, pomodoro.version)
+            invalidate_analytics(pomodoro.user_id)
+        event_hub.publish(int(pomodoro_id), {"event": "failed", "id": int(pomodoro_id), "status": "failed", "server_time": datetime.now()})
 
+    async def stop(self, pomodoro_id: str, user_id: str, expected_version: Optional[int]=None):
+        now = datetime.now()
+        async with AsyncSessionLocal() as db:
+            pomodoro = await self._transition(
+                db, "stop", pomodoro_id, user_id, LIVE_STATUSES, expected_version,
+                worked_time=self._worked_in_sql(db, now), status="stopped", last_resume_time=None, end_time=now,
+            )
             if not pomodoro:
                 return None
-            if pomodoro.status == "completed":
-                raise ValueError('Cannot play with a finished pomodoro.')
-            if pomodoro.status == "stopped":
-                raise ValueError('Pomodoro is already stopped.')
-            
-            task = self.running_tasks.get(pomodoro_id)
-            if task and not task.done():
-                task.cancel()
-                try:
-                    await task
-                except asyncio.CancelledError:
-                    pass
-                self.running_tasks.pop(pomodoro_id, None)
-
-            pomodoro.status = "stopped"
-            pomodoro.worked_time += (datetime.now() - pomodoro.last_resume_time).total_senconds()
-            pomodoro.last_resume_time = None
-
-            self._update_db(pomodoro, db)
+            await record_pomodoros(db, [pomodoro])
+            await db.commit()
 
+        self._sync_timer(pomodoro)
+        invalidate_analytics(pomodoro.user_id)
+        self._publish("stopped", pomodoro)
         return pomodoro
 
-    async def pause(self, pomodoro_id: str, user_id: str):
+    async def pause(self, pomodoro_id: str, user_id: str, expected_version: Optional[int]=None):
         async with AsyncSessionLocal() as db:
-            pomodoro = await self._get_pomodoro(pomodoro_id, user_id)
-
+            pomodoro = await self._transition(
+                db, "pause", pomodoro_id, user_id, ("running",), expected_version,
+                worked_time=self._worked_in_sql(db, datetime.now()), status="paused",
+                pause_count=func.coalesce(Pomodoro.pause_count, 0) + 1, last_resume_time=None, runner_id=RUNNER_ID,
+            )
             if not pomodoro:
                 return None
-            if pomodoro.completed == True:
-                raise ValueError('Cannot play with a finished pomodoro.')
-            if pomodoro.status != "running":
-                raise ValueError("Cannot pause a pomodoro that is not running.")
-            
-            if pomodoro.last_resume_time:
-                now = datetime.now()
-                elapsed = (now - pomodoro.last_resume_time).total_seconds()
-                pomodoro.worked_time += round(float(elapsed), 2)
-
-            remaining = pomodoro.timer - pomodoro.worked_time
-
-            pomodoro.status = "paused"
-            pomodoro.last_resume_time = None
-
-            db.add(pomodoro)
             await db.commit()
+
+        self._sync_timer(pomodoro)
+        self._publish("paused", pomodoro)
         return pomodoro
 
-    async def resume(self, pomodoro_id: str, user_id: str):
-        async with AsyncSessionLocal() as db:
-            pomodoro = await self._get_pomodoro(pomodoro_id, user_id)
+    async def resume(self, pomodoro_id: str, user_id: str, expected_version: Optional[int]=None):
+        '''
+        A paused pomodoro keeps the runner slot it has; a scheduled one started by hand needs
+        a new one, and is refused with TimerCapacityError like create_pomodoro
+        '''
+        reserved = int(pomodoro_id) not in runner_registry
+        if reserved:
+            runner_registry.reserve(user_id)
+        try:
+            async with AsyncSessionLocal() as db:
+                pomodoro = await self._transition(
+                    db, "resume", pomodoro_id, user_id, ("paused", "scheduled"), expected_version,
+                    status="running", last_resume_time=datetime.now(), runner_id=RUNNER_ID,
+                )
+                if pomodoro:
+                    await db.commit()
+        except BaseException:
+            if reserved:
+                runner_registry.release(user_id)
+            raise
+        if not pomodoro:
+            if reserved:
+                runner_registry.release(user_id)
+            return None
+
+        if reserved:
+            runner_registry.track(pomodoro.id, pomodoro.user_id, reserved=True)
+        self._sync_timer(pomodoro)
+        self._publish("resumed", pomodoro)
+        return pomodoro
 
+    async def extend(self, pomodoro_id: str, user_id: str, add_time: int, expected_version: Optional[int]=None):
+        '''Add `add_time` seconds to the pomodoro timer'''
+        async with AsyncSessionLocal() as db:
+            pomodoro = await self._transition(
+                db, "extend", pomodoro_id, user_id, LIVE_STATUSES, expected_version,
+                timer=Pomodoro.timer + add_time, runner_id=RUNNER_ID,
+            )
             if not pomodoro:
                 return None
-            if pomodoro.completed == True:
-                raise ValueError('Cannot play with a finished pomodoro.')
-            if pomodoro.status == "running":
-                raise ValueError('Pomodoro is already running.')
-            if pomodoro.status == "stopped":
-                raise ValueError('Cannot resume a pomodoro that was stopped.')
+            await db.commit()
 
-            pomodoro.status = "running"
-            pomodoro.last_resume_time = datetime.now()
+        self._sync_timer(pomodoro)
+        self._publish("extended", pomodoro)
+        return pomodoro
 
-            db.add(pomodoro)
+    async def update(self, pomodoro_id: str, user_id: str, values: dict, expected_version: Optional[int]=None):
+        '''
+        Edit `task_name`, `rest_time` or `timer`. A new timer is only accepted while the pomodoro
+        is live and moves its deadline like extend; status changes go through the transitions.
+        '''
+        allowed = LIVE_STATUSES if "timer" in values else LIVE_STATUSES + FINISHED_STATUSES
+        async with AsyncSessionLocal() as db:
+            pomodoro = await self._transition(db, "edit", pomodoro_id, user_id, allowed, expected_version, **values)
+            if not pomodoro:
+                return None
             await db.commit()
-        return pomodoro    
 
-    async def extend(self, pomodoro_id: str, add_time: int):
-        async with AsyncSessionLocal() as db:
-            pomodoro = await self._get_pomodoro(pomodoro_id)
+        if pomodoro.id in runner_registry:
+            self._sync_timer(pomodoro)
+            self._publish("updated", pomodoro)
+        return pomodoro
 
+    async def cancel_cycles(self, pomodoro_id: str, user_id: str, expected_version: Optional[int]=None):
+        '''Drop the work sessions still to come, including one waiting for the current rest to end'''
+        async with AsyncSessionLocal() as db:
+            pomodoro = await self._transition(
+                db, "cancel the cycles of", pomodoro_id, user_id, LIVE_STATUSES + ("completed",), expected_version,
+                cycles_left=0,
+            )
             if not pomodoro:
                 return None
-            if pomodoro.completed == True:
-                raise ValueError('Cannot play with a finished pomodoro.')
-            if pomodoro.status == "stopped":
-                raise ValueError('Cannot extend a pomodoro that was stopped.')
-            
-            pomodoro.timer += add_time.total_seconds()
-            db.add(pomodoro)
+            await db.execute(delete(PomodoroJob).where(PomodoroJob.kind == "next", PomodoroJob.pomodoro_id == pomodoro.id))
             await db.commit()
+
+        if pomodoro.id in runner_registry:
+            self._sync_timer(pomodoro)
         return pomodoro
 
-    async def _get_pomodoro(self, pomodoro_id: str, user_id: str):
+    async def _transition(self, db, action: str, pomodoro_id: str, user_id: str, allowed: tuple, expected_version: Optional[int], **values):
+        '''
+        One conditional `UPDATE ... WHERE id AND user_id AND status IN allowed [AND version] RETURNING *`.
+        Returns None when the pomodoro does not exist for the user, raises ValueError when its state
+        (or version) does not allow the transition.
+        '''
+        owned = (Pomodoro.id == int(pomodoro_id), Pomodoro.user_id == user_id)
+        query = update(Pomodoro).where(*owned, Pomodoro.status.in_(allowed))
+        if expected_version is not None:
+            query = query.where(Pomodoro.version == expected_version)
+
+        result = await db.execute(query.values(version=Pomodoro.version + 1, **values).returning(Pomodoro))
+        pomodoro = result.scalar_one_or_none()
+        if pomodoro:
+            return pomodoro
+
+        current = (await db.execute(select(Pomodoro.status, Pomodoro.version).where(*owned))).one_or_none()
+        if current is None:
+            return None
+        if current.status in allowed:
+            raise ValueError(f"Pomodoro was modified concurrently: version is {current.version}, expected {expected_version}.")
+        raise ValueError(f"Cannot {action} a pomodoro that is {current.status}.")
+
+    @staticmethod
+    def _worked_in_sql(db, now: datetime):
+        '''`_worked_until_now` as a SQL expression, evaluated against the row being updated'''
+        worked = func.coalesce(Pomodoro.worked_time, 0) + func.coalesce(seconds_between(db, Pomodoro.last_resume_time, now), 0)
+        return case((worked > Pomodoro.timer, Pomodoro.timer), else_=worked)
+
+    def _sync_timer(self, pomodoro: Pomodoro):
+        '''
+        Bring the timer engine in line with a committed row. Transitions can finish their
+        commits out of order, so a row older than the last one applied is ignored.
+        '''
+        if pomodoro.version < runner_registry.applied_version(pomodoro.id):
+            return
+        if pomodoro.status not in LIVE_STATUSES:
+            runner_registry.finish(pomodoro.id, pomodoro.version)
+            timer_engine.cancel(pomodoro.id)
+            return
+        if pomodoro.status == "scheduled" and pomodoro.id not in runner_registry:
+            return  # not started yet: the start job reserves its slot and schedules it then
+        runner_registry.track(pomodoro.id, pomodoro.user_id).version = pomodoro.version
+        remaining = pomodoro.timer - self._worked_until_now(pomodoro)
+        timer_engine.schedule(pomodoro.id, remaining, self._on_deadline(pomodoro.version), paused=pomodoro.status != "running")
+
+    @classmethod
+    def snapshot(cls, event: str, pomodoro: Pomodoro) -> dict:
+        '''Full timer state, enough for a client to tick locally until the next event'''
+        return {
+            "event": event,
+            "id": pomodoro.id,
+            "status": pomodoro.status,
+            "timer": pomodoro.timer,
+            "worked_time": pomodoro.worked_time,
+            "remaining_time": max(pomodoro.timer - cls._worked_until_now(pomodoro), 0),
+            "last_resume_time": pomodoro.last_resume_time,
+            "server_time": datetime.now(),
+        }
+
+    @classmethod
+    def _publish(cls, event: str, pomodoro: Pomodoro):
+        event_hub.publish(pomodoro.id, cls.snapshot(event, pomodoro))
+
+    @staticmethod
+    def _worked_until_now(pomodoro: Pomodoro) -> int:
+        '''Accumulated work plus the running stretch since the last resume'''
+        worked = pomodoro.worked_time or 0
+        if pomodoro.status == "running" and pomodoro.last_resume_time:
+            worked += int((datetime.now() - pomodoro.last_resume_time).total_seconds())
+        return min(worked, pomodoro.timer)
+
+ACTIVE_STATUSES = ("running", "paused")
+
+async def rehydrate_timers(batch_size: int=1000):
+    '''
+    Re-register this process's running/paused pomodoros (`runner_id` = RUNNER_ID) with the
+    timer engine after a restart. Live rows without an owner, written before the column
+    existed, are claimed first. Remaining time comes from the stored timestamps; rows that
+    ran out while the process was down are completed in bulk at their real deadline.
+    '''
+    restored = 0
+    overdue = []
+
+    async with AsyncSessionLocal() as db:
+        # A conditional UPDATE, so processes starting together cannot both claim a row
+        await db.execute(
+            update(Pomodoro)
+            .where(Pomodoro.runner_id.is_(None), Pomodoro.status.in_(ACTIVE_STATUSES))
+            .values(runner_id=RUNNER_ID)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            select(Pomodoro.id, Pomodoro.user_id, Pomodoro.timer, Pomodoro.worked_time, Pomodoro.status, Pomodoro.last_resume_time, Pomodoro.version)
+            .where(Pomodoro.runner_id == RUNNER_ID, Pomodoro.status.in_(ACTIVE_STATUSES))
+            .execution_options(yield_per=batch_size)
+        )
+
+        async for rows in result.partitions():
+            now = datetime.now()
+            running = []
+            for row in rows:
+                remaining = row.timer - (row.worked_time or 0)
+                if row.status == "running":
+                    resumed_at = row.last_resume_time or now
+                    remaining -= (now - resumed_at).total_seconds()
+                    if remaining <= 0:
+                        overdue.append((row, now + timedelta(seconds=remaining)))
+                        continue
+                # Admitted before the restart, so not held to the caps again: lowered caps only refuse new timers
+                runner_registry.track(row.id, row.user_id).version = row.version
+                if row.status == "paused":
+                    timer_engine.schedule(row.id, max(remaining, 0), PomodoroTimer(row.user_id)._on_deadline(row.version), paused=True)
+                    restored += 1
+                else:
+                    running.append((row.id, remaining, PomodoroTimer(row.user_id)._on_deadline(row.version)))
+            restored += timer_engine.schedule_many(running)
+
+    # Written once the cursor is closed, SQLite cannot write under an open read
+    completed = 0
+    for i in range(0, len(overdue), batch_size):
+        batch = overdue[i:i + batch_size]
         async with AsyncSessionLocal() as db:
-            result = await db.execute(select(Pomodoro).where(Pomodoro.id == int(pomodoro_id), Pomodoro.user_id == user_id)) 
-        return result.scalar_one_or_none()
\ No newline at end of file
+            # The same conditional transition as `completed`, at each row's real deadline: a row
+            # changed since it was read (paused, stopped, another process) is left alone
+            result = await db.scalars(
+                update(Pomodoro)
+                .where(tuple_(Pomodoro.id, Pomodoro.version).in_([(row.id, row.version) for row, _ in batch]), Pomodoro.status == "running")
+                .values(status='completed', completed=True, worked_time=Pomodoro.timer, last_resume_time=None,
+                        end_time=case({row.id: end_time for row, end_time in batch}, value=Pomodoro.id), version=Pomodoro.version + 1)
+                .returning(Pomodoro)
+                .execution_options(synchronize_session=False)
+            )
+            pomodoros = result.all()
+            await record_pomodoros(db, pomodoros)
+            # Cycles continue after their rest, counted from the real deadline
+            next_jobs = [
+                {"kind": "next", "pomodoro_id": p.id, "user_id": p.user_id, "status": "queued", "attempts": 0,
+                 "due_at": p.end_time + timedelta(seconds=p.rest_time or 0)}
+                for p in pomodoros if p.cycles_left
+            ]
+            if next_jobs:
+                await db.execute(insert(PomodoroJob), next_jobs)
+            await db.commit()
+        completed += len(pomodoros)
+
+    logger.info("Rehydrated %d pomodoro timers, completed %d overdue.", restored, completed)
+    return restored, completed
+
+
+def _admit(jobs: list[PomodoroJob]) -> tuple[list[PomodoroJob], dict]:
+    '''Reserve a runner slot per job; jobs over a cap are deferred'''
+    admitted, deferred, seen = [], {}, set()
+    for job in jobs:
+        if job.pomodoro_id in seen:
+            continue
+        try:
+            runner_registry.reserve(job.user_id)
+        except TimerCapacityError as e:
+            deferred[job.id] = str(e)
+            continue
+        seen.add(job.pomodoro_id)
+        admitted.append(job)
+    return admitted, deferred
+
+def _release(jobs: list[PomodoroJob]):
+    for job in jobs:
+        runner_registry.release(job.user_id)
+
+def _start_timers(started: list[Pomodoro], unused: list[PomodoroJob]):
+    '''After commit: track and schedule the started pomodoros, hand back the slots of the others'''
+    _release(unused)
+    for pomodoro in started:
+        runner_registry.track(pomodoro.id, pomodoro.user_id, reserved=True).version = pomodoro.version
+    timer_engine.schedule_many((p.id, p.timer, PomodoroTimer(p.user_id)._on_deadline(p.version)) for p in started)
+    for pomodoro in started:
+        PomodoroTimer._publish("started", pomodoro)
+
+async def start_scheduled_pomodoros(db, jobs: list[PomodoroJob], now: datetime) -> JobResult:
+    '''Job handler: start scheduled pomodoros whose start time has come'''
+    admitted, deferred = _admit(jobs)
+    if not admitted:
+        return JobResult(deferred)
+    try:
+        # Pomodoros stopped or started by hand in the meantime are left alone
+        result = await db.scalars(
+            update(Pomodoro)
+            .where(Pomodoro.id.in_([job.pomodoro_id for job in admitted]), Pomodoro.status == "scheduled")
+            .values(status="running", start_time=now, last_resume_time=now, runner_id=RUNNER_ID, version=Pomodoro.version + 1)
+            .returning(Pomodoro)
+            .execution_options(synchronize_session=False)
+        )
+        started = result.all()
+    except BaseException:
+        _release(admitted)
+        raise
+    started_ids = {p.id for p in started}
+    unused = [job for job in admitted if job.pomodoro_id not in started_ids]
+    return JobResult(deferred, on_commit=lambda: _start_timers(started, unused), on_abort=lambda: _release(admitted))
+
+async def start_next_sessions(db, jobs: list[PomodoroJob], now: datetime) -> JobResult:
+    '''
+    Job handler: once a rest is over, start the next work session of the cycle. The remaining
+    cycles move from the finished session to the new one with a conditional UPDATE, so a job
+    that runs twice (its lease expired) or whose cycles were cancelled starts nothing.
+    '''
+    previous = {
+        p.id: p for p in (await db.scalars(select(Pomodoro).where(Pomodoro.id.in_([job.pomodoro_id for job in jobs])))).all()
+    }
+    admitted, deferred = _admit([job for job in jobs if job.pomodoro_id in previous and previous[job.pomodoro_id].cycles_left])
+    if not admitted:
+        return JobResult(deferred)
+    try:
+        handed_over = set((await db.scalars(
+            update(Pomodoro)
+            .where(Pomodoro.id.in_([job.pomodoro_id for job in admitted]), Pomodoro.cycles_left > 0)
+            .values(cycles_left=0, version=Pomodoro.version + 1)
+            .returning(Pomodoro.id)
+            .execution_options(synchronize_session=False)
+        )).all())
+        started = []
+        if handed_over:
+            result = await db.scalars(
+                insert(Pomodoro).returning(Pomodoro, sort_by_parameter_order=True),
+                [
+                    _running_row(p.user_id, p.timer, p.rest_time, p.task_name, p.cycles_left - 1, now)
+                    for p in (previous[job.pomodoro_id] for job in admitted if job.pomodoro_id in handed_over)
+                ],
+            )
+            started = result.all()
+    except BaseException:
+        _release(admitted)
+        raise
+    unused = [job for job in admitted if job.pomodoro_id not in handed_over]
+    return JobResult(deferred, on_commit=lambda: _start_timers(started, unused), on_abort=lambda: _release(admitted))
+
+job_queue.register("start", start_scheduled_pomodoros)
+job_queue.register("next", start_next_sessions)
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+import socket
+from collections import Counter, OrderedDict
+from typing import Coroutine, Optional
+from app.core.deadline import detached
+
+logger = logging.getLogger(__name__)
+
+# Live (running, paused or starting) timers one process accepts; 0 disables a cap
+MAX_ACTIVE_TIMERS = int(os.getenv("MAX_ACTIVE_TIMERS", "10000"))
+MAX_ACTIVE_TIMERS_PER_USER = int(os.getenv("MAX_ACTIVE_TIMERS_PER_USER", "10"))
+CAPACITY_RETRY_AFTER = int(os.getenv("CAPACITY_RETRY_AFTER", "30"))  # seconds suggested to rejected clients
+# Written on the rows whose timers this process runs, so a restart only restores its own.
+# Keep it stable across restarts and distinct between processes sharing a database.
+RUNNER_ID = os.getenv("RUNNER_ID") or socket.gethostname()
+FINISHED_MEMORY = 10000  # final versions kept to recognise transitions that commit late
+
+
+class TimerCapacityError(Exception):
+    '''Raised when a new timer would exceed the process (`scope="process"`) or user (`scope="user"`) cap'''
+
+    def __init__(self, scope: str, limit: int, count: int=1):
+        self.scope = scope
+        self.limit = limit
+        if scope == "user" and count > 1:
+            message = f"Starting {count} more pomodoros would go over your limit of {limit} active ones."
+        elif scope == "user":
+            message = f"You already have {limit} active pomodoros, stop or finish one first."
+        else:
+            message = "Too many active pomodoros on this server, try again shortly."
+        super().__init__(message)
+
+
+class Runner:
+    __slots__ = ("pomodoro_id", "user_id", "version", "task")
+
+    def __init__(self, pomodoro_id: int, user_id: str):
+        self.pomodoro_id = pomodoro_id
+        self.user_id = user_id
+        self.version = 0  # row version last applied to the timer engine
+        self.task: Optional[asyncio.Task] = None
+
+
+class RunnerRegistry:
+    '''
+    Process-wide bookkeeping of live pomodoros: one runner per pomodoro id,
+    its owner (for the per-user cap) and the handle of its start task.
+    New timers reserve a slot before their row is written, so concurrent
+    creates cannot overshoot the caps between the check and the insert.
+    '''
+
+    def __init__(self, max_active: int=MAX_ACTIVE_TIMERS, max_per_user: int=MAX_ACTIVE_TIMERS_PER_USER):
+        self.max_active = max_active
+        self.max_per_user = max_per_user
+        self._runners: dict[int, Runner] = {}
+        self._per_user: Counter = Counter()  # active runners plus pending reservations
+        self._reserved = 0
+        self._finished: OrderedDict[int, int] = OrderedDict()  # pomodoro id -> final row version
+
+        self.rejected = Counter()  # scope -> rejected timers
+
+    def __len__(self):
+        return len(self._runners)
+
+    def __contains__(self, pomodoro_id: int):
+        return pomodoro_id in self._runners
+
+    def active_for(self, user_id: str) -> int:
+        return self._per_user[user_id]
+
+    def reserve(self, user_id: str, count: int=1):
+        '''Hold `count` slots for timers about to be created, or raise TimerCapacityError'''
+        if self.max_active and len(self._runners) + self._reserved + count > self.max_active:
+            self.rejected["process"] += count
+            raise TimerCapacityError("process", self.max_active)
+        if self.max_per_user and self._per_user[user_id] + count > self.max_per_user:
+            self.rejected["user"] += count
+            raise TimerCapacityError("user", self.max_per_user, count)
+        self._reserved += count
+        self._per_user[user_id] += count
+
+    def release(self, user_id: str, count: int=1):
+        '''Give back reserved slots that were not used'''
+        self._reserved -= count
+        self._drop_user(user_id, count)
+
+    def track(self, pomodoro_id: int, user_id: str, reserved: bool=False) -> Runner:
+        '''Register a live pomodoro (idempotent); `reserved` consumes one slot taken with `reserve`'''
+        runner = self._runners.get(pomodoro_id)
+        if runner is not None:
+            if reserved:
+                self.release(user_id)
+            return runner
+        runner = self._runners[pomodoro_id] = Runner(pomodoro_id, user_id)
+        if reserved:
+            self._reserved -= 1
+        else:
+            self._per_user[user_id] += 1
+        return runner
+
+    def get(self, pomodoro_id: int) -> Optional[Runner]:
+        return self._runners.get(pomodoro_id)
+
+    def applied_version(self, pomodoro_id: int) -> int:
+        '''Row version last applied to the pomodoro's timer, 0 when unknown'''
+        runner = self._runners.get(pomodoro_id)
+        if runner is not None:
+            return runner.version
+        return self._finished.get(pomodoro_id, 0)
+
+    def start(self, pomodoro_id: int, coro: Coroutine) -> asyncio.Task:
+        '''
+        Run `coro` as the pomodoro's start task unless one is already in flight. The task
+        outlives the request that started it, so it does not inherit the request's deadline.
+        '''
+        runner = self._runners[pomodoro_id]
+        if runner.task is not None and not runner.task.done():
+            coro.close()
+            return runner.task
+        runner.task = asyncio.get_running_loop().create_task(coro, context=detached())
+        runner.task.add_done_callback(self._task_done)
+        return runner.task
+
+    def finish(self, pomodoro_id: int, version: int=0) -> bool:
+        '''Forget a pomodoro that reached a final state, cancelling its start task if still pending'''
+        if version:
+            self._finished[pomodoro_id] = version
+            self._finished.move_to_end(pomodoro_id)
+            if len(self._finished) > FINISHED_MEMORY:
+                self._finished.popitem(last=False)
+        runner = self._runners.pop(pomodoro_id, None)
+        if runner is None:
+            return False
+        if runner.task is not None and not runner.task.done() and runner.task is not asyncio.current_task():
+            runner.task.cancel()
+        self._drop_user(runner.user_id)
+        return True
+
+    def _drop_user(self, user_id: str, count: int=1):
+        self._per_user[user_id] -= count
+        if self._per_user[user_id] <= 0:
+            del self._per_user[user_id]
+
+    @staticmethod
+    def _task_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Pomodoro runner failed", exc_info=task.exception())
+
+
+runner_registry = RunnerRegistry()
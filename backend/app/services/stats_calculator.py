@@ -0,0 +1,252 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+import os
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.db.dialect import upsert_insert
+from app.db.models.pomodoro import Pomodoro
+from app.db.models.stats import FocusRollup, StudyRollup
+from app.db.models.study import Study
+from app.db.session import AsyncSessionLocal
+
+PERIODS = ("day", "week")
+# Sessions counted as focus time, both in the rollups and in the analytics
+FINISHED_STATUSES = ("completed", "failed", "stopped")
+
+def period_start(day: date, period: str) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+def _day_of(moment: Optional[datetime]) -> date:
+    return (moment or datetime.now()).date()
+
+async def _add_to_rollup(db: AsyncSession, model, rows: list[dict], counters: Iterable[str]):
+    '''Multi-row upsert that adds `counters` onto existing rollup rows'''
+    if not rows:
+        return
+    keys = [column.name for column in model.__table__.primary_key.columns]
+    stmt = upsert_insert(db, model).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: getattr(model, name) + getattr(stmt.excluded, name) for name in counters},
+    )
+    await db.execute(stmt)
+
+async def record_focus(db: AsyncSession, entries: Iterable[tuple[str, date, int, int, int]]):
+    '''
+    Add (user_id, day, focus_seconds, completed, failed) entries to the focus rollups.
+    Runs inside the caller's transaction so the rollup commits with the pomodoro change.
+    '''
+    totals = defaultdict(lambda: [0, 0, 0])
+    for user_id, day, focus_seconds, completed, failed in entries:
+        for period in PERIODS:
+            total = totals[(user_id, period, period_start(day, period))]
+            total[0] += focus_seconds
+            total[1] += completed
+            total[2] += failed
+
+    await _add_to_rollup(db, FocusRollup, [
+        {"user_id": user_id, "period": period, "period_start": start, "focus_seconds": t[0], "completed_count": t[1], "failed_count": t[2]}
+        for (user_id, period, start), t in totals.items()
+    ], ("focus_seconds", "completed_count", "failed_count"))
+
+async def record_pomodoros(db: AsyncSession, pomodoros: Iterable[Pomodoro]):
+    '''Roll up finished pomodoros (completed, failed or stopped), keyed by the day they started'''
+    await record_focus(db, [
+        (p.user_id, _day_of(p.start_time), p.worked_time or 0, int(p.status == "completed"), int(p.status == "failed"))
+        for p in pomodoros
+    ])
+
+async def record_study(db: AsyncSession, records: Iterable[Study]):
+    totals = defaultdict(lambda: [0, 0])
+    for record in records:
+        day = _day_of(record.timestamp)
+        for period in PERIODS:
+            total = totals[(record.user_id, period, period_start(day, period), record.topic or "")]
+            total[0] += record.study_time
+            total[1] += 1
+
+    await _add_to_rollup(db, StudyRollup, [
+        {"user_id": user_id, "period": period, "period_start": start, "topic": topic, "study_minutes": t[0], "sessions": t[1]}
+        for (user_id, period, start, topic), t in totals.items()
+    ], ("study_minutes", "sessions"))
+
+async def get_focus_stats(db: AsyncSession, user_id: str, period: str, start: date, end: date):
+    result = await db.execute(
+        select(FocusRollup)
+        .where(
+            FocusRollup.user_id == user_id,
+            FocusRollup.period == period,
+            FocusRollup.period_start >= period_start(start, period),
+            FocusRollup.period_start <= end,
+        )
+        .order_by(FocusRollup.period_start)
+    )
+    return result.scalars().all()
+
+async def get_study_stats(db: AsyncSession, user_id: str, period: str, start: date, end: date, topic: Optional[str]=None):
+    query = select(StudyRollup).where(
+        StudyRollup.user_id == user_id,
+        StudyRollup.period == period,
+        StudyRollup.period_start >= period_start(start, period),
+        StudyRollup.period_start <= end,
+    )
+    if topic is not None:
+        query = query.where(StudyRollup.topic == topic)
+    result = await db.execute(query.order_by(StudyRollup.period_start, StudyRollup.topic))
+    return result.scalars().all()
+
+async def backfill_rollups(chunk_size: int=5000):
+    '''
+    Rebuild every rollup from the raw history, reading it in id-ordered chunks.
+    Meant for maintenance windows: writes landing mid-run can be counted twice.
+    '''
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(FocusRollup))
+        await db.execute(delete(StudyRollup))
+        await db.commit()
+
+    sources = (
+        (Pomodoro, Pomodoro.status.in_(FINISHED_STATUSES), record_pomodoros),
+        (Study, None, record_study),
+    )
+    counts = {}
+    for model, condition, record in sources:
+        last_id, total = 0, 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                query = select(model).where(model.id > last_id)
+                if condition is not None:
+                    query = query.where(condition)
+                rows = (await db.execute(query.order_by(model.id).limit(chunk_size))).scalars().all()
+                if not rows:
+                    break
+                await record(db, rows)
+                await db.commit()
+            last_id = rows[-1].id
+            total += len(rows)
+        counts[model.__tablename__] = total
+    return counts
+
+
+# ---- Focus pattern analytics ----
+# Computed with NumPy over whole columns of a user's finished pomodoros and
+# memoized per user until one of their sessions changes.
+
+PAUSE_BUCKETS = 4  # 0, 1, 2, 3+ pauses
+
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "2000"))
+# Upper bound on staleness when another worker process wrote the session
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "900"))
+analytics_cache = TTLCache(maxsize=ANALYTICS_CACHE_SIZE, ttl=ANALYTICS_CACHE_TTL)
+# Per-user write counter, so a result computed while a session was being written is not memoized
+_analytics_writes = TTLCache(maxsize=ANALYTICS_CACHE_SIZE * 4, ttl=ANALYTICS_CACHE_TTL)
+
+def invalidate_analytics(user_id: str):
+    analytics_cache.pop(user_id)
+    _analytics_writes.set(user_id, _analytics_writes.get(user_id, 0) + 1)
+
+async def load_focus_columns(db: AsyncSession, user_id: str) -> dict[str, np.ndarray]:
+    '''A user's finished pomodoros as column arrays, one entry per session'''
+    result = await db.execute(
+        select(
+            Pomodoro.start_time,
+            Pomodoro.timer,
+            func.coalesce(Pomodoro.worked_time, 0),
+            Pomodoro.status == "completed",
+            func.coalesce(Pomodoro.pause_count, 0),
+        )
+        .where(Pomodoro.user_id == user_id, Pomodoro.status.in_(FINISHED_STATUSES))
+    )
+    columns = list(zip(*result.all())) or [()] * 5
+    return {
+        "start_time": np.array(columns[0], dtype="datetime64[s]"),
+        "timer": np.array(columns[1], dtype=np.int64),
+        "worked_time": np.array(columns[2], dtype=np.int64),
+        "completed": np.array(columns[3], dtype=bool),
+        "pause_count": np.array(columns[4], dtype=np.int64),
+    }
+
+def _streaks(days: np.ndarray, today: date) -> tuple[int, int]:
+    '''(current, longest) runs of consecutive days in a sorted array of unique day numbers'''
+    if days.size == 0:
+        return 0, 0
+    breaks = np.flatnonzero(np.diff(days) != 1) + 1
+    bounds = np.concatenate(([0], breaks, [days.size]))
+    runs = np.diff(bounds)
+    # The current streak survives until the end of today
+    yesterday = (today - date(1970, 1, 1)).days - 1
+    return int(runs[-1]) if days[-1] >= yesterday else 0, int(runs.max())
+
+def _group_counts(keys: np.ndarray, weights: np.ndarray):
+    '''Unique non-negative keys with their counts and weight sums, bincount when the key range is small'''
+    if keys.size and 0 <= keys.min() and keys.max() <= 100_000:
+        counts = np.bincount(keys)
+        present = np.flatnonzero(counts)
+        return present, counts[present], np.bincount(keys, weights=weights)[present]
+    unique, group = np.unique(keys, return_inverse=True)
+    return unique, np.bincount(group, minlength=unique.size), np.bincount(group, weights=weights, minlength=unique.size)
+
+def compute_focus_analytics(columns: dict[str, np.ndarray], today: Optional[date]=None) -> dict:
+    today = today or date.today()
+    start = columns["start_time"]
+    completed = columns["completed"]
+    worked = columns["worked_time"]
+
+    # Whole seconds since the epoch; sessions without a start time only count towards totals
+    seconds = start.astype("datetime64[s]").view(np.int64)
+    dated = ~np.isnat(start)
+    if not dated.all():
+        seconds, completed_dated, worked = seconds[dated], completed[dated], worked[dated]
+    else:
+        completed_dated = completed
+    day_numbers = seconds // 86400
+
+    # Streaks: consecutive days with at least one completed pomodoro
+    completed_days = day_numbers[completed_dated]
+    if completed_days.size:
+        first = completed_days.min()
+        completed_days = np.flatnonzero(np.bincount(completed_days - first)) + first
+    current_streak, longest_streak = _streaks(completed_days, today)
+
+    # Weekday x hour heatmap of worked seconds; 1970-01-01 was a Thursday, Monday is 0
+    cell = (day_numbers + 3) % 7 * 24 + seconds % 86400 // 3600
+    heatmap = np.bincount(cell, weights=worked, minlength=7 * 24).reshape(7, 24)
+
+    # Completion rate per planned length, in whole minutes
+    lengths, totals, finished = _group_counts(columns["timer"] // 60, completed)
+
+    pauses = columns["pause_count"]
+    sessions = int(pauses.size)
+    return {
+        "sessions": sessions,
+        "current_streak": current_streak,
+        "longest_streak": longest_streak,
+        "heatmap": heatmap.astype(np.int64).tolist(),
+        "completion_by_length": [
+            {"timer_minutes": int(m), "sessions": int(t), "completed": int(c), "completion_rate": float(c / t)}
+            for m, t, c in zip(lengths, totals, finished)
+        ],
+        "pauses": {
+            "average": float(pauses.mean()) if sessions else 0.0,
+            "paused_share": float(np.count_nonzero(pauses) / sessions) if sessions else 0.0,
+            "histogram": np.bincount(np.minimum(pauses, PAUSE_BUCKETS - 1), minlength=PAUSE_BUCKETS).tolist(),
+        },
+    }
+
+async def get_focus_analytics(db: AsyncSession, user_id: str) -> dict:
+    today = date.today()
+    cached = analytics_cache.get(user_id)
+    # Streaks depend on the current date, so a memo from yesterday is stale
+    if cached is not None and cached[0] == today:
+        return cached[1]
+
+    writes = _analytics_writes.get(user_id, 0)
+    analytics = compute_focus_analytics(await load_focus_columns(db, user_id), today)
+    if _analytics_writes.get(user_id, 0) == writes:
+        analytics_cache.set(user_id, (today, analytics))
+    return analytics
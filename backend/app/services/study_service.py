@@ -1,7 +1,16 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models.study import Study
 from sqlalchemy.future import select
-from app.schemas.study import StudyCreate
+from sqlalchemy import insert
+from app.schemas.study import StudyCreate, StudyImportRow
+from app.services.stats_calculator import record_study
+from app.crud.crud_study import get_study_sessions
+from app.services.bulk_io import ImportReport, IMPORT_BATCH_SIZE, insert_rows, iter_lines, iter_records
+from pydantic import ValidationError
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+IMPORT_COLUMNS = ["user_id", "topic", "study_time", "notes", "timestamp"]
 
 class StudyService:
     def __init__(self, db: AsyncSession, user_id: str):
@@ -20,14 +29,69 @@ class StudyService:
         )
 
         self.db.add(new_study_record)
+        await self.db.flush()
+        await record_study(self.db, [new_study_record])
         await self.db.commit()
         await self.db.refresh(new_study_record)
         return new_study_record
 
-    async def get_study_records(self):
-        query = select(Study).where(Study.user_id == self.user_id)
-        result = await self.db.execute(query)
-        return result.scalars().all()
+    async def create_study_records(self, items: list[StudyCreate]):
+        '''Insert several records in one transaction with a single multi-row INSERT ... RETURNING'''
+        now = datetime.now(timezone.utc)
+        rows = []
+        for item in items:
+            # Queued offline records carry their own time; the schema default is not a real time
+            timestamp = item.timestamp if "timestamp" in item.model_fields_set and item.timestamp else now
+            rows.append({"user_id": self.user_id, "topic": item.topic, "study_time": item.study_time, "notes": item.notes, "timestamp": timestamp})
+
+        result = await self.db.scalars(insert(Study).returning(Study, sort_by_parameter_order=True), rows)
+        records = result.all()
+        await record_study(self.db, records)
+        await self.db.commit()
+        return records
+
+    async def get_study_records(self, limit: int=20, cursor: Optional[str]=None, topic: Optional[str]=None,
+                                start: Optional[datetime]=None, end: Optional[datetime]=None):
+        return await get_study_sessions(self.db, self.user_id, limit=limit, cursor=cursor, topic=topic, start=start, end=end)
+
+    async def import_records(self, chunks: AsyncIterator[bytes], fmt: str) -> ImportReport:
+        '''
+        Insert records from a streamed CSV/NDJSON body in batches, committing each batch.
+        Invalid rows are skipped and reported by line number.
+        '''
+        report = ImportReport()
+        batch = []
+        try:
+            async for line, record, error in iter_records(iter_lines(chunks), fmt):
+                if error is None:
+                    try:
+                        row = StudyImportRow.model_validate(record)
+                    except ValidationError as e:
+                        error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                if error is not None:
+                    report.error(line, error)
+                    continue
+
+                timestamp = row.timestamp or datetime.now(timezone.utc)
+                timestamp = timestamp.replace(tzinfo=timezone.utc) if timestamp.tzinfo is None else timestamp.astimezone(timezone.utc)
+                batch.append({"user_id": self.user_id, "topic": row.topic, "study_time": row.study_time, "notes": row.notes, "timestamp": timestamp})
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    rows, batch = batch, []
+                    await self._insert_batch(rows)
+                    report.inserted += len(rows)
+        except ValueError as e:
+            report.aborted = str(e)
+
+        await self._insert_batch(batch)
+        report.inserted += len(batch)
+        return report
+
+    async def _insert_batch(self, rows: list[dict]):
+        if not rows:
+            return
+        await insert_rows(self.db, Study, IMPORT_COLUMNS, rows)
+        await record_study(self.db, [Study(**row) for row in rows])
+        await self.db.commit()
 
     async def delete_study_record(self, record_id: int):
         query = select(Study).where(
@@ -0,0 +1,236 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Awaitable, Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+TimerCallback = Callable[[int], Awaitable[None]]
+
+
+class TimerEntry:
+    __slots__ = ("pomodoro_id", "deadline", "remaining", "callback", "seq")
+
+    def __init__(self, pomodoro_id: int, callback: TimerCallback):
+        self.pomodoro_id = pomodoro_id
+        self.callback = callback
+        self.deadline: Optional[float] = None  # loop time, None while paused
+        self.remaining: float = 0.0
+        self.seq = 0
+
+    @property
+    def paused(self):
+        return self.deadline is None
+
+
+class TimerEngine:
+    '''
+    Shared deadline scheduler for every running pomodoro in the process.
+    Timers live in a heap keyed by monotonic deadline and a single loop sleeps
+    until the earliest one is due, so idle timers cost no wakeups.
+    Re-keying (pause/resume/extend) pushes a new heap item and bumps the entry
+    sequence; stale heap items are skipped when they reach the top.
+    '''
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, int]] = []
+        self._entries: dict[int, TimerEntry] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._wakeup_handle: Optional[asyncio.TimerHandle] = None
+        self._armed_at: Optional[float] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._callbacks: set[asyncio.Task] = set()
+
+        self.wakeups = 0
+        self.fired = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, pomodoro_id: int):
+        return pomodoro_id in self._entries
+
+    @property
+    def running(self):
+        return self._runner is not None and not self._runner.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._runner = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._wakeup_handle:
+            self._wakeup_handle.cancel()
+            self._wakeup_handle = None
+        self._armed_at = None
+        if self._runner:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        if self._callbacks:
+            await asyncio.gather(*self._callbacks, return_exceptions=True)
+
+    def schedule(self, pomodoro_id: int, seconds: float, callback: TimerCallback, paused: bool=False):
+        '''Register (or re-register) a timer that fires `callback(pomodoro_id)` after `seconds`.'''
+        entry = self._entries.get(pomodoro_id)
+        if entry is None:
+            entry = TimerEntry(pomodoro_id, callback)
+            self._entries[pomodoro_id] = entry
+        entry.callback = callback
+        entry.remaining = max(float(seconds), 0.0)
+        if paused:
+            entry.deadline = None
+            entry.seq = next(self._seq)
+        else:
+            self._push(entry, self._now() + entry.remaining)
+        return entry
+
+    def schedule_many(self, timers: Iterable[tuple[int, float, TimerCallback]]) -> int:
+        '''Register (pomodoro_id, seconds, callback) timers at once, with one heap rebuild and one wakeup.'''
+        now = self._now()
+        items = []
+        for pomodoro_id, seconds, callback in timers:
+            entry = self._entries.get(pomodoro_id)
+            if entry is None:
+                entry = TimerEntry(pomodoro_id, callback)
+                self._entries[pomodoro_id] = entry
+            entry.callback = callback
+            entry.remaining = max(float(seconds), 0.0)
+            entry.deadline = now + entry.remaining
+            entry.seq = next(self._seq)
+            items.append((entry.deadline, entry.seq, pomodoro_id))
+        if not items:
+            return 0
+
+        if len(items) > len(self._heap):
+            self._heap.extend(items)
+            heapq.heapify(self._heap)
+        else:
+            for item in items:
+                heapq.heappush(self._heap, item)
+        earliest = min(items)[0]
+        if self._armed_at is None or earliest < self._armed_at:
+            self._wakeup.set()
+        return len(items)
+
+    def pause(self, pomodoro_id: int) -> Optional[float]:
+        '''Freeze a timer and return its remaining seconds.'''
+        entry = self._entries.get(pomodoro_id)
+        if entry is None:
+            return None
+        if not entry.paused:
+            entry.remaining = max(entry.deadline - self._now(), 0.0)
+            entry.deadline = None
+            entry.seq = next(self._seq)  # invalidates the heap item
+        return entry.remaining
+
+    def resume(self, pomodoro_id: int) -> Optional[float]:
+        '''Restart a paused timer from its remaining seconds.'''
+        entry = self._entries.get(pomodoro_id)
+        if entry is None:
+            return None
+        if entry.paused:
+            self._push(entry, self._now() + entry.remaining)
+        return self.remaining(pomodoro_id)
+
+    def extend(self, pomodoro_id: int, seconds: float) -> Optional[float]:
+        '''Add (or with a negative value, remove) time from a timer.'''
+        entry = self._entries.get(pomodoro_id)
+        if entry is None:
+            return None
+        if entry.paused:
+            entry.remaining = max(entry.remaining + seconds, 0.0)
+        else:
+            self._push(entry, entry.deadline + seconds)
+        return self.remaining(pomodoro_id)
+
+    def cancel(self, pomodoro_id: int) -> bool:
+        return self._entries.pop(pomodoro_id, None) is not None
+
+    def remaining(self, pomodoro_id: int) -> Optional[float]:
+        entry = self._entries.get(pomodoro_id)
+        if entry is None:
+            return None
+        if entry.paused:
+            return entry.remaining
+        return max(entry.deadline - self._now(), 0.0)
+
+    def _now(self):
+        return asyncio.get_running_loop().time()
+
+    def _push(self, entry: TimerEntry, deadline: float):
+        entry.deadline = deadline
+        entry.seq = next(self._seq)
+        heapq.heappush(self._heap, (deadline, entry.seq, entry.pomodoro_id))
+        if self._armed_at is None or deadline < self._armed_at:
+            self._wakeup.set()
+
+    def _arm(self, deadline: float):
+        '''Make sure the scheduler wakes up at `deadline`.'''
+        if self._armed_at is not None and self._armed_at <= deadline:
+            return
+        if self._wakeup_handle:
+            self._wakeup_handle.cancel()
+        self._armed_at = deadline
+        self._wakeup_handle = asyncio.get_running_loop().call_at(deadline, self._wakeup.set)
+
+    def _pop_due(self, now: float):
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            deadline, seq, pomodoro_id = heapq.heappop(heap)
+            entry = self._entries.get(pomodoro_id)
+            if entry is None or entry.seq != seq:
+                continue  # cancelled or re-keyed
+            del self._entries[pomodoro_id]
+            due.append((entry, deadline))
+        return due
+
+    def _fire(self, entry: TimerEntry, deadline: float, now: float):
+        lag = now - deadline
+        self.fired += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+
+        task = asyncio.get_running_loop().create_task(entry.callback(entry.pomodoro_id))
+        self._callbacks.add(task)
+        task.add_done_callback(self._callback_done)
+
+    def _callback_done(self, task: asyncio.Task):
+        self._callbacks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Timer callback failed", exc_info=task.exception())
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            self.wakeups += 1
+
+            now = self._now()
+            if self._armed_at is not None and self._armed_at <= now:
+                self._armed_at = None
+                self._wakeup_handle = None
+
+            for entry, deadline in self._pop_due(now):
+                self._fire(entry, deadline, now)
+
+            # Drop stale items so the head is always a live deadline
+            while self._heap:
+                deadline, seq, pomodoro_id = self._heap[0]
+                entry = self._entries.get(pomodoro_id)
+                if entry is not None and entry.seq == seq:
+                    self._arm(deadline)
+                    break
+                heapq.heappop(self._heap)
+
+
+timer_engine = TimerEngine()
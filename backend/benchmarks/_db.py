@@ -0,0 +1,39 @@
+'''
+Shared setup for benchmarks that need a database. Defaults to a throwaway
+SQLite file so they run anywhere; point BENCH_DATABASE_URL at a local
+Postgres for realistic numbers.
+'''
+import os
+
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "bench-secret")
+
+from sqlalchemy import event
+
+from app.db.base import Base
+from app.db.models import job, pomodoro, stats, study, user  # noqa: F401  (register tables)
+from app.db.session import engine
+
+
+async def reset_schema():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+class WriteCounter:
+    '''Counts INSERT/UPDATE/DELETE statements that reach the database.'''
+
+    def __init__(self):
+        self.writes = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+            self.writes += 1
+
+    def reset(self):
+        self.writes = 0
+
+    def close(self):
+        event.remove(engine.sync_engine, "before_cursor_execute", self._on_execute)
@@ -0,0 +1,153 @@
+'''
+A burst of LLM-path prompts against a slow fake LLM, through the admission
+layer in front of the agent. Checks that:
+
+  * upstream calls never exceeded the global or per-user limits,
+  * what could not be queued was refused at once (429/503) instead of hanging,
+  * command-style prompts waited less for a slot than open-ended chat,
+  * every slot was given back afterwards.
+
+    python -m benchmarks.agent_admission_bench --requests 300 --users 40 --latency 0.5
+'''
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+os.environ.setdefault("GROQ_API_KEY", "unused-by-fake-llm")
+
+from benchmarks._db import reset_schema
+from benchmarks.fake_llm import FakeReActLLM
+
+from app.agents import pomodoro_agent
+from app.agents.admission import PRIORITIES, AgentBusyError, llm_admission, prompt_priority
+from app.db.session import engine
+from app.services.runner_registry import runner_registry
+from app.services.timer_engine import timer_engine
+
+
+class CountingLLM(FakeReActLLM):
+    '''Tracks how many calls are in flight upstream, overall and per user'''
+    in_flight: int = 0
+    peak: int = 0
+    peak_per_user: int = 0
+    per_user: Counter = Counter()
+
+    def _enter(self):
+        user_id = pomodoro_agent.current_user_id.get()
+        self.in_flight += 1
+        self.per_user[user_id] += 1
+        self.peak = max(self.peak, self.in_flight)
+        self.peak_per_user = max(self.peak_per_user, self.per_user[user_id])
+        return user_id
+
+    def _exit(self, user_id):
+        self.in_flight -= 1
+        self.per_user[user_id] -= 1
+
+    async def _agenerate(self, *args, **kwargs):
+        user_id = self._enter()
+        try:
+            return await super()._agenerate(*args, **kwargs)
+        finally:
+            self._exit(user_id)
+
+    async def _astream(self, *args, **kwargs):
+        user_id = self._enter()
+        try:
+            async for chunk in super()._astream(*args, **kwargs):
+                yield chunk
+        finally:
+            self._exit(user_id)
+
+
+def prompt(i):
+    # Unique task names keep the prompt cache from answering; both shapes miss the fast path
+    if i % 2:
+        return f"could you start 25 min for topic {i}"
+    return f"hello, I have exams soon and feel behind on topic {i}, what would you suggest I do first?"
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM latency per call, seconds")
+    parser.add_argument("--concurrency", type=int, default=8, help="global LLM slots")
+    parser.add_argument("--per-user", type=int, default=2, help="LLM slots per user")
+    parser.add_argument("--queue", type=int, default=64, help="process wait queue")
+    parser.add_argument("--queue-per-user", type=int, default=4)
+    parser.add_argument("--queue-timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    await reset_schema()
+    runner_registry.max_active = runner_registry.max_per_user = 0
+    timer_engine.start()
+    llm = CountingLLM(latency=args.latency)
+    pomodoro_agent.init_agent(llm=llm)
+    pomodoro_agent.agent_executor.verbose = False
+    llm_admission.max_active = args.concurrency
+    llm_admission.max_per_user = args.per_user
+    llm_admission.max_queued = args.queue
+    llm_admission.max_queued_per_user = args.queue_per_user
+    llm_admission.queue_timeout = args.queue_timeout
+
+    outcomes = Counter()
+    latencies = {"command": [], "chat": []}
+    rejected_in = []
+
+    async def one(i):
+        msg = prompt(i)
+        start = time.perf_counter()
+        try:
+            await pomodoro_agent.process_user_message(msg, f"user-{i % args.users}")
+        except AgentBusyError as e:
+            outcomes[429 if e.scope == "user" else 503] += 1
+            rejected_in.append(time.perf_counter() - start)
+            return
+        outcomes[200] += 1
+        latencies[prompt_priority(msg)].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.requests} prompts in {elapsed:.2f}s: {outcomes[200]} answered, {outcomes[429]} x 429, {outcomes[503]} x 503")
+    print(f"upstream peak {llm.peak} (limit {args.concurrency}), per user {llm.peak_per_user} (limit {args.per_user})")
+    for priority, values in latencies.items():
+        if values:
+            print(f"{priority:>8}: {len(values)} answered, p50 {statistics.median(values) * 1e3:.0f}ms, max {max(values) * 1e3:.0f}ms")
+    if rejected_in:
+        print(f"rejections answered in max {max(rejected_in) * 1e3:.1f}ms")
+    mean_wait = {priority: llm_admission.wait_seconds[priority] / llm_admission.waited[priority]
+                 for priority in PRIORITIES if llm_admission.waited[priority]}
+    for priority, wait in mean_wait.items():
+        print(f"{priority:>8}: {llm_admission.waited[priority]} queued, mean wait {wait * 1e3:.0f}ms")
+    print(f"longest wait {llm_admission.max_wait * 1e3:.0f}ms")
+
+    failures = []
+    if not llm.peak:
+        failures.append("no call reached the LLM")
+    if llm.peak > args.concurrency or llm.peak_per_user > args.per_user:
+        failures.append("concurrency limit exceeded")
+    if rejected_in and max(rejected_in) > 0.1 and not llm_admission.rejected["timeout"]:
+        failures.append("a rejection was not immediate")
+    if llm_admission.active or llm_admission.queued:
+        failures.append(f"leaked {llm_admission.active} slots, {llm_admission.queued} waiters")
+    if len(mean_wait) == 2 and mean_wait["command"] > mean_wait["chat"]:
+        failures.append("commands were not served first")
+    for line in failures:
+        print("FAIL", line)
+    print("admission limits held" if not failures else f"{len(failures)} failures")
+
+    await timer_engine.stop()
+    await engine.dispose()
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,195 @@
+'''
+Request budgets on the agent endpoints, driven through the ASGI app with a
+slow fake LLM:
+
+  * within budget: answered normally,
+  * budget too short (X-Request-Timeout): 504 with a structured body soon
+    after the budget, the LLM call cancelled,
+  * the same on /agent/stream, ending with a `timeout` event, also when the
+    budget runs out while a slow client is still reading an event,
+  * a budget spent waiting for an LLM slot: 504, and the slot queue is clean,
+  * client disconnect on /agent/: the work is cancelled at once,
+  * budgets that run out around the tool call: no pomodoro row is left
+    without its timer, nor a timer without its row,
+  * on Postgres, a statement outliving the budget is cancelled by the server.
+
+    python -m benchmarks.agent_deadline_bench --latency 0.5
+'''
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "unused-by-fake-llm")
+
+from benchmarks._db import reset_schema
+from benchmarks.fake_llm import FakeReActLLM
+
+from sqlalchemy import select, text
+
+from app.agents import pomodoro_agent
+from app.agents.admission import llm_admission
+from app.core.auth import get_current_user_id
+from app.core.deadline import cancellations, deadline
+from app.db.models.pomodoro import Pomodoro
+from app.db.session import AsyncSessionLocal, engine
+from app.main import app
+from app.services.runner_registry import runner_registry
+from app.services.timer_engine import timer_engine
+
+CHAT = "hello, what can you do for my studies"
+
+
+async def call(path, prompt, budget=None, disconnect_after=None, read_delay=0.0):
+    '''Minimal ASGI client: returns (status, body, seconds until the response finished)'''
+    payload = json.dumps({"prompt": prompt}).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+    if budget is not None:
+        headers.append((b"x-request-timeout", str(budget).encode()))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": headers, "client": ("127.0.0.1", 1234), "server": ("test", 80), "root_path": "",
+    }
+    sent = False
+    done = asyncio.Event()
+    response = {"status": None, "body": b""}
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        if disconnect_after is not None:
+            await asyncio.sleep(disconnect_after)
+        else:
+            await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            await asyncio.sleep(read_delay)  # a slow client: the server waits on every chunk
+            response["body"] += message.get("body", b"")
+            if not message.get("more_body"):
+                done.set()
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return response["status"], response["body"], time.perf_counter() - start
+
+
+async def settled_calls(llm, wait):
+    '''LLM calls that ran to completion once in-flight work had `wait` seconds to finish'''
+    await asyncio.sleep(wait)
+    return llm.finished
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM latency per call, seconds")
+    parser.add_argument("--tool-runs", type=int, default=30, help="requests whose budget runs out around the tool call")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    latency = args.latency
+    rng = random.Random(args.seed)
+
+    await reset_schema()
+    timer_engine.start()
+    runner_registry.max_active = runner_registry.max_per_user = 0
+    llm_admission.max_per_user = llm_admission.max_queued_per_user = 0  # one user sends everything here
+    app.dependency_overrides[get_current_user_id] = lambda: "bench-user"
+    llm = FakeReActLLM(latency=latency)
+    pomodoro_agent.init_agent(llm=llm)
+    pomodoro_agent.agent_executor.verbose = False
+    failures = []
+
+    def check(name, passed, detail=""):
+        print(f"{'ok  ' if passed else 'FAIL'} {name}{': ' + detail if detail else ''}")
+        if not passed:
+            failures.append(name)
+
+    status, body, elapsed = await call("/agent/", CHAT, budget=latency * 4)
+    check("within budget", status == 200 and b'"path":"llm"' in body, f"{status} in {elapsed * 1e3:.0f}ms")
+
+    budget = latency / 2
+    finished = llm.finished
+    status, body, elapsed = await call("/agent/", CHAT, budget=budget)
+    detail = json.loads(body).get("detail", {}) if status == 504 else {}
+    check("overrun /agent/", status == 504 and detail.get("error") == "deadline_exceeded" and elapsed < budget + 0.1,
+          f"{status} in {elapsed * 1e3:.0f}ms, {detail}")
+    check("overrun cancels the LLM call", await settled_calls(llm, latency) == finished)
+
+    finished = llm.finished
+    status, body, elapsed = await call("/agent/stream", CHAT, budget=budget)
+    events = [json.loads(line) for line in body.decode().splitlines()]
+    check("overrun /agent/stream", status == 200 and [e["type"] for e in events] == ["admitted", "timeout"] and elapsed < budget + 0.1,
+          f"{[e['type'] for e in events]} in {elapsed * 1e3:.0f}ms")
+    check("stream overrun cancels the LLM call", await settled_calls(llm, latency) == finished)
+
+    disconnects = cancellations["disconnect"]
+    llm.token_delay = latency / 20
+    status, body, elapsed = await call("/agent/stream", CHAT, budget=latency * 1.5, read_delay=latency / 4)
+    llm.token_delay = 0.0
+    events = [json.loads(line) for line in body.decode().splitlines()]
+    check("overrun while the client reads", status == 200 and events[-1]["type"] == "timeout" and cancellations["disconnect"] == disconnects,
+          f"{len(events)} events ending with {events[-1]['type']!r} in {elapsed * 1e3:.0f}ms")
+
+    llm_admission.max_active = 1
+    holder = asyncio.create_task(call("/agent/", CHAT))
+    await asyncio.sleep(0.05)
+    status, body, elapsed = await call("/agent/", "could you start 25 min for queued", budget=latency / 2)
+    await holder
+    check("budget spent in the LLM queue", status == 504 and llm_admission.active == 0 and llm_admission.queued == 0,
+          f"{status} in {elapsed * 1e3:.0f}ms")
+    llm_admission.max_active = 0
+
+    finished, disconnects = llm.finished, cancellations["disconnect"]
+    status, body, elapsed = await call("/agent/", CHAT, disconnect_after=latency / 4)
+    check("disconnect cancels /agent/", cancellations["disconnect"] == disconnects + 1 and elapsed < latency / 4 + 0.1,
+          f"{status} in {elapsed * 1e3:.0f}ms")
+    check("disconnect cancels the LLM call", await settled_calls(llm, latency) == finished)
+
+    # Commands take two LLM calls with the tool in between: budgets in (1, 3) x latency run out
+    # before, during or after the tool, which is let through however little budget is left
+    pomodoro_agent.AGENT_TOOL_MIN_BUDGET = 0
+    llm_admission.max_active = llm_admission.max_queued = 0
+    results = await asyncio.gather(*(
+        call("/agent/", f"could you start 25 min for deadline {i}", budget=round(latency * rng.uniform(1.0, 3.0), 3))
+        for i in range(args.tool_runs)
+    ))
+    await asyncio.sleep(latency)
+    async with AsyncSessionLocal() as db:
+        live = set((await db.scalars(select(Pomodoro.id).where(Pomodoro.status.in_(("scheduled", "running", "paused"))))).all())
+    tracked = {pomodoro_id for pomodoro_id in live if pomodoro_id in runner_registry}
+    statuses = sorted(status for status, _, _ in results)
+    check("tool calls are all-or-nothing", live == tracked and len(live) == len(runner_registry) and len(statuses) == statuses.count(200) + statuses.count(504),
+          f"{statuses.count(200)} answered, {statuses.count(504)} timed out, {len(live)} pomodoros live, {len(runner_registry)} runners")
+
+    if engine.dialect.name == "postgresql":
+        start = time.perf_counter()
+        try:
+            async with deadline(0.3):
+                async with AsyncSessionLocal() as db:
+                    await asyncio.shield(db.execute(text("SELECT pg_sleep(2)")))
+            cancelled = False
+        except Exception:
+            cancelled = True
+        check("statement_timeout follows the budget", cancelled and time.perf_counter() - start < 1.0)
+    else:
+        print("skip statement_timeout (Postgres only)")
+
+    print(f"overruns {cancellations['overrun']}, disconnects {cancellations['disconnect']}")
+    print("deadlines held" if not failures else f"{len(failures)} failures")
+    await timer_engine.stop()
+    await engine.dispose()
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
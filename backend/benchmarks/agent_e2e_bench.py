@@ -0,0 +1,88 @@
+'''
+End-to-end latency of `process_user_message` on the LLM path with a fake LLM
+standing in for Groq: building the agent per request (old behaviour) versus
+the shared agent built once, plus event-loop lag while requests are in flight.
+
+    python -m benchmarks.agent_e2e_bench --requests 200 --concurrency 20 --latency 0.2
+'''
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "unused-by-fake-llm")
+
+from benchmarks._db import reset_schema
+from benchmarks.fake_llm import FakeReActLLM
+
+from app.agents import pomodoro_agent
+from app.db.session import engine
+from app.services.timer_engine import timer_engine
+
+# Not handled by the fast path, so every request reaches the agent
+PROMPTS = [
+    "could you start 25 min for math",
+    "I'd like 40 minutes on physics, could you set it",
+    "hello, what can you do",
+    "could you run 15 min of reading",
+]
+
+
+async def loop_lag_probe(stop, samples, interval=0.01):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(loop.time() - start - interval)
+
+
+async def run(name, requests, concurrency, per_request_build, llm):
+    pomodoro_agent.init_agent(llm=llm)
+    pomodoro_agent.agent_executor.verbose = False
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, lag = [], []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            if per_request_build:
+                pomodoro_agent.init_agent(llm=llm)
+                pomodoro_agent.agent_executor.verbose = False
+            await pomodoro_agent.process_user_message(PROMPTS[i % len(PROMPTS)], f"user-{i % 50}")
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(loop_lag_probe(stop, lag))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+
+    latencies.sort()
+    print(f"{name:>18}: {requests / elapsed:,.1f} req/s, p50 {latencies[len(latencies) // 2] * 1e3:.1f}ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e3:.1f}ms, "
+          f"max loop lag {max(lag) * 1e3:.1f}ms (mean {statistics.fmean(lag) * 1e3:.2f}ms)")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM latency per call, seconds")
+    args = parser.parse_args()
+
+    await reset_schema()
+    timer_engine.start()
+    llm = FakeReActLLM(latency=args.latency)
+
+    await run("build per request", args.requests, args.concurrency, True, llm)
+    await run("shared agent", args.requests, args.concurrency, False, llm)
+
+    await timer_engine.stop()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+'''
+Time-to-first-byte of POST /agent/stream versus the buffered POST /agent/,
+driven straight through the ASGI app with a fake streaming LLM, plus a check
+that a client disconnect cancels the LLM call.
+
+    python -m benchmarks.agent_stream_bench --runs 20 --latency 0.3 --token-delay 0.02
+'''
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "unused-by-fake-llm")
+
+from benchmarks._db import reset_schema
+from benchmarks.fake_llm import FakeReActLLM
+
+from app.agents import pomodoro_agent
+from app.core.auth import get_current_user_id
+from app.db.session import engine
+from app.main import app
+
+PROMPT = "hello, what can you do for my studies"
+
+
+async def call(path, body, disconnect_after_first=False):
+    '''Minimal ASGI client that timestamps the first and last body chunks.'''
+    payload = json.dumps(body).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+        "client": ("127.0.0.1", 1234), "server": ("test", 80), "root_path": "",
+    }
+    first_chunk = asyncio.Event()
+    sent = False
+    timings = {}
+    chunks = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        if disconnect_after_first:
+            await first_chunk.wait()
+        else:
+            await asyncio.Event().wait()  # stay connected until the app is done
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            now = time.perf_counter()
+            timings.setdefault("first", now)
+            timings["last"] = now
+            chunks.append(message["body"])
+            first_chunk.set()
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return timings["first"] - start, timings["last"] - start, b"".join(chunks)
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1e3
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake LLM time to first token")
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    await reset_schema()
+    app.dependency_overrides[get_current_user_id] = lambda: "bench-user"
+    llm = FakeReActLLM(latency=args.latency, token_delay=args.token_delay)
+    pomodoro_agent.init_agent(llm=llm)
+    pomodoro_agent.agent_executor.verbose = False
+
+    for name, path in (("buffered /agent/", "/agent/"), ("streamed /agent/stream", "/agent/stream")):
+        ttfb, total = [], []
+        for _ in range(args.runs):
+            first, last, _ = await call(path, {"prompt": PROMPT})
+            ttfb.append(first)
+            total.append(last)
+        print(f"{name:>24}: TTFB p50 {pct(ttfb, .5):.0f}ms p99 {pct(ttfb, .99):.0f}ms, "
+              f"complete p50 {pct(total, .5):.0f}ms")
+
+    finished_before = llm.finished
+    await call("/agent/stream", {"prompt": PROMPT}, disconnect_after_first=True)
+    await asyncio.sleep(args.latency + args.token_delay * 50)
+    print(f"{'disconnect':>24}: LLM stream {'ran to completion' if llm.finished > finished_before else 'cancelled'}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
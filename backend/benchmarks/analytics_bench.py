@@ -0,0 +1,128 @@
+'''
+Focus analytics over a synthetic history: the vectorized NumPy pass versus a
+per-row Python loop, plus the memoized path and loading columns from the DB.
+
+    python -m benchmarks.analytics_bench --rows 10000000 --loop-rows 500000 --db-rows 100000
+'''
+import argparse
+import asyncio
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks._db import reset_schema
+
+from sqlalchemy import insert
+
+from app.db.models.pomodoro import Pomodoro
+from app.db.session import AsyncSessionLocal, engine
+from app.services.stats_calculator import compute_focus_analytics, get_focus_analytics, invalidate_analytics
+
+YEARS = 3
+
+
+def synthetic_columns(rows, seed=7):
+    rng = np.random.default_rng(seed)
+    now = np.datetime64(datetime.now().replace(microsecond=0), "s")
+    span = YEARS * 365 * 24 * 3600
+    timer = rng.choice(np.array([15, 25, 30, 45, 50, 60, 90]) * 60, size=rows)
+    completed = rng.random(rows) < 0.7
+    return {
+        "start_time": np.sort(now - rng.integers(0, span, size=rows).astype("timedelta64[s]")),
+        "timer": timer,
+        "worked_time": np.where(completed, timer, (timer * rng.random(rows)).astype(np.int64)),
+        "completed": completed,
+        "pause_count": rng.poisson(0.8, size=rows),
+    }
+
+
+def python_loop(columns):
+    '''Reference implementation walking one session at a time.'''
+    days = set()
+    heatmap = [[0] * 24 for _ in range(7)]
+    by_length = defaultdict(lambda: [0, 0])
+    pauses = Counter()
+    for start, timer, worked, completed, paused in zip(*(columns[k].tolist() for k in (
+            "start_time", "timer", "worked_time", "completed", "pause_count"))):
+        if completed:
+            days.add(start.date())
+        heatmap[start.weekday()][start.hour] += worked
+        by_length[timer // 60][0] += 1
+        by_length[timer // 60][1] += completed
+        pauses[min(paused, 3)] += 1
+    ordered = sorted(days)
+    longest = run = 1 if ordered else 0
+    for prev, cur in zip(ordered, ordered[1:]):
+        run = run + 1 if cur - prev == timedelta(days=1) else 1
+        longest = max(longest, run)
+    return longest, heatmap, by_length, pauses
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+async def db_path(rows):
+    '''Load + compute for one user from a seeded table, then the memoized hit.'''
+    await reset_schema()
+    columns = synthetic_columns(rows, seed=11)
+    statuses = np.where(columns["completed"], "completed", "failed")
+    records = [
+        {"timer": t, "rest_time": 300, "start_time": s, "worked_time": w, "status": st,
+         "completed": c, "pause_count": p, "user_id": "bench-user"}
+        for s, t, w, c, p, st in zip(columns["start_time"].tolist(), columns["timer"].tolist(),
+                                     columns["worked_time"].tolist(), columns["completed"].tolist(),
+                                     columns["pause_count"].tolist(), statuses.tolist())
+    ]
+    async with AsyncSessionLocal() as db:
+        for i in range(0, len(records), 10_000):
+            await db.execute(insert(Pomodoro), records[i:i + 10_000])
+        await db.commit()
+
+    async with AsyncSessionLocal() as db:
+        invalidate_analytics("bench-user")
+        start = time.perf_counter()
+        cold = await get_focus_analytics(db, "bench-user")
+        cold_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        warm = await get_focus_analytics(db, "bench-user")
+        warm_elapsed = time.perf_counter() - start
+
+    assert cold is warm and cold["sessions"] == rows
+    print(f"db ({rows:,} rows, one user): load+compute {cold_elapsed * 1000:.0f}ms, "
+          f"memoized {warm_elapsed * 1e6:.1f}us")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--loop-rows", type=int, default=500_000, help="rows for the per-row Python reference")
+    parser.add_argument("--db-rows", type=int, default=100_000, help="0 to skip the database path")
+    args = parser.parse_args()
+
+    columns, build = timed(synthetic_columns, args.rows)
+    print(f"generated {args.rows:,} rows in {build:.1f}s")
+
+    result, vectorized = timed(compute_focus_analytics, columns)
+    print(f"numpy ({args.rows:,} rows): {vectorized:.2f}s, {args.rows / vectorized:,.0f} rows/s, "
+          f"longest streak {result['longest_streak']}")
+
+    sample = {k: v[:args.loop_rows] for k, v in columns.items()}
+    expected = compute_focus_analytics(sample)
+    (longest, heatmap, _, _), looped = timed(python_loop, sample)
+    assert longest == expected["longest_streak"] and heatmap == expected["heatmap"]
+    print(f"python loop ({args.loop_rows:,} rows): {looped:.2f}s, {args.loop_rows / looped:,.0f} rows/s "
+          f"-> numpy is {(args.rows / vectorized) / (args.loop_rows / looped):.0f}x faster per row")
+
+    if args.db_rows:
+        await db_path(args.db_rows)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
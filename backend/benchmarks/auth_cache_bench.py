@@ -0,0 +1,61 @@
+'''
+Throughput of the `get_current_user_id` dependency with and without the
+verified-token cache, for a pool of active users hammering the API.
+
+    python -m benchmarks.auth_cache_bench --requests 200000 --users 2000
+'''
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault("SUPABASE_JWT_SECRET", "bench-secret")
+
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+
+from app.core import auth
+from app.core.cache import TTLCache
+
+
+def make_tokens(count):
+    exp = int(time.time()) + 3600
+    return [
+        HTTPAuthorizationCredentials(
+            scheme="Bearer",
+            credentials=jwt.encode({"sub": f"user-{i}", "exp": exp, "role": "authenticated"}, auth.SUPABASE_JWK_SECRET, algorithm="HS256"),
+        )
+        for i in range(count)
+    ]
+
+
+async def run(name, credentials, requests, cache_size):
+    auth.token_cache = TTLCache(maxsize=cache_size)
+    start = time.perf_counter()
+    for creds in credentials[:requests]:
+        await auth.get_current_user_id(creds)
+    elapsed = time.perf_counter() - start
+    stats = auth.token_cache.stats()
+    print(f"{name:>10}: {requests / elapsed:,.0f} req/s, {elapsed / requests * 1e6:.1f}us/req, "
+          f"hit rate {stats['hit_rate']:.1%}, size {stats['size']}/{stats['maxsize']}, evictions {stats['evictions']}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--cache-size", type=int, default=auth.AUTH_TOKEN_CACHE_SIZE)
+    args = parser.parse_args()
+
+    random.seed(1)
+    tokens = make_tokens(args.users)
+    traffic = [random.choice(tokens) for _ in range(args.requests)]
+
+    await run("no cache", traffic, args.requests, 0)
+    await run("cached", traffic, args.requests, args.cache_size)
+    await run("undersized", traffic, args.requests, args.users // 4)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
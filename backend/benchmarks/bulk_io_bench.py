@@ -0,0 +1,78 @@
+'''
+Throughput and peak Python memory of the streaming study import and export.
+Memory should stay flat as --rows grows.
+
+    python -m benchmarks.bulk_io_bench --rows 200000 --format ndjson
+'''
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from benchmarks._db import reset_schema
+
+from sqlalchemy import select
+
+from app.db.models.study import Study
+from app.db.session import AsyncSessionLocal, engine
+from app.services.bulk_io import stream_export
+from app.services.study_service import StudyService
+
+USER = "bench-user"
+COLUMNS = ["id", "topic", "study_time", "notes", "timestamp"]
+
+
+async def body(rows, fmt, chunk_size=64 * 1024):
+    '''The upload as the ASGI server would hand it over: fixed-size byte chunks.'''
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    pending = "topic,study_time,notes,timestamp\n" if fmt == "csv" else ""
+    for i in range(rows):
+        topic, minutes, moment = f"topic-{i % 40}", 10 + i % 50, (start + timedelta(minutes=17 * i)).isoformat()
+        if fmt == "csv":
+            pending += f'{topic},{minutes},"note {i}",{moment}\n'
+        else:
+            pending += json.dumps({"topic": topic, "study_time": minutes, "notes": f"note {i}", "timestamp": moment}) + "\n"
+        if len(pending) >= chunk_size:
+            yield pending.encode()
+            pending = ""
+    if pending:
+        yield pending.encode()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="ndjson")
+    args = parser.parse_args()
+
+    await reset_schema()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        report = await StudyService(db, USER).import_records(body(args.rows, args.format), args.format)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    assert report.inserted == args.rows and not report.failed, report.as_dict()
+    print(f"import {args.rows:,} {args.format} rows: {elapsed:.1f}s, {args.rows / elapsed:,.0f} rows/s, "
+          f"peak {peak / 2**20:.1f} MiB")
+
+    tracemalloc.reset_peak()
+    query = select(*(getattr(Study, c) for c in COLUMNS)).where(Study.user_id == USER).order_by(Study.timestamp, Study.id)
+    start = time.perf_counter()
+    exported = 0
+    async for chunk in stream_export(query, COLUMNS, args.format):
+        exported += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"export {args.rows:,} {args.format} rows: {elapsed:.1f}s, {args.rows / elapsed:,.0f} rows/s, "
+          f"{exported / 2**20:.1f} MiB streamed, peak {peak / 2**20:.1f} MiB")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
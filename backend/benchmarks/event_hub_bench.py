@@ -0,0 +1,300 @@
+'''
+Thousands of idle SSE clients on real connections. The app runs under uvicorn
+in a child process; clients open `GET /pomodoro/{id}/events` over HTTP with
+httpx and signed JWTs, so routing, auth, the endpoint's wait/keepalive loop and
+the response writer are all on the path. Reports:
+
+  * the server's resident memory per open stream,
+  * transition -> event latency for a sample of pomodoros while every stream is open,
+  * one transition fanned out to every client watching the same pomodoro,
+  * how long the server takes to notice clients that dropped their connection
+    (the `event_hub_subscribers` gauge on /metrics).
+
+    python -m benchmarks.event_hub_bench --clients 5000
+
+`--hub-only` runs the old in-process EventHub figures instead (no HTTP), the
+floor the numbers above compare to. Server memory is read from /proc (Linux).
+The clients run on the same machine, so fan-out times include their parsing.
+'''
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks._db import reset_schema
+
+import httpx
+from jose import jwt
+from sqlalchemy import insert
+
+from app.db.models.pomodoro import Pomodoro
+from app.db.session import AsyncSessionLocal, engine
+from app.services.event_hub import EventHub, format_sse
+
+SHARED_USER = "sse-shared"
+STREAMS_PER_CLIENT = 100
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+
+def token_for(user_id):
+    claims = {"sub": user_id, "email": f"{user_id}@bench.local", "exp": int(time.time()) + 24 * 3600}
+    return jwt.encode(claims, os.environ["SUPABASE_JWT_SECRET"], algorithm="HS256")
+
+
+def server_rss_kib(pid):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def seed(clients):
+    '''One long running pomodoro per client, plus one that everyone watches together'''
+    now = datetime.now()
+    rows = [
+        {"timer": 24 * 3600, "rest_time": 0, "worked_time": 0, "pause_count": 0, "start_time": now, "last_resume_time": now,
+         "status": "running", "user_id": f"sse-user-{i}", "cycles_left": 0}
+        for i in range(clients)
+    ]
+    rows.append({**rows[0], "user_id": SHARED_USER})
+    async with AsyncSessionLocal() as db:
+        ids = (await db.scalars(insert(Pomodoro).returning(Pomodoro.id, sort_by_parameter_order=True), rows)).all()
+        await db.commit()
+    await engine.dispose()
+    return [(ids[i], f"sse-user-{i}") for i in range(clients)], ids[-1]
+
+
+class Stream:
+    '''One SSE client: open, read the snapshot, then wait for the next event'''
+
+    def __init__(self, client, pomodoro_id, token):
+        self.client = client
+        self.pomodoro_id = pomodoro_id
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.ready = asyncio.Event()
+        self.received = asyncio.Event()
+        self.received_at = None
+        self.error = None
+        self.task = None
+
+    async def run(self):
+        try:
+            async with self.client.stream("GET", f"/pomodoro/{self.pomodoro_id}/events", headers=self.headers) as response:
+                if response.status_code != 200:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+                async for line in response.aiter_lines():
+                    if not line.startswith("event: "):
+                        continue
+                    if line == "event: snapshot":
+                        self.ready.set()
+                        continue
+                    self.received_at = time.perf_counter()
+                    self.received.set()
+                    return
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ready.set()
+            self.received.set()
+
+
+async def open_streams(clients, targets, ramp):
+    '''Connect every (pomodoro id, token) and wait until each stream delivered its snapshot'''
+    gate = asyncio.Semaphore(ramp)
+    streams = [Stream(clients[i % len(clients)], pomodoro_id, token) for i, (pomodoro_id, token) in enumerate(targets)]
+
+    async def connect(stream):
+        async with gate:
+            stream.task = asyncio.create_task(stream.run())
+            await stream.ready.wait()
+
+    await asyncio.gather(*(connect(stream) for stream in streams))
+    failed = [s for s in streams if s.error is not None]
+    if failed:
+        raise RuntimeError(f"{len(failed)} streams failed to open, first: {failed[0].error!r}")
+    return streams
+
+
+async def subscribers(client):
+    for line in (await client.get("/metrics")).text.splitlines():
+        if line.startswith("event_hub_subscribers "):
+            return int(float(line.split()[1]))
+    raise RuntimeError("event_hub_subscribers missing from /metrics")
+
+
+async def wait_for_subscribers(client, target, timeout=60.0):
+    start = time.perf_counter()
+    while (count := await subscribers(client)) != target:
+        if time.perf_counter() - start > timeout:
+            raise RuntimeError(f"still {count} subscribers after {timeout:.0f}s, expected {target}")
+        await asyncio.sleep(0.05)
+    return time.perf_counter() - start
+
+
+async def close_all(streams):
+    for stream in streams:
+        stream.task.cancel()
+    await asyncio.gather(*(stream.task for stream in streams), return_exceptions=True)
+
+
+async def over_http(args):
+    await reset_schema()
+    owned, shared_id = await seed(args.clients)
+    port = free_port()
+    env = {**os.environ, "AGENT_WARMUP": "false", "JOB_WORKER": "false"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log", "--backlog", "4096"],
+        env=env,
+    )
+    # httpx scans its whole pool on every request, so the streams are spread over several clients
+    base_url = f"http://127.0.0.1:{port}"
+    timeout = httpx.Timeout(60, read=None)
+    pools = [httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=httpx.Limits(max_connections=None))
+             for _ in range(max(1, args.clients // STREAMS_PER_CLIENT))]
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+            for _ in range(200):
+                try:
+                    if (await client.get("/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("server did not come up")
+            await subscribers(client)  # first /metrics render out of the way of the memory baseline
+
+            # Every client on its own pomodoro
+            idle_rss = server_rss_kib(server.pid)
+            start = time.perf_counter()
+            streams = await open_streams(pools, [(pomodoro_id, token_for(user)) for pomodoro_id, user in owned], args.ramp)
+            opened = time.perf_counter() - start
+            await asyncio.sleep(1)
+            rss = server_rss_kib(server.pid)
+            print(f"{args.clients} open streams in {opened:.1f}s, server RSS {idle_rss / 1024:.0f} -> {rss / 1024:.0f} MiB, "
+                  f"{(rss - idle_rss) / args.clients:.1f} KiB/stream, {await subscribers(client)} subscribed")
+
+            # Transition -> event on a sample, everyone else still connected and idle
+            latencies = []
+            for stream, (pomodoro_id, user) in list(zip(streams, owned))[:args.sample]:
+                sent = time.perf_counter()
+                response = await client.post(f"/pomodoro/{pomodoro_id}/pause", headers={"Authorization": f"Bearer {token_for(user)}"})
+                response.raise_for_status()
+                await stream.received.wait()
+                latencies.append((stream.received_at - sent) * 1000)
+            latencies.sort()
+            print(f"{'pause -> event':>18}: p50 {percentile(latencies, 50):.1f}ms, p99 {percentile(latencies, 99):.1f}ms "
+                  f"over {len(latencies)} pomodoros")
+
+            # Drop half the connections without a word; the server has to notice on its own
+            idle = streams[args.sample:]
+            dropped, kept = idle[::2], idle[1::2]
+            await close_all(dropped)
+            detected = await wait_for_subscribers(client, len(kept))
+            print(f"{'disconnects':>18}: {len(dropped)} dropped, all unsubscribed after {detected * 1000:.0f}ms")
+            await close_all(kept)
+            await wait_for_subscribers(client, 0)
+
+            # Everyone watching one pomodoro, one transition
+            token = token_for(SHARED_USER)
+            streams = await open_streams(pools, [(shared_id, token)] * args.clients, args.ramp)
+            sent = time.perf_counter()
+            response = await client.post(f"/pomodoro/{shared_id}/pause", headers={"Authorization": f"Bearer {token}"})
+            response.raise_for_status()
+            await asyncio.gather(*(stream.received.wait() for stream in streams))
+            delivered = sorted((stream.received_at - sent) * 1000 for stream in streams if stream.received_at)
+            print(f"{'shared pomodoro':>18}: {len(delivered)}/{args.clients} delivered, first {delivered[0]:.1f}ms, "
+                  f"p50 {percentile(delivered, 50):.1f}ms, last {delivered[-1]:.1f}ms")
+            await close_all(streams)
+    finally:
+        await asyncio.gather(*(pool.aclose() for pool in pools))
+        server.terminate()
+        server.wait()
+
+
+async def idle_client(hub, pomodoro_id, received, keepalive):
+    queue = hub.subscribe(pomodoro_id)
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                continue
+            format_sse(event)
+            received.append(time.perf_counter())
+            if event["event"] == "completed":
+                return
+    finally:
+        hub.unsubscribe(pomodoro_id, queue)
+
+
+async def fan_out(hub, clients, ids, keepalive):
+    received = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = [asyncio.create_task(idle_client(hub, ids(i), received, keepalive)) for i in range(clients)]
+    await asyncio.sleep(1)  # everyone idle and subscribed
+    idle_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for pomodoro_id in {ids(i) for i in range(clients)}:
+        hub.publish(pomodoro_id, {"event": "completed", "id": pomodoro_id, "status": "completed"})
+    publish_ms = (time.perf_counter() - start) * 1000
+    await asyncio.gather(*tasks)
+    delivered_ms = (max(received) - start) * 1000
+
+    return idle_bytes, publish_ms, delivered_ms
+
+
+async def in_process(args):
+    scenarios = {
+        "one pomodoro each": lambda i: i,
+        "shared pomodoro": lambda i: 0,
+    }
+    for name, ids in scenarios.items():
+        hub = EventHub()
+        idle_bytes, publish_ms, delivered_ms = await fan_out(hub, args.clients, ids, 15)
+        print(f"{name:>18}: {args.clients} idle subscribers, {idle_bytes / args.clients / 1024:.1f} KiB each, "
+              f"publish {publish_ms:.1f}ms, all delivered after {delivered_ms:.1f}ms, {hub.subscriber_count} left subscribed")
+
+    # A client that never reads keeps at most queue_size events
+    hub = EventHub()
+    queue = hub.subscribe(1)
+    for n in range(10_000):
+        hub.publish(1, {"event": "extended", "id": 1, "n": n})
+    print(f"{'slow client':>18}: queue holds {queue.qsize()} events, {hub.dropped} dropped")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--sample", type=int, default=200, help="pomodoros paused one by one for the latency figures")
+    parser.add_argument("--ramp", type=int, default=200, help="streams connecting at once")
+    parser.add_argument("--hub-only", action="store_true", help="in-process EventHub subscribers, no HTTP")
+    args = parser.parse_args()
+    if args.hub_only:
+        await in_process(args)
+    else:
+        await over_http(args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
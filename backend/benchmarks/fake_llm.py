@@ -0,0 +1,81 @@
+'''
+Deterministic stand-in for ChatGroq that speaks the ReAct format the Cronos
+prompt expects. It reads the question out of the prompt, extracts timer
+parameters with the intent parser (or a bare minute count), and answers after
+a configurable delay, so agent benchmarks run offline with stable latency.
+'''
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.agents.intent_parser import parse_pomodoro_intent
+
+_QUESTION_RE = re.compile(r"Question: (?P<q>.*?)\nThought:", re.S)
+_MINUTES_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:min|minute)", re.I)
+
+
+class FakeReActLLM(BaseChatModel):
+    latency: float = 0.5          # seconds before the first token
+    token_delay: float = 0.0      # seconds between streamed tokens
+    calls: int = 0
+    finished: int = 0             # streams that ran to the end (not cancelled)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-react"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = messages[-1].content
+        if "Observation:" in prompt:
+            observation = prompt.rsplit("Observation:", 1)[1].split("\n")[0].strip()
+            return f"Thought: The tool answered.\nFinal Answer: {observation}"
+
+        match = _QUESTION_RE.search(prompt)
+        question = match["q"].strip() if match else prompt
+        intent = parse_pomodoro_intent(question)
+        if intent is not None:
+            params = intent.model_dump()
+        else:
+            minutes = _MINUTES_RE.search(question)
+            if not minutes:
+                return "Thought: I do not need to use tools\nFinal Answer: Tell me how long you want to focus and I'll start a timer."
+            params = {"timer": float(minutes.group(1)), "rest_time": None, "task_name": ""}
+        return f"Thought: The user wants a timed session.\nAction: create_pomodoro_tool\nAction Input: {json.dumps(params)}"
+
+    def _generate(self, messages, stop=None, run_manager: Optional[CallbackManagerForLLMRun]=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager: Optional[AsyncCallbackManagerForLLMRun]=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self.calls += 1
+        time.sleep(self.latency)
+        for token in re.split(r"(\s+)", self._reply(messages)):
+            if token:
+                time.sleep(self.token_delay)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages, stop=None, run_manager: Optional[AsyncCallbackManagerForLLMRun]=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        for token in re.split(r"(\s+)", self._reply(messages)):
+            if not token:
+                continue
+            await asyncio.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        self.finished += 1
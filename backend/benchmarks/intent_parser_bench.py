@@ -0,0 +1,137 @@
+'''
+Accuracy and latency of the deterministic intent parser against the labeled
+corpus in benchmarks/data/intent_corpus.jsonl, and optionally of the LLM path
+(the tool only records its arguments, nothing is created).
+
+    python -m benchmarks.intent_parser_bench [--llm [--llm-latency 0.3] | --groq]
+
+--llm runs the ReAct agent on the fake chat model (benchmarks/fake_llm.py) with a
+fixed latency per call, so the fast-path vs LLM-path p50/p99 comparison runs
+offline and in CI. The fake model extracts with the parser itself, so only its
+latency means anything. --groq uses the real model (needs GROQ_API_KEY) and
+scores its accuracy too.
+
+A fast-path decision is correct when it extracts the labeled parameters, or
+declines (falls back to the LLM) for prompts labeled null.
+'''
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+from app.agents.intent_parser import parse_pomodoro_intent
+
+CORPUS = Path(__file__).parent / "data" / "intent_corpus.jsonl"
+
+
+def load_corpus():
+    with open(CORPUS) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def same_params(got, expected):
+    if got is None or expected is None:
+        return got is None and expected is None
+    return (
+        float(got.get("timer") or 0) == float(expected["timer"])
+        and (got.get("rest_time") is None) == (expected["rest_time"] is None)
+        and (got.get("rest_time") is None or float(got["rest_time"]) == float(expected["rest_time"]))
+        and (got.get("task_name") or "").lower() == expected["task_name"].lower()
+    )
+
+
+def report(name, latencies, correct, total, extra=""):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    accuracy = f"accuracy {correct}/{total} ({correct / total:.1%})" if correct is not None else "accuracy not scored"
+    print(f"{name:>5}: {accuracy}, "
+          f"p50 {p50 * 1e3:.3f}ms, p99 {p99 * 1e3:.3f}ms, mean {statistics.fmean(latencies) * 1e3:.3f}ms{extra}")
+
+
+def bench_fast(corpus, repeat):
+    latencies, correct, handled, wrong = [], 0, 0, []
+    for item in corpus:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            intent = parse_pomodoro_intent(item["text"])
+            latencies.append(time.perf_counter() - start)
+        got = intent.model_dump() if intent else None
+        handled += intent is not None
+        if same_params(got, item["expected"]):
+            correct += 1
+        else:
+            wrong.append((item["text"], got, item["expected"]))
+
+    report("fast", latencies, correct, len(corpus), f", handled {handled}/{len(corpus)} without the LLM")
+    for text, got, expected in wrong:
+        print(f"       mismatch: {text!r} -> {got} (expected {expected})")
+    return latencies
+
+
+async def bench_llm(corpus, llm=None, scored=True):
+    import benchmarks._db  # noqa: F401  (DATABASE_URL for the app modules; nothing is written)
+    from langchain.tools import tool
+    from app.agents import llm_agent
+
+    captured = {}
+
+    @tool
+    def create_pomodoro_tool(params: str) -> str:
+        '''
+        Create a pomodoro timer with parameters: timer (required, in minutes),
+        rest_time (optional, in minutes), and task_name (optional).
+        '''
+        captured["params"] = json.loads(params)
+        return "Pomodoro started"
+
+    executor = llm_agent.build_agent_executor([create_pomodoro_tool], llm=llm)
+    executor.verbose = False
+
+    latencies, correct = [], 0
+    for item in corpus:
+        captured.clear()
+        start = time.perf_counter()
+        await executor.ainvoke({"input": item["text"]})
+        latencies.append(time.perf_counter() - start)
+        correct += same_params(captured.get("params"), item["expected"])
+
+    if scored:
+        report("llm", latencies, correct, len(corpus))
+    else:
+        report("llm", latencies, None, len(corpus), " (fake model)")
+    return latencies
+
+
+def compare(fast, llm):
+    fast, llm = sorted(fast), sorted(llm)
+    for name, pct in (("p50", 0.5), ("p99", 0.99)):
+        f, l = (values[min(len(values) - 1, int(len(values) * pct))] for values in (fast, llm))
+        print(f"{name}: LLM path {l * 1e3:.1f}ms vs fast path {f * 1e3:.3f}ms ({l / f:,.0f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200, help="fast-path runs per prompt")
+    parser.add_argument("--llm", action="store_true", help="also run the LLM path on the fake chat model")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per fake LLM call")
+    parser.add_argument("--groq", action="store_true", help="run the LLM path on the real model (needs GROQ_API_KEY)")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    fast = bench_fast(corpus, args.repeat)
+    if args.groq:
+        if not os.getenv("GROQ_API_KEY"):
+            raise SystemExit("GROQ_API_KEY is required for --groq")
+        compare(fast, asyncio.run(bench_llm(corpus)))
+    elif args.llm:
+        os.environ.setdefault("GROQ_API_KEY", "unused-by-fake-llm")
+        from benchmarks.fake_llm import FakeReActLLM
+        compare(fast, asyncio.run(bench_llm(corpus, llm=FakeReActLLM(latency=args.llm_latency), scored=False)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+'''
+Drain throughput of the scheduled-start queue: N scheduled pomodoros whose
+start jobs are all due, drained by W concurrent workers (each a JobQueue, as
+separate processes would run them). Checks that every pomodoro was started
+exactly once and that the queue ends empty.
+
+    python -m benchmarks.job_queue_bench --sessions 100000 --workers 4
+    BENCH_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.job_queue_bench --workers 8
+'''
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._db import WriteCounter, reset_schema
+
+from sqlalchemy import func, insert, select
+
+from app.db.models.job import PomodoroJob
+from app.db.models.pomodoro import Pomodoro
+from app.db.session import AsyncSessionLocal, engine
+from app.services.job_queue import JobQueue, job_queue
+from app.services import pomodoro_timer  # noqa: F401  (registers the job handlers)
+from app.services.runner_registry import runner_registry
+from app.services.timer_engine import timer_engine
+
+SEED_CHUNK = 5000
+
+
+async def seed(sessions, users):
+    '''Scheduled pomodoros with their start jobs, due over the last minute'''
+    due = datetime.now() - timedelta(minutes=1)
+    for offset in range(0, sessions, SEED_CHUNK):
+        count = min(SEED_CHUNK, sessions - offset)
+        async with AsyncSessionLocal() as db:
+            ids = (await db.scalars(
+                insert(Pomodoro).returning(Pomodoro.id, sort_by_parameter_order=True),
+                [
+                    {"timer": 3600, "rest_time": 300, "task_name": "queued", "start_time": due, "worked_time": 0, "pause_count": 0,
+                     "status": "scheduled", "cycles_left": 0, "user_id": f"user-{(offset + i) % users}"}
+                    for i in range(count)
+                ],
+            )).all()
+            await db.execute(insert(PomodoroJob), [
+                {"kind": "start", "pomodoro_id": pomodoro_id, "user_id": f"user-{(offset + i) % users}",
+                 "due_at": due + timedelta(microseconds=offset + i), "status": "queued", "attempts": 0}
+                for i, pomodoro_id in enumerate(ids)
+            ])
+            await db.commit()
+
+
+async def drain(worker: JobQueue, claimed: list):
+    while True:
+        n = await worker.run_once()
+        if not n:
+            return
+        claimed.append(n)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=job_queue.batch_size)
+    args = parser.parse_args()
+
+    await reset_schema()
+    runner_registry.max_active = runner_registry.max_per_user = 0
+    timer_engine.start()
+
+    start = time.perf_counter()
+    await seed(args.sessions, args.users)
+    print(f"seeded {args.sessions:,} scheduled pomodoros in {time.perf_counter() - start:.1f}s")
+
+    workers = [JobQueue(batch_size=args.batch_size) for _ in range(args.workers)]
+    for worker in workers:
+        worker._handlers = job_queue._handlers
+    writes = WriteCounter()
+    claimed = []
+    start = time.perf_counter()
+    await asyncio.gather(*(drain(worker, claimed) for worker in workers))
+    elapsed = time.perf_counter() - start
+    writes.close()
+
+    async with AsyncSessionLocal() as db:
+        statuses = dict((await db.execute(select(Pomodoro.status, func.count()).group_by(Pomodoro.status))).all())
+        versions = dict((await db.execute(select(Pomodoro.version, func.count()).group_by(Pomodoro.version))).all())
+        left = await db.scalar(select(func.count()).select_from(PomodoroJob))
+
+    done = sum(w.done for w in workers)
+    print(f"{args.workers} workers drained {done:,} jobs in {elapsed:.2f}s -> {done / elapsed:,.0f} jobs/s "
+          f"({len(claimed)} batches, {writes.writes:,} write statements)")
+    print(f"retried {sum(w.retried for w in workers):,}, failed {sum(w.failed for w in workers):,}")
+    print(f"pomodoros by status {statuses}, by version {versions}, jobs left {left}, timers {len(timer_engine):,}")
+
+    ok = statuses.get("running") == args.sessions and versions.get(2) == args.sessions and left == 0 and len(timer_engine) == args.sessions
+    print("every pomodoro started exactly once" if ok else "MISMATCH")
+
+    await timer_engine.stop()
+    await engine.dispose()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
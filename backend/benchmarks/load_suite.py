@@ -0,0 +1,262 @@
+'''
+Mixed-traffic load run against the whole app, in process.
+
+Boots the FastAPI app (lifespan included) on SQLite or a local Postgres
+(BENCH_DATABASE_URL), with auth stubbed per virtual user and the fake LLM behind
+the agent. Virtual users create/pause/resume/stop pomodoros, write and read
+study records, read stats and talk to the agent. Results go to a JSON file so
+runs can be compared across commits:
+
+    python -m benchmarks.load_suite --users 50 --duration 30 --out bench_load.json
+    python -m benchmarks.load_suite --users 50 --duration 30 --out new.json --compare bench_load.json
+'''
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+os.environ.setdefault("GROQ_API_KEY", "unused-by-fake-llm")
+
+from benchmarks._db import WriteCounter, reset_schema
+from benchmarks.fake_llm import FakeReActLLM
+
+import httpx
+from fastapi import Request
+
+from app.agents import pomodoro_agent
+from app.core.auth import get_current_user_email, get_current_user_id
+from app.db.session import engine
+from app.main import app
+
+FAST_PATH_PROMPTS = ["25 min math", "50 minutes physics with 10 min break", "pomodoro 30m reading"]
+LLM_PROMPTS = ["could you start 25 min for math", "hello, what can you do", "I'd like 40 minutes on physics, could you set it"]
+TOPICS = ["Math", "Physics", "History", "Biology", "Reading"]
+
+
+def _bench_user(request: Request) -> str:
+    return request.headers["x-bench-user"]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    async def call(self, client, name, method, url, user, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, headers={"x-bench-user": user}, **kwargs)
+        self.latencies[name].append(time.perf_counter() - start)
+        self.statuses[name][response.status_code] += 1
+        return response
+
+
+class VirtualUser:
+    def __init__(self, index, client, recorder, rng):
+        self.user = f"bench-user-{index}@example.com"
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.running, self.paused = [], []
+
+    async def call(self, name, method, url, **kwargs):
+        return await self.recorder.call(self.client, name, method, url, self.user, **kwargs)
+
+    async def create_pomodoro(self):
+        timer = self.rng.choice((2, 5, 1500, 1500))  # some finish during the run
+        r = await self.call("POST /pomodoro/", "POST", "/pomodoro/", json={"timer": timer, "rest_time": 300, "task_name": "load"})
+        if r.status_code == 201:
+            self.running.append(r.json()["id"])
+
+    async def pause(self):
+        if self.running:
+            pomodoro_id = self.running.pop(self.rng.randrange(len(self.running)))
+            r = await self.call("POST /pomodoro/{id}/pause", "POST", f"/pomodoro/{pomodoro_id}/pause")
+            if r.status_code == 200:
+                self.paused.append(pomodoro_id)
+
+    async def resume(self):
+        if self.paused:
+            pomodoro_id = self.paused.pop(self.rng.randrange(len(self.paused)))
+            r = await self.call("POST /pomodoro/{id}/resume", "POST", f"/pomodoro/{pomodoro_id}/resume")
+            if r.status_code == 200:
+                self.running.append(pomodoro_id)
+
+    async def stop(self):
+        pool = self.running or self.paused
+        if pool:
+            pomodoro_id = pool.pop(self.rng.randrange(len(pool)))
+            await self.call("POST /pomodoro/{id}/stop", "POST", f"/pomodoro/{pomodoro_id}/stop")
+
+    async def get_pomodoro(self):
+        if self.running:
+            await self.call("GET /pomodoro/{id}", "GET", f"/pomodoro/{self.rng.choice(self.running)}")
+
+    async def history(self):
+        await self.call("GET /pomodoro/history", "GET", "/pomodoro/history", params={"limit": 20})
+
+    async def create_study(self):
+        await self.call("POST /my-studies/", "POST", "/my-studies/",
+                        json={"topic": self.rng.choice(TOPICS), "study_time": self.rng.randint(5, 90), "notes": "load"})
+
+    async def create_study_batch(self):
+        items = [{"topic": self.rng.choice(TOPICS), "study_time": self.rng.randint(5, 90)} for _ in range(10)]
+        await self.call("POST /my-studies/batch", "POST", "/my-studies/batch", json=items)
+
+    async def list_studies(self):
+        await self.call("GET /my-studies/", "GET", "/my-studies/", params={"limit": 20})
+
+    async def focus_stats(self):
+        await self.call("GET /stats/focus", "GET", "/stats/focus", params={"period": "week"})
+
+    async def analytics(self):
+        await self.call("GET /stats/analytics", "GET", "/stats/analytics")
+
+    async def agent(self):
+        prompt = self.rng.choice(FAST_PATH_PROMPTS + LLM_PROMPTS)
+        await self.call("POST /agent/", "POST", "/agent/", json={"prompt": prompt})
+
+    async def register(self):
+        await self.client.post("/users/register", headers={"x-bench-user": self.user})
+
+    async def run(self, deadline, think_time):
+        actions, weights = zip(*(
+            (self.create_pomodoro, 14), (self.pause, 10), (self.resume, 10), (self.stop, 5),
+            (self.get_pomodoro, 10), (self.history, 10), (self.create_study, 14), (self.create_study_batch, 2),
+            (self.list_studies, 10), (self.focus_stats, 5), (self.analytics, 3), (self.agent, 7),
+        ))
+        while time.perf_counter() < deadline:
+            await self.rng.choices(actions, weights)[0]()
+            if think_time:
+                await asyncio.sleep(self.rng.expovariate(1 / think_time))
+
+
+def summarize(recorder, elapsed, writes):
+    endpoints = {}
+    for name, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        statuses = recorder.statuses[name]
+        endpoints[name] = {
+            "count": len(latencies),
+            "errors": sum(n for code, n in statuses.items() if code >= 500),
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+            "status": {str(code): n for code, n in sorted(statuses.items())},
+        }
+    total = sum(e["count"] for e in endpoints.values())
+    return {
+        "requests": total,
+        "errors": sum(e["errors"] for e in endpoints.values()),
+        "duration_s": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 2),
+        "db_writes": writes,
+        "db_writes_per_s": round(writes / elapsed, 2),
+    }, endpoints
+
+
+def compare(result, baseline, threshold):
+    '''Print p95/throughput changes against a previous run; True when something regressed'''
+    regressed = False
+    old_total, new_total = baseline["summary"]["throughput_rps"], result["summary"]["throughput_rps"]
+    print(f"\nvs {baseline['meta'].get('commit')}: throughput {old_total} -> {new_total} req/s")
+    if new_total < old_total * (1 - threshold):
+        regressed = True
+    for name, new in result["endpoints"].items():
+        old = baseline["endpoints"].get(name)
+        if not old or not old["p95_ms"]:
+            continue
+        change = new["p95_ms"] / old["p95_ms"] - 1
+        flag = "  REGRESSION" if change > threshold else ""
+        regressed |= bool(flag)
+        print(f"{name:>28}: p95 {old['p95_ms']:8.2f} -> {new['p95_ms']:8.2f}ms ({change:+.0%}){flag}")
+    return regressed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of traffic")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a user's requests, seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake LLM latency per call, seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="bench_load.json")
+    parser.add_argument("--compare", help="previous result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative p95/throughput change flagged as a regression")
+    args = parser.parse_args()
+
+    await reset_schema()
+    app.dependency_overrides[get_current_user_id] = _bench_user
+    app.dependency_overrides[get_current_user_email] = _bench_user
+    recorder = Recorder()
+
+    async with app.router.lifespan_context(app):
+        pomodoro_agent.init_agent(llm=FakeReActLLM(latency=args.llm_latency))
+        pomodoro_agent.agent_executor.verbose = False
+        writes = WriteCounter()
+
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            users = [VirtualUser(i, client, recorder, random.Random(args.seed + i)) for i in range(args.users)]
+            for user in users:
+                await user.register()
+            writes.reset()
+
+            start = time.perf_counter()
+            deadline = start + args.duration
+            await asyncio.gather(*(user.run(deadline, args.think_time) for user in users))
+            elapsed = time.perf_counter() - start
+        writes.close()
+
+    summary, endpoints = summarize(recorder, elapsed, writes.writes)
+    result = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        },
+        "summary": summary,
+        "endpoints": endpoints,
+    }
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"{summary['requests']:,} requests in {summary['duration_s']}s: {summary['throughput_rps']:,.1f} req/s, "
+          f"{summary['errors']} errors, {summary['db_writes_per_s']:,.1f} DB writes/s")
+    for name, e in endpoints.items():
+        print(f"{name:>28}: {e['count']:6} req  p50 {e['p50_ms']:8.2f}ms  p95 {e['p95_ms']:8.2f}ms  "
+              f"p99 {e['p99_ms']:8.2f}ms  {e['status']}")
+    print(f"saved to {args.out}")
+
+    await engine.dispose()
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(result, json.load(f), args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+'''
+Page latency at increasing depth for one heavy user: LIMIT/OFFSET versus the
+keyset cursor used by GET /pomodoro/history.
+
+    python -m benchmarks.pagination_bench --rows 200000 --other-rows 200000
+'''
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._db import reset_schema
+
+from sqlalchemy import insert, select
+
+from app.crud.crud_pomodoro import get_pomodoros
+from app.crud.pagination import encode_cursor
+from app.db.models.pomodoro import Pomodoro
+from app.db.session import AsyncSessionLocal, engine
+
+HEAVY_USER = "heavy-user"
+PAGE = 20
+
+
+async def seed(rows, other_rows, chunk=10_000):
+    now = datetime.now()
+    random.seed(3)
+    owners = [HEAVY_USER] * rows + [f"user-{i % 2000}" for i in range(other_rows)]
+    random.shuffle(owners)
+    async with AsyncSessionLocal() as db:
+        for offset in range(0, len(owners), chunk):
+            await db.execute(insert(Pomodoro), [
+                {
+                    "timer": 1500,
+                    "rest_time": 300,
+                    "worked_time": 1500,
+                    "start_time": now - timedelta(seconds=i * 37),
+                    "status": random.choice(("completed", "completed", "stopped")),
+                    "user_id": user_id,
+                }
+                for i, user_id in enumerate(owners[offset:offset + chunk], start=offset)
+            ])
+        await db.commit()
+
+
+async def time_query(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000, help="history rows of the heavy user")
+    parser.add_argument("--other-rows", type=int, default=200_000, help="rows spread over other users")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    await reset_schema()
+    await seed(args.rows, args.other_rows)
+
+    base = select(Pomodoro).where(Pomodoro.user_id == HEAVY_USER).order_by(Pomodoro.start_time.desc(), Pomodoro.id.desc())
+    async with AsyncSessionLocal() as db:
+        for depth in (0, 1_000, 10_000, 100_000, args.rows - PAGE):
+            if depth < 0 or depth > args.rows - PAGE:
+                continue
+
+            async def by_offset():
+                return (await db.execute(base.offset(depth).limit(PAGE))).scalars().all()
+
+            cursor = None
+            if depth:
+                before = (await db.execute(base.offset(depth - 1).limit(1))).scalar_one()
+                cursor = encode_cursor(before.start_time, before.id)
+
+            async def by_cursor():
+                return (await get_pomodoros(db, HEAVY_USER, limit=PAGE, cursor=cursor))[0]
+
+            assert [p.id for p in await by_offset()] == [p.id for p in await by_cursor()]
+            offset_ms = await time_query(by_offset, args.repeat)
+            cursor_ms = await time_query(by_cursor, args.repeat)
+            print(f"depth {depth:>7,}: offset {offset_ms:7.2f}ms   cursor {cursor_ms:6.2f}ms")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+'''
+Request throughput and pool checkout wait at different pool sizes.
+Each simulated request holds a connection for one query plus --hold-ms of
+work (a slow query or an ORM round trip), with --concurrency requests in flight.
+
+    python -m benchmarks.pool_bench --sizes 1,2,5,10,20 --concurrency 50 --requests 2000
+
+Set BENCH_DATABASE_URL to a Postgres URL for real numbers; on Postgres the
+hold is spent in pg_sleep so the connection is genuinely busy.
+'''
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks._db import reset_schema
+
+from sqlalchemy import text
+
+from app.core.config import get_settings
+from app.db.session import create_engine_from_settings, engine as app_engine, pool_metrics
+
+
+async def run(size, concurrency, requests, hold):
+    engine = create_engine_from_settings(get_settings(), pool_size=size, max_overflow=0, pool_timeout=5)
+    postgres = engine.dialect.name == "postgresql"
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                async with engine.connect() as conn:
+                    if postgres:
+                        await conn.execute(text("SELECT pg_sleep(:s)"), {"s": hold})
+                    else:
+                        await conn.execute(text("SELECT 1"))
+                        await asyncio.sleep(hold)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    metrics = pool_metrics(engine)
+    await engine.dispose()
+    latencies.sort()
+    wait_ms = metrics["checkout_wait_seconds_total"] / max(metrics["checkouts"], 1) * 1000
+    print(f"pool {size:>3}: {requests / elapsed:8,.0f} req/s  p50 {statistics.median(latencies) * 1000:6.1f}ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.1f}ms  avg checkout wait {wait_ms:6.1f}ms  "
+          f"timeouts {metrics['checkout_timeouts']}  errors {errors}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1,2,5,10,20")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--hold-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    await reset_schema()
+    await app_engine.dispose()
+    for size in (int(s) for s in args.sizes.split(",")):
+        await run(size, args.concurrency, args.requests, args.hold_ms / 1000)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
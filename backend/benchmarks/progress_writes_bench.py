@@ -0,0 +1,84 @@
+'''
+Database writes/sec for N concurrently running pomodoros: the old
+once-per-second `worked_time` UPDATE versus writing only on state transitions.
+
+    python -m benchmarks.progress_writes_bench --sessions 200 --duration 30
+'''
+import argparse
+import asyncio
+import time
+
+from benchmarks._db import WriteCounter, reset_schema
+
+from sqlalchemy import update
+
+from app.db.models.pomodoro import Pomodoro
+from app.db.session import AsyncSessionLocal, engine
+from app.services.pomodoro_timer import PomodoroTimer
+from app.services.timer_engine import timer_engine
+
+
+async def seed(count, duration):
+    async with AsyncSessionLocal() as db:
+        rows = [Pomodoro(timer=duration, rest_time=0, worked_time=0, status="scheduled", user_id=f"user-{i}") for i in range(count)]
+        db.add_all(rows)
+        await db.commit()
+        return [(row.id, row.user_id) for row in rows]
+
+
+async def legacy_session(pomodoro_id, duration):
+    '''What `update_progress` used to do: a fresh session and commit every second.'''
+    for elapsed in range(1, duration + 1):
+        await asyncio.sleep(1)
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Pomodoro).where(Pomodoro.id == pomodoro_id).values(worked_time=elapsed, status="running"))
+            await db.commit()
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Pomodoro).where(Pomodoro.id == pomodoro_id).values(status="completed"))
+        await db.commit()
+
+
+async def transition_session(pomodoro_id, user_id, duration):
+    '''Start, one pause/resume cycle, then completion fired by the timer engine.'''
+    service = PomodoroTimer(user_id=user_id)
+    await service.run_pomodoro(pomodoro_id)
+    await asyncio.sleep(duration / 3)
+    await service.pause(pomodoro_id, user_id)
+    await asyncio.sleep(1)
+    await service.resume(pomodoro_id, user_id)
+
+
+async def measure(name, counter, coros, duration):
+    counter.reset()
+    start = time.perf_counter()
+    await asyncio.gather(*coros)
+    while len(timer_engine):
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(0.5)  # let completion callbacks commit
+    elapsed = time.perf_counter() - start
+    print(f"{name:>12}: {counter.writes} writes in {elapsed:.1f}s -> {counter.writes / elapsed:,.1f} writes/s")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--duration", type=int, default=30, help="timer length in seconds")
+    args = parser.parse_args()
+
+    await reset_schema()
+    counter = WriteCounter()
+    timer_engine.start()
+
+    rows = await seed(args.sessions, args.duration)
+    await measure("per-second", counter, [legacy_session(pid, args.duration) for pid, _ in rows], args.duration)
+
+    rows = await seed(args.sessions, args.duration)
+    await measure("transitions", counter, [transition_session(pid, uid, args.duration) for pid, uid in rows], args.duration)
+
+    await timer_engine.stop()
+    counter.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,411 @@
+'''
+Query plans of the hot paths. Seeds a database, runs the queries issued by
+app.crud.*, StudyService and PomodoroTimer, and captures the plan of every
+distinct statement:
+
+  * Postgres: EXPLAIN (ANALYZE, BUFFERS) inside a rolled-back transaction,
+  * SQLite: EXPLAIN QUERY PLAN (no row counts; a full scan of a table above
+    the threshold is flagged instead).
+
+Sequential scans that read more than --seq-scan-rows rows, and index scans
+that filter that many away, are flagged with a suggested composite or partial
+index (skipped when an existing index already leads with those columns).
+Plans are compared with a baseline per dialect in benchmarks/data/; the run
+exits 1 when a plan regresses:
+
+  * a flagged scan the baseline did not have,
+  * an index the baseline used that is no longer used,
+  * shared buffers grown past --buffer-tolerance (same seed sizes only),
+
+and also when there is nothing to compare against: no baseline for the
+dialect, or statements new to it or gone from it since it was recorded.
+Only SQLite has a committed baseline; record one on Postgres first.
+
+    BENCH_DATABASE_URL=postgresql+asyncpg://localhost/crono_bench python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --update-baseline    # accept the current plans
+'''
+import argparse
+import asyncio
+import contextvars
+import hashlib
+import json
+import random
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from benchmarks._db import reset_schema
+
+from sqlalchemy import event, func, insert, select, text
+
+from app.crud import crud_pomodoro, crud_study, crud_user
+from app.db.base import Base
+from app.db.models.pomodoro import Pomodoro
+from app.db.models.study import Study
+from app.db.models.user import User
+from app.db.session import AsyncSessionLocal, engine
+from app.schemas.study import StudyCreate
+from app.services.job_queue import job_queue
+from app.services.pomodoro_timer import PomodoroTimer, rehydrate_timers
+from app.services.runner_registry import runner_registry
+from app.services.study_service import StudyService
+from app.services.timer_engine import timer_engine
+
+DATA_DIR = Path(__file__).parent / "data"
+TOPICS = ["math", "physics", "history", "chemistry", "reading", "languages", "biology", "music"]
+SEED_CHUNK = 5000
+DML = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+# Label of the workload step issuing the current statement; statements outside a step are not captured
+current_step: contextvars.ContextVar = contextvars.ContextVar("current_step", default=None)
+
+
+def user_email(i):
+    return f"user-{i}@bench.local"
+
+
+async def seed(users, pomodoros, studies):
+    '''Mostly finished history, a few live sessions, study records spread over a year'''
+    rng = random.Random(11)
+    now = datetime.now()
+    async with AsyncSessionLocal() as db:
+        for offset in range(0, users, SEED_CHUNK):
+            await db.execute(insert(User), [
+                {"email": user_email(i), "username": f"user-{i}"} for i in range(offset, min(users, offset + SEED_CHUNK))
+            ])
+        for offset in range(0, pomodoros, SEED_CHUNK):
+            rows = []
+            for i in range(offset, min(pomodoros, offset + SEED_CHUNK)):
+                started = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+                status = rng.choices(("completed", "stopped", "failed"), (80, 17, 3))[0]
+                rows.append({"timer": 1500, "rest_time": 300, "worked_time": 1500, "start_time": started, "end_time": started + timedelta(minutes=25),
+                             "status": status, "completed": status == "completed", "pause_count": 0, "task_name": rng.choice(TOPICS),
+                             "user_id": user_email(rng.randrange(users))})
+            await db.execute(insert(Pomodoro), rows)
+        # About one live session per 20 users, all still within their timer
+        await db.execute(insert(Pomodoro), [
+            {"timer": 3600, "rest_time": 300, "worked_time": 0, "start_time": now, "last_resume_time": now, "pause_count": 0,
+             "status": rng.choice(("running", "paused", "scheduled")), "task_name": "live", "user_id": user_email(i)}
+            for i in range(0, users, 20)
+        ])
+        for offset in range(0, studies, SEED_CHUNK):
+            await db.execute(insert(Study), [
+                {"topic": rng.choice(TOPICS), "study_time": rng.randrange(10, 120), "notes": None, "user_id": user_email(rng.randrange(users)),
+                 "timestamp": datetime.now(timezone.utc) - timedelta(minutes=rng.randrange(365 * 24 * 60))}
+                for _ in range(offset, min(studies, offset + SEED_CHUNK))
+            ])
+        await db.commit()
+    async with engine.connect() as conn:
+        await conn.execute(text("ANALYZE"))
+        await conn.commit()
+
+
+async def settle():
+    '''Wait for the start tasks PomodoroTimer hands to the runner registry'''
+    tasks = [runner.task for runner in runner_registry._runners.values() if runner.task and not runner.task.done()]
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def workload(user):
+    '''(label, step) pairs covering every query path of the crud modules, StudyService and PomodoroTimer'''
+    async with AsyncSessionLocal() as db:
+        pomodoro_ids = (await db.scalars(select(Pomodoro.id).where(Pomodoro.user_id == user, Pomodoro.status == "completed").limit(2))).all()
+        study_ids = (await db.scalars(select(Study.id).where(Study.user_id == user).limit(2))).all()
+    month_ago = datetime.now() - timedelta(days=30)
+    service = PomodoroTimer(user_id=user)
+    live = {}
+
+    async def with_db(fn):
+        async with AsyncSessionLocal() as db:
+            return await fn(db)
+
+    async def history_pages():
+        _, cursor = await with_db(lambda db: crud_pomodoro.get_pomodoros(db, user))
+        await with_db(lambda db: crud_pomodoro.get_pomodoros(db, user, cursor=cursor))
+
+    async def study_pages():
+        _, cursor = await with_db(lambda db: crud_study.get_study_sessions(db, user))
+        await with_db(lambda db: crud_study.get_study_sessions(db, user, cursor=cursor))
+
+    async def create():
+        live["a"] = await service.create_pomodoro(rest_time=300, task_name="plans", timer=3600)
+        live["b"] = await service.create_pomodoro(rest_time=300, task_name="plans", timer=3600)
+        await settle()
+
+    async def pause_conflict():
+        try:
+            await service.pause(live["a"].id, user)
+        except ValueError:
+            pass
+
+    async def scheduled_start():
+        await service.create_pomodoro(rest_time=300, task_name="later", timer=1500, start_at=datetime.now() + timedelta(minutes=5))
+        await job_queue.run_once(now=datetime.now() + timedelta(minutes=6))
+
+    async def study_service(fn):
+        async with AsyncSessionLocal() as db:
+            return await fn(StudyService(db, user))
+
+    return [
+        ("crud_pomodoro.get_pomodoros", history_pages),
+        ("crud_pomodoro.get_pomodoros status", lambda: with_db(lambda db: crud_pomodoro.get_pomodoros(db, user, status="completed"))),
+        ("crud_pomodoro.get_pomodoros range", lambda: with_db(lambda db: crud_pomodoro.get_pomodoros(db, user, start=month_ago, end=datetime.now()))),
+        ("crud_pomodoro.get_pomodoro_by_id", lambda: with_db(lambda db: crud_pomodoro.get_pomodoro_by_id(db, pomodoro_ids[0]))),
+        ("crud_pomodoro.delete_pomodoro", lambda: with_db(lambda db: crud_pomodoro.delete_pomodoro(db, pomodoro_ids[1]))),
+        ("crud_study.get_study_sessions", study_pages),
+        ("crud_study.get_study_sessions topic", lambda: with_db(lambda db: crud_study.get_study_sessions(db, user, topic="math"))),
+        ("crud_study.get_study_sessions range", lambda: with_db(lambda db: crud_study.get_study_sessions(db, user, start=month_ago))),
+        ("crud_study.get_study_session_by_id", lambda: with_db(lambda db: crud_study.get_study_session_by_id(db, study_ids[0]))),
+        ("crud_study.delete_study_session", lambda: with_db(lambda db: crud_study.delete_study_session(db, study_ids[1]))),
+        ("crud_user.get_user_by_email", lambda: with_db(lambda db: crud_user.get_user_by_email(db, user))),
+        ("crud_user.create_user_if_not_exists", lambda: with_db(lambda db: crud_user.create_user_if_not_exists(db, "new-user@bench.local"))),
+        ("StudyService.create_study_record", lambda: study_service(lambda s: s.create_study_record(StudyCreate(topic="math", study_time=30)))),
+        ("StudyService.create_study_records", lambda: study_service(lambda s: s.create_study_records([StudyCreate(topic="math", study_time=30)] * 5))),
+        ("StudyService.get_study_records", lambda: study_service(lambda s: s.get_study_records(topic="physics"))),
+        ("StudyService.delete_study_record", lambda: study_service(lambda s: s.delete_study_record(study_ids[0]))),
+        ("PomodoroTimer.create_pomodoro", create),
+        ("PomodoroTimer.create_pomodoros", lambda: service.create_pomodoros([{"timer": 1500, "rest_time": 300, "task_name": "batch"}] * 3)),
+        ("PomodoroTimer.pause", lambda: service.pause(live["a"].id, user)),
+        ("PomodoroTimer.resume", lambda: service.resume(live["a"].id, user)),
+        ("PomodoroTimer.extend", lambda: service.extend(live["a"].id, user, 60)),
+        ("PomodoroTimer.stop", lambda: service.stop(live["a"].id, user)),
+        ("PomodoroTimer.pause conflict", pause_conflict),
+        ("PomodoroTimer.completed", lambda: service.completed(live["b"].id, runner_registry.applied_version(live["b"].id))),
+        ("PomodoroTimer.failed", lambda: service.failed(live["b"].id)),
+        ("PomodoroTimer.start_scheduled_pomodoros", scheduled_start),
+        ("PomodoroTimer.rehydrate_timers", rehydrate_timers),
+    ]
+
+
+def normalize(statement):
+    '''Statement text without parameter numbering or IN-list length, to key the baseline'''
+    sql = " ".join(statement.split())
+    sql = re.sub(r"\$\d+", "?", sql)
+    return re.sub(r"\(\?(?:, \?)+\)", "(?...)", sql)
+
+
+async def capture(steps):
+    '''Run the steps, recording each distinct statement (first parameters seen) per step'''
+    captured = {}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        label = current_step.get()
+        if label is None or executemany or not statement.lstrip().upper().startswith(DML):
+            return
+        captured.setdefault((label, normalize(statement)), (statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    try:
+        for label, step in steps:
+            token = current_step.set(label)
+            try:
+                await step()
+            finally:
+                current_step.reset(token)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+    return captured
+
+
+def _nodes(node, parents=()):
+    yield node, parents
+    for child in node.get("Plans", []):
+        yield from _nodes(child, parents + (node,))
+
+
+async def explain_postgres(conn, statement, parameters, threshold, row_counts):
+    # ANALYZE runs the statement; the rollback undoes any write
+    trans = await conn.begin()
+    try:
+        raw = (await conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters)).scalar()
+    finally:
+        await trans.rollback()
+    document = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+    plan = document["Plan"]
+    shape, indexes, flagged = [], set(), []
+    for node, parents in _nodes(plan):
+        kind = node["Node Type"]
+        shape.append(" ".join(filter(None, (kind, node.get("Relation Name"), node.get("Index Name")))))
+        if node.get("Index Name"):
+            indexes.add(node["Index Name"])
+        loops = node.get("Actual Loops", 1)
+        removed = node.get("Rows Removed by Filter", 0) * loops
+        examined = node.get("Actual Rows", 0) * loops + removed
+        if kind == "Seq Scan" and examined >= threshold or "Index" in kind and removed >= threshold:
+            sort_keys = next((p["Sort Key"] for p in reversed(parents) if "Sort Key" in p), [])
+            flagged.append({"node": kind, "table": node["Relation Name"], "rows": examined,
+                            "filter": node.get("Filter", ""), "sort": sort_keys})
+    return {
+        "shape": shape,
+        "indexes": sorted(indexes),
+        "flagged": flagged,
+        "buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0),
+        "ms": round(document.get("Execution Time", 0.0), 3),
+    }
+
+
+async def explain_sqlite(conn, statement, parameters, threshold, row_counts):
+    rows = (await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)).all()
+    shape, indexes, flagged = [], set(), []
+    for row in rows:
+        detail = row[-1]
+        shape.append(re.sub(r"\d+", "N", detail))
+        index = re.search(r"USING (?:COVERING )?INDEX (\w+)|USING (INTEGER PRIMARY KEY)", detail)
+        if index:
+            indexes.add(index.group(1) or index.group(2))
+        scan = re.match(r"SCAN (\w+)$", detail)
+        if scan and row_counts.get(scan.group(1), 0) >= threshold:
+            flagged.append({"node": "SCAN", "table": scan.group(1), "rows": row_counts[scan.group(1)], "filter": "", "sort": []})
+    return {"shape": shape, "indexes": sorted(indexes), "flagged": flagged, "buffers": None, "ms": None}
+
+
+_CONDITION_RE = re.compile(
+    r"\(*(?P<column>\w+)\)*(?:::[\w ]+?)?\s*(?P<op>=|<=|>=|<|>)\s*(?P<any>ANY\s*\()?\s*\(*(?P<value>'[^']*'|\$\d+)"
+)
+
+
+def suggest_index(flag):
+    '''
+    A CREATE INDEX for a flagged scan: equality columns first, then range and sort columns.
+    An IN list of constants (e.g. active statuses) becomes the predicate of a partial index.
+    Returns (statement, existing index that already leads with these columns).
+    '''
+    table = Base.metadata.tables.get(flag["table"])
+    equal, ranges, partial = [], [], None
+    for match in _CONDITION_RE.finditer(flag["filter"]):
+        column, value = match["column"], match["value"]
+        if table is not None and column not in table.c:
+            continue
+        if match["any"] and value.startswith("'{"):
+            partial = (column, value.strip("'{}").split(","))
+        elif match["op"] == "=":
+            equal.append(column)
+        else:
+            ranges.append(column)
+    sort = [re.sub(r"^\w+\.|\s+(DESC|ASC).*$", "", key).strip('"') for key in flag["sort"]]
+    columns = list(dict.fromkeys(equal + ranges + sort))
+    if partial is not None and partial[0] in columns:
+        columns.remove(partial[0])
+    if not columns and partial is None:
+        return None, None
+
+    columns = columns or ["id"]
+    if table is not None:
+        for index in list(table.indexes) + [table.primary_key]:
+            leading = [c.name for c in index.columns][:len(columns)]
+            if leading == columns and (partial is None or index.dialect_options["postgresql"].get("where") is not None):
+                return None, index.name or "primary key"
+
+    name = "ix_" + "_".join([flag["table"]] + columns + (["partial"] if partial else []))
+    statement = f"CREATE INDEX CONCURRENTLY {name} ON {flag['table']} ({', '.join(columns)})"
+    if partial is not None:
+        statement += f" WHERE {partial[0]} IN ({', '.join(repr(v) for v in partial[1])})"
+    return statement, None
+
+
+def compare(key, current, baseline, tolerance, same_seed):
+    '''Regressions of one plan against its baseline entry'''
+    problems = []
+    before = {(f["node"], f["table"]) for f in baseline["flagged"]}
+    for flag in current["flagged"]:
+        if (flag["node"], flag["table"]) not in before:
+            problems.append(f"new {flag['node']} on {flag['table']} ({flag['rows']:,} rows)")
+    for index in set(baseline["indexes"]) - set(current["indexes"]):
+        problems.append(f"no longer uses {index}")
+    if same_seed and current["buffers"] is not None and baseline["buffers"] is not None:
+        if current["buffers"] > baseline["buffers"] * tolerance and current["buffers"] - baseline["buffers"] >= 64:
+            problems.append(f"buffers {baseline['buffers']:,} -> {current['buffers']:,}")
+    return problems
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--pomodoros", type=int, default=200_000)
+    parser.add_argument("--studies", type=int, default=100_000)
+    parser.add_argument("--seq-scan-rows", type=int, default=1000, help="flag scans reading or filtering at least this many rows")
+    parser.add_argument("--buffer-tolerance", type=float, default=2.0, help="allowed growth factor of shared buffers")
+    parser.add_argument("--baseline", type=Path, help="default: benchmarks/data/query_plans.<dialect>.json")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--fail-on-flagged", action="store_true", help="also exit 1 on flagged scans present in the baseline")
+    args = parser.parse_args()
+
+    dialect = engine.dialect.name
+    baseline_path = args.baseline or DATA_DIR / f"query_plans.{dialect}.json"
+    seed_sizes = {"users": args.users, "pomodoros": args.pomodoros, "studies": args.studies}
+
+    await reset_schema()
+    await seed(args.users, args.pomodoros, args.studies)
+    timer_engine.start()
+    runner_registry.max_active = runner_registry.max_per_user = 0
+    captured = await capture(await workload(user_email(0)))
+    await timer_engine.stop()
+
+    explain = explain_postgres if dialect == "postgresql" else explain_sqlite
+    plans = {}
+    async with engine.connect() as conn:
+        row_counts = {name: await conn.scalar(select(func.count()).select_from(table)) for name, table in Base.metadata.tables.items()}
+        for (label, sql), (statement, parameters) in sorted(captured.items()):
+            key = f"{label} {hashlib.sha1(sql.encode()).hexdigest()[:10]}"
+            plans[key] = {"sql": sql[:160], **await explain(conn, statement, parameters, args.seq_scan_rows, row_counts)}
+
+    print(f"{len(plans)} statements on {dialect} ({', '.join(f'{k} {v:,}' for k, v in seed_sizes.items())})")
+    for key, plan in plans.items():
+        cost = f"{plan['buffers']:>7,} buf {plan['ms']:>8.2f}ms  " if plan["buffers"] is not None else ""
+        print(f"  {key:<58} {cost}{' > '.join(plan['shape'])[:110]}")
+
+    suggestions = {}
+    flagged_any = False
+    for key, plan in plans.items():
+        for flag in plan["flagged"]:
+            flagged_any = True
+            statement, covered_by = suggest_index(flag)
+            print(f"FLAG {key}: {flag['node']} on {flag['table']}, {flag['rows']:,} rows {flag['filter']}")
+            if covered_by:
+                print(f"     {covered_by} already leads with these columns; check statistics (ANALYZE) and the query shape")
+            elif statement:
+                suggestions.setdefault(statement, []).append(key)
+    for statement, keys in suggestions.items():
+        print(f"SUGGEST {statement};  -- {', '.join(keys)}")
+
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps({"seed": seed_sizes, "plans": plans}, indent=1, sort_keys=True) + "\n")
+        print(f"baseline written to {baseline_path}")
+        await engine.dispose()
+        return
+
+    await engine.dispose()
+    if not baseline_path.exists():
+        sys.exit(f"NO BASELINE at {baseline_path}: no plan was compared. Run with --update-baseline to record one.")
+
+    regressions, unchecked = [], []
+    baseline = json.loads(baseline_path.read_text())
+    same_seed = baseline["seed"] == seed_sizes
+    if not same_seed:
+        print(f"seed sizes differ from the baseline ({baseline['seed']}); buffer counts are not compared")
+    for key, plan in plans.items():
+        if key not in baseline["plans"]:
+            unchecked.append(f"NEW  {key} (not in the baseline)")
+            continue
+        regressions.extend(f"{key}: {problem}" for problem in compare(key, plan, baseline["plans"][key], args.buffer_tolerance, same_seed))
+    for key in sorted(baseline["plans"].keys() - plans.keys()):
+        unchecked.append(f"GONE {key} (in the baseline, not issued any more)")
+
+    for line in unchecked:
+        print(line)
+    for line in regressions:
+        print("REGRESSION", line)
+    if regressions or unchecked or (args.fail_on_flagged and flagged_any):
+        if regressions:
+            print(f"{len(regressions)} plan regressions")
+        if unchecked:
+            print(f"baseline is stale, {len(unchecked)} statements not compared: review the plans above and run with --update-baseline")
+        if args.fail_on_flagged and flagged_any:
+            print("flagged scans")
+        sys.exit(1)
+    print("no plan regressions")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
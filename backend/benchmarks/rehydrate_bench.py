@@ -0,0 +1,65 @@
+'''
+Startup rehydration time with a large number of open pomodoros.
+
+    python -m benchmarks.rehydrate_bench --rows 100000
+'''
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._db import reset_schema
+
+from sqlalchemy import insert
+
+from app.db.models.pomodoro import Pomodoro
+from app.db.session import AsyncSessionLocal, engine
+from app.services.pomodoro_timer import rehydrate_timers
+from app.services.runner_registry import runner_registry
+from app.services.timer_engine import timer_engine
+
+
+async def seed(count, chunk=10_000):
+    now = datetime.now()
+    random.seed(7)
+    async with AsyncSessionLocal() as db:
+        for offset in range(0, count, chunk):
+            rows = []
+            for i in range(offset, min(offset + chunk, count)):
+                status = random.choice(("running", "running", "paused"))
+                rows.append({
+                    "timer": 1500,
+                    "rest_time": 300,
+                    "worked_time": random.randint(0, 600),
+                    "start_time": now - timedelta(minutes=30),
+                    "last_resume_time": now - timedelta(seconds=random.randint(0, 1800)) if status == "running" else None,
+                    "status": status,
+                    "user_id": f"user-{i % 5000}",
+                })
+            await db.execute(insert(Pomodoro), rows)
+        await db.commit()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    await reset_schema()
+    await seed(args.rows)
+
+    timer_engine.start()
+    start = time.perf_counter()
+    restored, expired = await rehydrate_timers(batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"{args.rows} open rows: {restored} re-registered, {expired} completed in {elapsed:.2f}s "
+          f"({args.rows / elapsed:,.0f} rows/s), {len(runner_registry)} tracked")
+
+    await timer_engine.stop()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+'''
+Cold import and startup time of the API, each run in a fresh interpreter:
+
+  * import: `import app.main` (routers, models, services),
+  * startup: entering the lifespan (timer engine, rehydration, agent warm-up task),
+  * first request: `GET /` right after startup,
+  * whether langchain was already loaded by the import.
+
+    python -m benchmarks.startup_bench --runs 5
+    python -m benchmarks.startup_bench --runs 5 --importtime   # slowest modules as well
+'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = r'''
+import asyncio, json, sys, time
+start = time.perf_counter()
+from benchmarks._db import reset_schema
+import app.main
+imported = time.perf_counter() - start
+langchain_loaded = "langchain" in sys.modules
+
+import httpx
+from app.db.session import engine
+
+async def main():
+    await reset_schema()
+    t = time.perf_counter()
+    async with app.main.app.router.lifespan_context(app.main.app):
+        started = time.perf_counter() - t
+        t = time.perf_counter()
+        transport = httpx.ASGITransport(app=app.main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.get("/")
+        first = time.perf_counter() - t
+    await engine.dispose()
+    return started, first
+
+started, first = asyncio.run(main())
+print(json.dumps({"import_s": imported, "startup_s": started, "first_request_s": first, "langchain_loaded": langchain_loaded}))
+'''
+
+
+def run_probe(env):
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", PROBE], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def slowest_imports(env, top, depth):
+    err = subprocess.run([sys.executable, "-W", "ignore", "-X", "importtime", "-c", "import benchmarks._db, app.main"],
+                         env=env, capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        level = (len(name) - len(name.lstrip()) - 1) // 2  # nested imports are indented two spaces per level
+        if level <= depth:
+            rows.append((int(cumulative_us), name.strip()))
+    for cumulative_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:9.1f}ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", action="store_true", help="keep the background agent warm-up on (AGENT_WARMUP)")
+    parser.add_argument("--importtime", action="store_true", help="list the slowest imports")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--depth", type=int, default=3, help="import nesting depth listed by --importtime")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=os.getcwd(), AGENT_WARMUP="true" if args.warmup else "false")
+    env.setdefault("GROQ_API_KEY", "unused-by-startup-bench")
+    results = [run_probe(env) for _ in range(args.runs)]
+
+    for key in ("import_s", "startup_s", "first_request_s"):
+        values = [r[key] for r in results]
+        print(f"{key:>16}: median {statistics.median(values) * 1000:8.1f}ms  min {min(values) * 1000:8.1f}ms  max {max(values) * 1000:8.1f}ms")
+    print(f"langchain loaded by import: {results[0]['langchain_loaded']}")
+
+    if args.importtime:
+        print()
+        slowest_imports(env, args.top, args.depth)
+
+
+if __name__ == "__main__":
+    main()
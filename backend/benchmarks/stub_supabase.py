@@ -0,0 +1,65 @@
+'''
+Local stand-in for Supabase's `GET /auth/v1/user`, for exercising the email
+fallback without network access.
+
+    python -m benchmarks.stub_supabase --port 54321 --latency 0.05
+    SUPABASE_URL=http://127.0.0.1:54321 uvicorn app.main:app
+
+Tokens are decoded without verification; the `email` claim is returned, or
+`<sub>@stub.local` when the token has none. Anything else answers 401.
+'''
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from jose import jwt
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    calls = 0
+
+    def do_GET(self):
+        type(self).calls += 1
+        time.sleep(self.latency)
+
+        auth_header = self.headers.get("Authorization", "")
+        if self.path != "/auth/v1/user" or not auth_header.startswith("Bearer "):
+            return self._reply(401, {"msg": "invalid request"})
+        try:
+            claims = jwt.get_unverified_claims(auth_header.split(" ")[1])
+        except Exception:
+            return self._reply(401, {"msg": "invalid token"})
+        self._reply(200, {"id": claims.get("sub"), "email": claims.get("email") or f"{claims.get('sub')}@stub.local"})
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_in_thread(port: int=0, latency: float=0.0):
+    '''Start the stub on a background thread; returns (server, base_url).'''
+    StubHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    print(f"Stub Supabase listening on http://127.0.0.1:{args.port}")
+    ThreadingHTTPServer(("127.0.0.1", args.port), StubHandler).serve_forever()
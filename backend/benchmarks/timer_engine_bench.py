@@ -0,0 +1,93 @@
+'''
+Wakeups/sec and completion drift of the shared timer engine versus the old
+one-coroutine-per-pomodoro `asyncio.sleep(1)` loop.
+
+    python -m benchmarks.timer_engine_bench --timers 10000 --duration 5
+'''
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.services.timer_engine import TimerEngine
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[k]
+
+
+def summary(name, wakeups, elapsed, drifts):
+    drifts_ms = [d * 1000 for d in drifts]
+    print(f"{name:>10}: {len(drifts)} timers, {wakeups / elapsed:,.0f} wakeups/s, "
+          f"drift p50={percentile(drifts_ms, 50):.1f}ms p99={percentile(drifts_ms, 99):.1f}ms "
+          f"max={max(drifts_ms):.1f}ms mean={statistics.fmean(drifts_ms):.1f}ms")
+
+
+async def run_legacy(durations):
+    '''The previous runner: a coroutine per timer counting `elapsed += 1`.'''
+    loop = asyncio.get_running_loop()
+    wakeups = 0
+    drifts = []
+
+    async def runner(total_seconds):
+        nonlocal wakeups
+        expected = loop.time() + total_seconds
+        elapsed = 0
+        while elapsed < total_seconds:
+            await asyncio.sleep(1)
+            elapsed += 1
+            wakeups += 1
+            await asyncio.sleep(0)  # stands in for the per-second progress write
+        drifts.append(loop.time() - expected)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(runner(d) for d in durations))
+    return wakeups, time.perf_counter() - start, drifts
+
+
+async def run_engine(durations):
+    loop = asyncio.get_running_loop()
+    engine = TimerEngine()
+    engine.start()
+    expected = {}
+    drifts = []
+    done = asyncio.Event()
+
+    async def on_complete(pomodoro_id):
+        drifts.append(loop.time() - expected[pomodoro_id])
+        if len(drifts) == len(durations):
+            done.set()
+
+    start = time.perf_counter()
+    for pomodoro_id, seconds in enumerate(durations):
+        expected[pomodoro_id] = loop.time() + seconds
+        engine.schedule(pomodoro_id, seconds, on_complete)
+
+    await done.wait()
+    elapsed = time.perf_counter() - start
+    await engine.stop()
+    return engine.wakeups, elapsed, drifts
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--timers", type=int, default=10_000)
+    parser.add_argument("--duration", type=int, default=5, help="max timer length in seconds")
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(42)
+    durations = [random.randint(1, args.duration) for _ in range(args.timers)]
+
+    summary("engine", *await run_engine(durations))
+    if not args.skip_legacy:
+        summary("legacy", *await run_legacy(durations))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
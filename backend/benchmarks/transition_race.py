@@ -0,0 +1,120 @@
+'''
+Fires conflicting pause/resume/stop/extend transitions at the same pomodoros
+in parallel and checks that no update was lost:
+
+  * every successful transition bumped `version` exactly once,
+  * `timer` grew by exactly the successful extends,
+  * `pause_count` equals the successful pauses,
+  * `worked_time` never exceeds `timer`,
+  * the timer engine agrees with the final row (stopped -> no timer,
+    paused -> frozen timer, running -> ticking timer),
+  * stale `expected_version` transitions were rejected.
+
+    python -m benchmarks.transition_race --pomodoros 50 --rounds 20
+'''
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+
+from benchmarks._db import reset_schema
+
+from sqlalchemy import select
+
+from app.db.models.pomodoro import Pomodoro
+from app.db.session import AsyncSessionLocal, engine
+from app.services.pomodoro_timer import PomodoroTimer
+from app.services.runner_registry import runner_registry
+from app.services.timer_engine import timer_engine
+
+EXTEND_SECONDS = 60
+USER = "race-user"
+
+
+async def attempt(service, action, pomodoro_id, outcomes, expected_version=None):
+    try:
+        if action == "extend":
+            pomodoro = await service.extend(pomodoro_id, USER, EXTEND_SECONDS, expected_version=expected_version)
+        else:
+            pomodoro = await getattr(service, action)(pomodoro_id, USER, expected_version=expected_version)
+    except ValueError:
+        outcomes[(pomodoro_id, action, "conflict")] += 1
+        return
+    outcomes[(pomodoro_id, action, "ok" if pomodoro else "missing")] += 1
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pomodoros", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20, help="bursts of conflicting transitions per pomodoro")
+    parser.add_argument("--burst", type=int, default=6, help="concurrent transitions per burst")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    await reset_schema()
+    runner_registry.max_per_user = 0  # one user owns every pomodoro here
+    timer_engine.start()
+    rng = random.Random(args.seed)
+    service = PomodoroTimer(user_id=USER)
+
+    pomodoros = await service.create_pomodoros([{"timer": 3600, "rest_time": 0, "task_name": "race"}] * args.pomodoros)
+    ids = [p.id for p in pomodoros]
+    outcomes = Counter()
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        coros = []
+        for pomodoro_id in ids:
+            for _ in range(args.burst):
+                coros.append(attempt(service, rng.choice(("pause", "resume", "extend", "extend", "pause", "resume")), pomodoro_id, outcomes))
+            # A client acting on a version read before this burst must lose
+            coros.append(attempt(service, "extend", pomodoro_id, outcomes, expected_version=0))
+        rng.shuffle(coros)
+        await asyncio.gather(*coros)
+    # Final stop racing against more pauses and resumes
+    await asyncio.gather(*(
+        attempt(service, action, pomodoro_id, outcomes)
+        for pomodoro_id in ids if rng.random() < 0.5
+        for action in ("stop", "pause", "resume", "stop")
+    ))
+    elapsed = time.perf_counter() - start
+
+    async with AsyncSessionLocal() as db:
+        rows = {row.id: row for row in (await db.scalars(select(Pomodoro).where(Pomodoro.id.in_(ids)))).all()}
+
+    failures = []
+    for pomodoro_id in ids:
+        row = rows[pomodoro_id]
+        ok = {action: outcomes[(pomodoro_id, action, "ok")] for action in ("pause", "resume", "extend", "stop")}
+        checks = {
+            "version": row.version == 1 + sum(ok.values()),
+            "timer": row.timer == 3600 + EXTEND_SECONDS * ok["extend"],
+            "pause_count": row.pause_count == ok["pause"],
+            "worked_time": 0 <= (row.worked_time or 0) <= row.timer,
+            "single stop": ok["stop"] <= 1,
+            "engine": (
+                pomodoro_id not in timer_engine and pomodoro_id not in runner_registry if row.status == "stopped"
+                else pomodoro_id in timer_engine and pomodoro_id in runner_registry
+                and timer_engine._entries[pomodoro_id].paused == (row.status == "paused")
+            ),
+        }
+        failures.extend(f"pomodoro {pomodoro_id}: {name}" for name, passed in checks.items() if not passed)
+
+    stale = sum(n for (_, action, result), n in outcomes.items() if result == "conflict")
+    attempts = sum(outcomes.values())
+    print(f"{attempts:,} transitions on {len(ids)} pomodoros in {elapsed:.2f}s "
+          f"({attempts / elapsed:,.0f}/s): {attempts - stale:,} applied, {stale:,} rejected")
+    for line in failures[:20]:
+        print("FAIL", line)
+    print("all invariants hold" if not failures else f"{len(failures)} invariant violations")
+
+    await timer_engine.stop()
+    await engine.dispose()
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
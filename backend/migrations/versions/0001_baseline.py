@@ -0,0 +1,58 @@
+"""Baseline: the tables the app used to create at startup
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("username", sa.String(128), nullable=False),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "pomodoros_history",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("timer", sa.Integer(), nullable=False),
+        sa.Column("rest_time", sa.Integer(), nullable=True),
+        sa.Column("start_time", sa.DateTime(), nullable=True),
+        sa.Column("end_time", sa.DateTime(), nullable=True),
+        sa.Column("last_resume_time", sa.DateTime(), nullable=True),
+        sa.Column("worked_time", sa.Integer(), nullable=True),
+        sa.Column("completed", sa.Boolean(), nullable=True),
+        sa.Column("task_name", sa.String(100), nullable=True),
+        sa.Column("status", sa.String(20), nullable=True),
+        sa.Column("user_id", sa.String(), nullable=False),
+    )
+    op.create_index("ix_pomodoros_history_id", "pomodoros_history", ["id"])
+
+    op.create_table(
+        "study_records",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("topic", sa.String(75), nullable=True),
+        sa.Column("study_time", sa.Integer(), nullable=False),
+        sa.Column("notes", sa.Text(), nullable=True),
+        sa.Column("timestamp", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.email"), nullable=False),
+    )
+    op.create_index("ix_study_records_id", "study_records", ["id"])
+
+
+def downgrade():
+    op.drop_table("study_records")
+    op.drop_table("pomodoros_history")
+    op.drop_table("users")
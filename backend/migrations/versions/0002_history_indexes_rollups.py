@@ -0,0 +1,54 @@
+"""History indexes, pause_count/version columns and the stats rollup tables
+
+Revision ID: 0002_history_indexes_rollups
+Revises: 0001_baseline
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_history_indexes_rollups"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("pomodoros_history") as batch:
+        batch.add_column(sa.Column("pause_count", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    op.create_index("ix_pomodoros_history_status", "pomodoros_history", ["status"])
+    op.create_index("ix_pomodoros_history_user_start_id", "pomodoros_history", ["user_id", "start_time", "id"])
+    op.create_index("ix_study_records_user_timestamp_id", "study_records", ["user_id", "timestamp", "id"])
+
+    op.create_table(
+        "focus_rollups",
+        sa.Column("user_id", sa.String(255), primary_key=True),
+        sa.Column("period", sa.String(4), primary_key=True),
+        sa.Column("period_start", sa.Date(), primary_key=True),
+        sa.Column("focus_seconds", sa.Integer(), nullable=False),
+        sa.Column("completed_count", sa.Integer(), nullable=False),
+        sa.Column("failed_count", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "study_rollups",
+        sa.Column("user_id", sa.String(255), primary_key=True),
+        sa.Column("period", sa.String(4), primary_key=True),
+        sa.Column("period_start", sa.Date(), primary_key=True),
+        sa.Column("topic", sa.String(75), primary_key=True),
+        sa.Column("study_minutes", sa.Integer(), nullable=False),
+        sa.Column("sessions", sa.Integer(), nullable=False),
+    )
+    # Existing history is rolled up with `python -m scripts.backfill_stats`
+
+
+def downgrade():
+    op.drop_table("study_rollups")
+    op.drop_table("focus_rollups")
+    op.drop_index("ix_study_records_user_timestamp_id", table_name="study_records")
+    op.drop_index("ix_pomodoros_history_user_start_id", table_name="pomodoros_history")
+    op.drop_index("ix_pomodoros_history_status", table_name="pomodoros_history")
+    with op.batch_alter_table("pomodoros_history") as batch:
+        batch.drop_column("version")
+        batch.drop_column("pause_count")
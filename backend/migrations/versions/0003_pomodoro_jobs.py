@@ -0,0 +1,38 @@
+"""Job queue for scheduled starts and pomodoro cycles
+
+Revision ID: 0003_pomodoro_jobs
+Revises: 0002_history_indexes_rollups
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_pomodoro_jobs"
+down_revision = "0002_history_indexes_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("pomodoros_history") as batch:
+        batch.add_column(sa.Column("cycles_left", sa.Integer(), nullable=True))
+
+    op.create_table(
+        "pomodoro_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String(10), nullable=False),
+        sa.Column("pomodoro_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("due_at", sa.DateTime(), nullable=False),
+        sa.Column("status", sa.String(10), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.String(255), nullable=True),
+    )
+    op.create_index("ix_pomodoro_jobs_status_due_at", "pomodoro_jobs", ["status", "due_at"])
+
+
+def downgrade():
+    op.drop_table("pomodoro_jobs")
+    with op.batch_alter_table("pomodoros_history") as batch:
+        batch.drop_column("cycles_left")
@@ -0,0 +1,24 @@
+"""Owner process of each live pomodoro's timer
+
+Revision ID: 0004_pomodoro_runner_id
+Revises: 0003_pomodoro_jobs
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_pomodoro_runner_id"
+down_revision = "0003_pomodoro_jobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("pomodoros_history") as batch:
+        batch.add_column(sa.Column("runner_id", sa.String(255), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("pomodoros_history") as batch:
+        batch.drop_column("runner_id")
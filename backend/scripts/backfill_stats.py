@@ -0,0 +1,46 @@
+'''
+Rebuild the stats rollups from pomodoros_history and study_records.
+Run from backend/:  python -m scripts.backfill_stats [--chunk-size N]
+
+The schema has to be at the latest migration first (`alembic upgrade head`).
+'''
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from app.db.session import engine
+from app.services.stats_calculator import backfill_rollups
+
+ALEMBIC_INI = Path(__file__).resolve().parents[1] / "alembic.ini"
+
+
+async def check_schema():
+    '''Refuse to run against a database that is not migrated to head'''
+    head = ScriptDirectory.from_config(Config(str(ALEMBIC_INI))).get_current_head()
+    async with engine.connect() as conn:
+        current = await conn.run_sync(lambda sync_conn: MigrationContext.configure(sync_conn).get_current_revision())
+    if current != head:
+        await engine.dispose()
+        raise SystemExit(f"Database schema is at {current or 'no revision'}, expected {head}: run `alembic upgrade head` first.")
+
+
+async def main(chunk_size: int):
+    await check_schema()
+
+    started = time.perf_counter()
+    counts = await backfill_rollups(chunk_size=chunk_size)
+    elapsed = time.perf_counter() - started
+    print(f"Backfilled rollups from {counts} rows in {elapsed:.1f}s")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.chunk_size))